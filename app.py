@@ -1,62 +1,144 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_from_directory, make_response
-from datetime import datetime
-from pymongo import MongoClient
+from flask import Flask, Request, render_template, request, redirect, url_for, flash, send_from_directory, make_response, jsonify, g, send_file, stream_template, stream_with_context, Response, before_render_template, template_rendered, session
+from datetime import datetime, timedelta, timezone
 from bson.objectid import ObjectId
 import os
 from dotenv import load_dotenv
 from flask_login import LoginManager, UserMixin, login_user, logout_user, login_required, current_user
-import bcrypt
 from werkzeug.utils import secure_filename
-from collections import Counter
-import platform
+import tempfile
+import csv
+import io
+import json
+import gzip
+import time
+import mimetypes
+import unicodedata
+from urllib.parse import quote
+from functools import partial
+from mood_statistics import MOOD_COLORS, STATS_PROJECTION, compute_stats, get_user_stats, update_rollup, add_to_rollup, rebuild_rollup, verify_rollup
+from mood_import import MOOD_FIELDS, ImportFormatError, detect_format, parse_rows, import_moods
+from mood_dates import parse_occurred_at, parse_date, date_range_query, month_window, backfill_occurred_at
+from mood_search import search_fields, search_query, search_moods, create_search_index, backfill_search_fields
+from mood_trends import GRANULARITIES, TRENDS_PROJECTION, update_trends, add_to_trends, rebuild_trends, get_trends
+from mood_sync import SyncTokenError, SyncTokenExpired, sync_write, assign_sync_seq, sync_horizon, create_sync_indexes, record_tombstone, make_token, parse_token, fetch_changes, backfill_modified_at
+import click
+from caching import TTLCache, FileLRUCache, make_cache_key, FragmentCache, MemoryFragmentBackend, FileFragmentBackend, RedisFragmentBackend
+from markupsafe import Markup
+from export_jobs import ExportJobQueue, ExportQueueFull
+from pdf_renderers import create_renderer
+from passwords import PasswordHasher, PasswordHasherBusy
+from mongo import MongoManager, LazyCollection, CommandTimingListener, READ_PREFERENCES
+from metrics import Metrics
+from asset_pipeline import VENDOR_PACKAGES, vendor_path, bundle_content, build_assets, load_manifest, vendor_packages, precompressed_file
 
-# ⚠️ Import pdfkit แบบปลอดภัย
+# ⚠️ Import Pillow แบบปลอดภัย (ถ้าไม่มีจะเก็บรูปโปรไฟล์ตามไฟล์ต้นฉบับ)
 try:
-    import pdfkit
-    # ตรวจสอบว่าเป็น Windows หรือไม่
-    if platform.system() == 'Windows':
-        # ตั้งค่า path สำหรับ Windows
-        pdfkit_config = pdfkit.configuration(wkhtmltopdf=r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe')
-    else:
-        # สำหรับ Linux/Mac/Render
-        pdfkit_config = pdfkit.configuration()
-    PDF_ENABLED = True
+    from avatars import InvalidImage, process_avatar, remove_avatar, avatar_filename
+    AVATAR_PROCESSING = True
 except Exception as e:
-    print(f"⚠️ Warning: pdfkit not available. PDF export disabled. Error: {e}")
-    PDF_ENABLED = False
-    pdfkit_config = None
+    print(f"⚠️ Warning: Pillow not available. Profile pictures will not be resized. Error: {e}")
+    AVATAR_PROCESSING = False
 
 # โหลดค่าจาก .env
 load_dotenv()
 
+# Request ที่ให้บาง route (เช่น นำเข้าข้อมูล) รับไฟล์ใหญ่กว่า MAX_CONTENT_LENGTH ได้
+class MoodRequest(Request):
+    @property
+    def max_content_length(self):
+        if self.endpoint in LARGE_UPLOAD_ENDPOINTS:
+            return app.config['IMPORT_MAX_CONTENT_LENGTH']
+        return app.config['MAX_CONTENT_LENGTH']
+
 app = Flask(__name__)
+app.request_class = MoodRequest
 app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-change-this-in-production')
 
 # ตั้งค่า Upload
 app.config['UPLOAD_FOLDER'] = 'static/uploads/profiles'
 app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # จำกัดขนาด 5MB
+app.config['IMPORT_MAX_CONTENT_LENGTH'] = int(os.getenv('IMPORT_MAX_MB', '200')) * 1024 * 1024  # ไฟล์นำเข้าข้อมูล
+LARGE_UPLOAD_ENDPOINTS = {'import_moods_route'}
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+AVATAR_MAX_AGE = 365 * 24 * 60 * 60
+
+# CSS/JS ที่ build แล้ว (`flask build-assets`) ชื่อไฟล์มี hash ของเนื้อหา จึง cache ได้ 1 ปีแบบ immutable
+ASSETS_SOURCE_DIR = os.path.join(app.root_path, 'assets')
+app.config['ASSET_DIST_DIR'] = os.path.join(app.static_folder, 'dist')
+ASSET_MAX_AGE = 365 * 24 * 60 * 60
+
+# บีบอัด HTML/JSON ที่ใหญ่กว่า COMPRESS_MIN_BYTES ด้วย gzip (COMPRESS_MIN_BYTES=0 คือปิด)
+COMPRESS_MIMETYPES = {'text/html', 'application/json'}
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', '1024'))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))
 
 # สร้างโฟลเดอร์ถ้ายังไม่มี
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# ตั้งค่าการเข้ารหัสรหัสผ่าน (bcrypt ทำใน thread pool ขนาดจำกัด)
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv('BCRYPT_ROUNDS', '12')),
+    max_workers=int(os.getenv('PASSWORD_HASH_WORKERS', '2')),
+    max_queue=int(os.getenv('PASSWORD_HASH_QUEUE', '16'))
+)
+
 # ตั้งค่า Flask-Login
 login_manager = LoginManager()
 login_manager.init_app(app)
 login_manager.login_view = 'login'
 login_manager.login_message = 'กรุณาเข้าสู่ระบบก่อนใช้งาน'
 
-# เชื่อมต่อ MongoDB
+# เก็บเวลาตอบ request / คำสั่ง MongoDB / render template (แสดงที่ /metrics)
+# SLOW_REQUEST_MS > 0 จะ log request ที่ช้าพร้อมรายการคำสั่ง MongoDB ที่ใช้
+metrics = Metrics(slow_request_ms=int(os.getenv('SLOW_REQUEST_MS', '0')))
+
+# เชื่อมต่อ MongoDB (สร้าง client ตอนใช้งานครั้งแรกในแต่ละ worker)
 MONGODB_URI = os.getenv('MONGODB_URI')
-client = MongoClient(MONGODB_URI)
+mongo = MongoManager.from_env(MONGODB_URI, 'mood_tracker',
+                              listeners=[CommandTimingListener(metrics.record_mongo)])
+
+# เลือก Collections
+moods_collection = LazyCollection(mongo, 'moods')
+users_collection = LazyCollection(mongo, 'users')
+mood_stats_collection = LazyCollection(mongo, 'mood_stats')  # rollup สถิติต่อผู้ใช้
+mood_trends_collection = LazyCollection(mongo, 'mood_trends')  # ตัวนับรายวันต่อผู้ใช้ (แนวโน้ม)
+mood_tombstones_collection = LazyCollection(mongo, 'mood_tombstones')  # id ของบันทึกที่ลบแล้ว (สำหรับ /api/sync)
 
-# เลือก Database และ Collections
-db = client['mood_tracker']
-moods_collection = db['moods']
-users_collection = db['users']
+# อายุของ tombstone client ที่ไม่ได้ sync นานกว่านี้ต้องโหลดข้อมูลใหม่ทั้งหมด
+SYNC_TOMBSTONE_TTL = int(os.getenv('SYNC_TOMBSTONE_TTL_DAYS', '30')) * 24 * 60 * 60
 
-# สร้าง index สำหรับ username (ไม่ให้ซ้ำ)
-users_collection.create_index('username', unique=True)
+# สำหรับ route ที่อ่านอย่างเดียว (ประวัติ, export) ให้อ่านจาก secondary ได้ถ้าตั้งค่าไว้
+# ค่าเริ่มต้นเป็น primary เพราะหน้าที่แสดงหลังบันทึกต้องเห็นข้อมูลล่าสุด
+READ_ONLY_PREFERENCE = READ_PREFERENCES[os.getenv('MONGO_READ_PREFERENCE', 'primary')]
+moods_read_collection = LazyCollection(mongo, 'moods', read_preference=READ_ONLY_PREFERENCE)
+
+# สร้าง index ที่ทุก route ใช้ (create_index ไม่ทำอะไรถ้ามี index อยู่แล้ว)
+# ไม่เรียกตอน import เพื่อไม่ให้ทุก worker ต้องรอ ใช้ `flask ensure-indexes` ตอน deploy แทน
+def ensure_indexes():
+    # username / email ห้ามซ้ำ (register และ login ค้นหาด้วยฟิลด์เหล่านี้)
+    users_collection.create_index('username', unique=True)
+    try:
+        users_collection.create_index('email', unique=True)
+    except Exception as e:
+        # มี email ซ้ำอยู่แล้วในข้อมูลเก่า ต้องแก้ข้อมูลก่อน
+        print(f"⚠️ Warning: cannot create unique index on users.email. Error: {e}")
+    
+    # บันทึกของผู้ใช้ เรียงตามเวลาที่สร้าง (dashboard, history, edit, export)
+    # มี _id ต่อท้ายเพื่อให้แบ่งหน้าแบบ keyset ได้โดยไม่ต้อง sort ในหน่วยความจำ
+    moods_collection.create_index([('user_id', 1), ('created_at', -1), ('_id', -1)])
+    # กรอง/เรียงตามวันเวลาที่เกิดขึ้น (ปฏิทินในหน้าประวัติ, export ทุกแบบ)
+    # index (user_id, date) เดิมไม่ได้ใช้แล้ว ลบได้หลังรัน `flask backfill-occurred-at`
+    moods_collection.create_index([('user_id', 1), ('occurred_at', 1)])
+    # ค้นหาข้อความใน emotion / trigger / detail ของผู้ใช้ (/api/search)
+    create_search_index(moods_collection)
+    # bucket รายวันของแนวโน้ม อ่านตามช่วงวันของผู้ใช้
+    mood_trends_collection.create_index([('user_id', 1), ('day', 1)])
+    # บันทึกและ tombstone ที่เปลี่ยนหลังเลขลำดับที่ client มี (/api/sync)
+    try:
+        create_sync_indexes(moods_collection, mood_tombstones_collection, SYNC_TOMBSTONE_TTL)
+    except Exception as e:
+        # เปลี่ยน SYNC_TOMBSTONE_TTL_DAYS หลังสร้าง index แล้ว ต้องแก้ index ด้วย collMod
+        print(f"⚠️ Warning: cannot create sync indexes. Error: {e}")
 
 # คลาส User สำหรับ Flask-Login
 class User(UserMixin):
@@ -65,9 +147,131 @@ class User(UserMixin):
         self.username = user_data['username']
         self.email = user_data.get('email', '')
 
+# Cache ข้อมูลผู้ใช้ระดับ process (ปิดไว้เป็นค่าเริ่มต้น ตั้ง USER_CACHE_TTL เป็นวินาทีเพื่อเปิด)
+# แต่ละ worker มี cache ของตัวเอง จึงควรตั้ง TTL สั้นๆ
+user_cache = TTLCache(maxsize=int(os.getenv('USER_CACHE_SIZE', '1024')),
+                      ttl=float(os.getenv('USER_CACHE_TTL', '0')))
+
+# ดึงข้อมูลผู้ใช้ (ค้นหาใน MongoDB ไม่เกินครั้งเดียวต่อ request)
+def get_user_data(user_id):
+    cache = g.setdefault('user_data', {})
+    if user_id not in cache:
+        user_data = user_cache.get(user_id)
+        if user_data is None:
+            user_data = users_collection.find_one({'_id': ObjectId(user_id)})
+            if user_data is not None:
+                user_cache.set(user_id, user_data)
+            g.setdefault('fresh_user_data', set()).add(user_id)
+        cache[user_id] = user_data
+    return cache[user_id]
+
+# ล้าง cache หลังแก้ไขข้อมูลผู้ใช้ (ต้องเรียกทุกครั้งหลัง users_collection.update_one)
+def invalidate_user_data(user_id):
+    g.setdefault('user_data', {}).pop(user_id, None)
+    g.setdefault('data_state', {}).pop(user_id, None)
+    user_cache.invalidate(user_id)
+
+# เพิ่มเลขเวอร์ชันข้อมูลบันทึกของผู้ใช้ (เรียกทุกครั้งที่เพิ่ม/แก้ไข/ลบบันทึก)
+# cache ที่สร้างจากข้อมูลบันทึกใช้เลขนี้เป็นส่วนหนึ่งของ key จึงหมดอายุเองเมื่อข้อมูลเปลี่ยน
+def bump_data_version(user_id):
+    users_collection.update_one({'_id': ObjectId(user_id)},
+                                {'$inc': {'data_version': 1},
+                                 '$set': {'data_modified_at': datetime.now(timezone.utc)}})
+    invalidate_user_data(user_id)
+
+# เวอร์ชันข้อมูลล่าสุดจาก MongoDB (ไม่ใช้ user_cache ที่แยกต่อ worker และอาจเก่ากว่าการแก้ไขจาก worker อื่น)
+# ถ้า request นี้ค้นหาผู้ใช้จาก MongoDB อยู่แล้วก็ใช้ข้อมูลนั้นเลย
+DATA_STATE_PROJECTION = {'data_version': 1, 'data_modified_at': 1}
+
+def get_data_state(user_id):
+    cache = g.setdefault('data_state', {})
+    if user_id not in cache:
+        user_data = get_user_data(user_id) or {}
+        if user_id not in g.get('fresh_user_data', ()):
+            user_data = users_collection.find_one({'_id': ObjectId(user_id)}, DATA_STATE_PROJECTION) or {}
+        cache[user_id] = {
+            'data_version': user_data.get('data_version', 0),
+            'data_modified_at': user_data.get('data_modified_at')
+        }
+    return cache[user_id]
+
+def get_data_version(user_id):
+    return get_data_state(user_id)['data_version']
+
+# Cache ส่วนของหน้าที่ render แล้ว (กราฟในหน้าสถิติ, รายการล่าสุดใน dashboard)
+# FRAGMENT_CACHE_BACKEND: memory (ค่าเริ่มต้น, แยกต่อ worker), file (ใช้ร่วมกันบนเครื่องเดียว),
+# redis (ใช้ร่วมกันทุกเครื่อง ต้องตั้ง REDIS_URL) หรือ none (ปิด)
+# เปลี่ยน FRAGMENT_CACHE_VERSION เมื่อแก้ HTML ในส่วนที่ cache ไว้ เพื่อไม่ให้ใช้ของเก่า
+FRAGMENT_CACHE_VERSION = 2
+
+def create_fragment_backend(name):
+    max_bytes = int(os.getenv('FRAGMENT_CACHE_MAX_MB', '32')) * 1024 * 1024
+    if name == 'none':
+        return None
+    if name == 'file':
+        directory = os.getenv('FRAGMENT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mood_fragments'))
+        return FileFragmentBackend(directory, max_bytes)
+    if name == 'redis':
+        try:
+            import redis
+            return RedisFragmentBackend(redis.Redis.from_url(os.getenv('REDIS_URL', 'redis://localhost:6379/0')))
+        except Exception as e:
+            print(f"⚠️ Warning: redis not available. Using in-memory fragment cache. Error: {e}")
+    return MemoryFragmentBackend(max_bytes)
+
+fragment_cache = FragmentCache(create_fragment_backend(os.getenv('FRAGMENT_CACHE_BACKEND', 'memory')))
+
+# ใช้ใน template: {% call cache_fragment('ชื่อ', ค่าอื่นที่ส่วนนี้ขึ้นอยู่ด้วย) %} ... {% endcall %}
+# key มีเลขเวอร์ชันข้อมูลของผู้ใช้ จึงหมดอายุเองเมื่อเพิ่ม/แก้ไข/ลบบันทึก
+@app.template_global()
+def cache_fragment(name, *vary, caller):
+    if not current_user.is_authenticated:
+        return caller()
+    key = make_cache_key(FRAGMENT_CACHE_VERSION, name, vary, current_user.id, get_data_version(current_user.id))
+    html = fragment_cache.get(key)
+    if html is None:
+        html = str(caller())
+        fragment_cache.set(key, html)
+    return Markup(html)
+
+# ETag / Last-Modified ของหน้าที่แสดงข้อมูลบันทึก (ขึ้นกับเวอร์ชันข้อมูล, ข้อมูลผู้ใช้ที่อยู่ใน layout
+# และ asset_version เพราะหน้าอ้างถึงชื่อไฟล์ bundle ที่เปลี่ยนทุกครั้งที่ build ใหม่)
+def page_validators(name, *vary):
+    user_data = get_user_data(current_user.id) or {}
+    data_state = get_data_state(current_user.id)
+    etag = make_cache_key(
+        FRAGMENT_CACHE_VERSION, asset_version, name, vary, current_user.id,
+        data_state['data_version'],
+        user_data.get('username'),
+        user_data.get('theme'),
+        user_data.get('avatar'),
+        user_data.get('profile_picture')
+    )
+    return etag, data_state['data_modified_at']
+
+# render หน้าแบบมี ETag / Last-Modified ตอบ 304 ทันทีถ้าเบราว์เซอร์มีหน้าล่าสุดอยู่แล้ว
+# หน้าที่มีข้อความ flash รอแสดงจะ render ใหม่เสมอ และไม่ส่ง validator
+# (ไม่งั้นเบราว์เซอร์จะเก็บหน้าที่มีข้อความนั้นไว้ใช้ซ้ำ)
+def conditional_page(etag, last_modified, render):
+    if session.get('_flashes'):
+        return make_response(render())
+
+    response = make_response('')
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.make_conditional(request)
+    if response.status_code == 304:
+        return response
+
+    response.set_data(render())
+    return response
+
 @login_manager.user_loader
 def load_user(user_id):
-    user_data = users_collection.find_one({'_id': ObjectId(user_id)})
+    user_data = get_user_data(user_id)
     if user_data:
         return User(user_data)
     return None
@@ -76,14 +280,185 @@ def load_user(user_id):
 @app.context_processor
 def inject_user_data():
     if current_user.is_authenticated:
-        user_data = users_collection.find_one({'_id': ObjectId(current_user.id)})
-        return {'user_full_data': user_data}
+        return {'user_full_data': get_user_data(current_user.id)}
     return {'user_full_data': None}
 
 # ฟังก์ชันตรวจสอบไฟล์
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+# URL ของรูปโปรไฟล์ (size: 'sm' หรือ 'lg', fmt: 'jpg' หรือ 'webp')
+# ผู้ใช้ที่อัพโหลดก่อนมีการย่อรูปจะได้ไฟล์ต้นฉบับเดิม
+@app.template_global()
+def avatar_url(user_data, size, fmt='jpg'):
+    if not user_data:
+        return None
+    if user_data.get('avatar') and AVATAR_PROCESSING:
+        return url_for('avatar_file', filename=avatar_filename(user_data['avatar'], size, fmt))
+    if user_data.get('profile_picture'):
+        return url_for('static', filename='uploads/profiles/' + user_data['profile_picture'])
+    return None
+
+# ลบไฟล์รูปโปรไฟล์ทั้งหมดของผู้ใช้ (ทั้งแบบย่อรูปและไฟล์ต้นฉบับแบบเดิม)
+def remove_profile_picture_files(user_data):
+    if user_data.get('avatar') and AVATAR_PROCESSING:
+        remove_avatar(app.config['UPLOAD_FOLDER'], user_data['avatar'])
+    old_picture = user_data.get('profile_picture')
+    if old_picture:
+        old_path = os.path.join(app.config['UPLOAD_FOLDER'], old_picture)
+        if os.path.exists(old_path):
+            os.remove(old_path)
+
+# ส่งรูปโปรไฟล์ ชื่อไฟล์มาจาก hash ของเนื้อหา จึง cache ได้ 1 ปีแบบ immutable
+@app.route('/avatars/<path:filename>')
+def avatar_file(filename):
+    response = send_from_directory(app.config['UPLOAD_FOLDER'], filename, max_age=AVATAR_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
+
+# manifest ของ asset ที่ build แล้ว ถ้ายังไม่ได้ build (ตอนพัฒนา) จะส่งไฟล์ต้นฉบับจาก assets/ แทน
+asset_manifest = load_manifest(app.config['ASSET_DIST_DIR'])
+if asset_manifest is None:
+    print("⚠️ Warning: static/dist/manifest.json not found. Serving unbuilt assets (run `flask build-assets`).")
+    asset_manifest = {}
+asset_version = make_cache_key(asset_manifest)
+
+# URL ของ bundle CSS/JS (ชื่อตาม BUNDLES ใน asset_pipeline.py เช่น 'base.css')
+@app.template_global()
+def asset_url(name):
+    if name in asset_manifest:
+        return url_for('asset_file', filename=asset_manifest[name])
+    return url_for('asset_source', name=name)
+
+# URL ของ library ภายนอก ใช้ไฟล์ในเครื่องถ้า vendor ไว้แล้ว ไม่เช่นนั้นใช้ CDN
+@app.template_global()
+def vendor_url(name):
+    package = VENDOR_PACKAGES[name]
+    path = vendor_path(package, package.entry)
+    if path in asset_manifest:
+        return url_for('asset_file', filename=asset_manifest[path])
+    return package.cdn_base + package.entry
+
+# ส่งไฟล์ใน static/dist เลือกไฟล์ .br / .gz ที่บีบอัดไว้ตาม Accept-Encoding ของเบราว์เซอร์
+@app.route('/assets/<path:filename>')
+def asset_file(filename):
+    served, encoding = precompressed_file(app.config['ASSET_DIST_DIR'], filename, request.accept_encodings.quality)
+    response = send_from_directory(app.config['ASSET_DIST_DIR'], served,
+                                   mimetype=mimetypes.guess_type(filename)[0], max_age=ASSET_MAX_AGE)
+    if encoding is not None:
+        response.content_encoding = encoding
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+# ส่ง bundle จากไฟล์ต้นฉบับ (เฉพาะตอนยังไม่ได้ build) ไม่ให้ cache เพราะชื่อไม่เปลี่ยนตามเนื้อหา
+@app.route('/assets-src/<name>')
+def asset_source(name):
+    try:
+        data = bundle_content(ASSETS_SOURCE_DIR, name)
+    except (KeyError, OSError):
+        return Response('not found\n', status=404, content_type='text/plain; charset=utf-8')
+    response = Response(data, mimetype=mimetypes.guess_type(name)[0])
+    response.cache_control.no_cache = True
+    return response
+
+# วัดเวลาของทุก request
+# จบการวัดใน teardown เพื่อให้ response แบบ stream_with_context นับรวมเวลาส่งข้อมูลจนจบ
+@app.before_request
+def start_request_metrics():
+    metrics.start_request(request.endpoint or 'unmatched', request.method, request.path)
+
+@app.after_request
+def record_response_status(response):
+    trace = metrics.current()
+    if trace is not None:
+        trace.status = response.status_code
+    return response
+
+# บีบอัด HTML/JSON ที่สร้างตอน request ด้วย gzip (ไฟล์ static และ response แบบ stream ส่งตามเดิม)
+# ETag ของเนื้อหาที่บีบอัดเปลี่ยนเป็น weak ETag (byte ไม่ตรงกับต้นฉบับ แต่เนื้อหาเหมือนกัน)
+@app.after_request
+def compress_response(response):
+    if (COMPRESS_MIN_BYTES <= 0
+            or response.direct_passthrough
+            or response.is_streamed
+            or response.status_code < 200 or response.status_code in (204, 304)
+            or response.mimetype not in COMPRESS_MIMETYPES
+            or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    if request.accept_encodings.quality('gzip') <= 0:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=COMPRESS_LEVEL))
+    response.content_encoding = 'gzip'
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+@app.teardown_request
+def finish_request_metrics(error=None):
+    metrics.finish_request()
+
+@before_render_template.connect_via(app)
+def start_template_metrics(sender, template, context, **extra):
+    metrics.template_started(template.name)
+
+@template_rendered.connect_via(app)
+def finish_template_metrics(sender, template, context, **extra):
+    metrics.template_finished(template.name)
+
+# metric ของส่วนอื่นที่มีตัวนับของตัวเองอยู่แล้ว
+def collect_component_metrics(out):
+    pool = mongo.pool_listener.snapshot() if mongo.pool_listener else {}
+    out.gauge('mongo_pool_connections', 'Open and in-use MongoDB connections in this worker.',
+              ('state',), [(('open',), pool.get('open', 0)), (('in_use',), pool.get('in_use', 0))])
+    out.counter('mongo_pool_checkout_failures_total', 'Failed connection checkouts.',
+                (), [((), pool.get('checkout_failed', 0))])
+
+    hasher = password_hasher.stats()
+    out.histogram('password_hash_seconds', 'bcrypt time by operation.', ('operation',), [
+        (('wait',), hasher['wait_seconds']),
+        (('hash',), hasher['hash_seconds']),
+        (('check',), hasher['check_seconds'])
+    ])
+    out.counter('password_hash_rejected_total', 'Password hashing requests rejected because the pool was full.',
+                (), [((), hasher['rejected'])])
+
+    exports = export_queue.stats()
+    out.histogram('pdf_render_seconds', 'PDF render time per export job.', (), [((), exports['render_seconds'])])
+    out.gauge('pdf_export_pending', 'Export jobs queued or running in this worker.', (), [((), exports['pending'])])
+    out.counter('pdf_export_failures_total', 'Export jobs that failed.', (), [((), exports['failed'])])
+
+    cache = pdf_cache.stats()
+    out.counter('pdf_cache_requests_total', 'PDF cache lookups by result.', ('result',),
+                [(('hit',), cache['hits']), (('miss',), cache['misses'])])
+
+    fragments = fragment_cache.stats()
+    out.counter('fragment_cache_requests_total', 'Template fragment cache lookups by result.', ('result',),
+                [(('hit',), fragments['hits']), (('miss',), fragments['misses']), (('error',), fragments['errors'])])
+
+metrics.add_collector(collect_component_metrics)
+
+# ค่าทั้งหมดเป็นของ worker ที่ตอบ request นี้เท่านั้น
+# ถ้าตั้ง METRICS_TOKEN ไว้ ต้องส่ง header Authorization: Bearer <token>
+@app.route('/metrics')
+def metrics_endpoint():
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return Response('unauthorized\n', status=401, content_type='text/plain; charset=utf-8')
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+# ตรวจสอบสถานะระบบ (สำหรับ load balancer / monitoring)
+@app.route('/healthz')
+def healthz():
+    health = mongo.health()
+    return jsonify(health), 200 if health['ok'] else 503
+
 # หน้าแรก - redirect ไปหน้า login
 @app.route('/')
 def index():
@@ -131,7 +506,11 @@ def register():
             return render_template('register.html')
         
         # เข้ารหัสรหัสผ่าน
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
+        try:
+            hashed_password = password_hasher.hash(password)
+        except PasswordHasherBusy as e:
+            flash(str(e), 'error')
+            return render_template('register.html'), 503
         
         # สร้างผู้ใช้ใหม่
         user_data = {
@@ -169,7 +548,24 @@ def login():
         # หาผู้ใช้ใน Database
         user_data = users_collection.find_one({'username': username})
         
-        if user_data and bcrypt.checkpw(password.encode('utf-8'), user_data['password']):
+        try:
+            password_ok = user_data is not None and password_hasher.verify(password, user_data['password'])
+        except PasswordHasherBusy as e:
+            flash(str(e), 'error')
+            return render_template('login.html'), 503
+        
+        if password_ok:
+            # เปลี่ยน work factor แล้ว เข้ารหัสใหม่ด้วยค่าปัจจุบัน
+            if password_hasher.needs_rehash(user_data['password']):
+                try:
+                    users_collection.update_one(
+                        {'_id': user_data['_id']},
+                        {'$set': {'password': password_hasher.hash(password)}}
+                    )
+                    invalidate_user_data(str(user_data['_id']))
+                except PasswordHasherBusy:
+                    pass  # ไว้ทำครั้งหน้า
+            
             # Login สำเร็จ
             user = User(user_data)
             login_user(user, remember=True)
@@ -192,96 +588,344 @@ def logout():
     flash('ออกจากระบบเรียบร้อย', 'success')
     return redirect(url_for('login'))
 
+# จำนวนรายการต่อหน้าใน Dashboard
+DASHBOARD_PAGE_SIZE = 5
+
+# ฟิลด์ที่ Dashboard แสดงผล
+MOOD_LIST_PROJECTION = {'date': 1, 'time': 1, 'color': 1, 'trigger': 1, 'emotion': 1, 'detail': 1, 'created_at': 1, 'occurred_at': 1}
+
+# แปลงบันทึกเป็น dict ที่ JSON serialize ได้
+def mood_to_json(mood):
+    return {
+        'id': str(mood['_id']),
+        'date': mood.get('date', ''),
+        'time': mood.get('time', ''),
+        'color': mood.get('color', ''),
+        'trigger': mood.get('trigger', ''),
+        'emotion': mood.get('emotion', ''),
+        'detail': mood.get('detail', '')
+    }
+
+# ดึงบันทึกทีละหน้าแบบ keyset (ใหม่สุดก่อน)
+# cursor คือ "<created_at>_<_id>" ของรายการสุดท้ายในหน้าก่อนหน้า
+def fetch_mood_page(user_id, cursor=None, limit=DASHBOARD_PAGE_SIZE):
+    query = {'user_id': user_id}
+    if cursor:
+        created_at, last_id = cursor.rsplit('_', 1)
+        created_at = datetime.fromisoformat(created_at)
+        query['$or'] = [
+            {'created_at': {'$lt': created_at}},
+            {'created_at': created_at, '_id': {'$lt': ObjectId(last_id)}}
+        ]
+    
+    moods = list(moods_collection.find(query, MOOD_LIST_PROJECTION)
+                 .sort([('created_at', -1), ('_id', -1)])
+                 .limit(limit + 1))
+    
+    next_cursor = None
+    if len(moods) > limit:
+        moods = moods[:limit]
+        last = moods[-1]
+        next_cursor = f"{last['created_at'].isoformat()}_{last['_id']}"
+    return moods, next_cursor
+
 # หน้า Dashboard (ต้อง Login ก่อน)
 @app.route('/dashboard')
 @login_required
 def dashboard():
-    # ดึงเฉพาะข้อมูลของผู้ใช้คนนี้
-    moods = list(moods_collection.find({'user_id': current_user.id}).sort('created_at', -1))
-    return render_template('dashboard.html', moods=moods, active_page='dashboard')
+    return render_template('dashboard.html', load_recent_moods=partial(recent_moods_panel, current_user.id),
+                           active_page='dashboard')
+
+# ข้อมูลของส่วนรายการล่าสุดใน dashboard: หน้าแรกของผู้ใช้คนนี้ + จำนวนทั้งหมด
+# template เรียกเฉพาะตอนที่ส่วนนี้ยังไม่มีใน fragment cache
+def recent_moods_panel(user_id):
+    moods, next_cursor = fetch_mood_page(user_id)
+    total_moods = moods_collection.count_documents({'user_id': user_id})
+    return moods, next_cursor, total_moods
+
+# โหลดบันทึกหน้าถัดไป (JSON) สำหรับปุ่ม "โหลดเพิ่ม"
+@app.route('/api/moods')
+@login_required
+def api_moods():
+    try:
+        moods, next_cursor = fetch_mood_page(current_user.id, request.args.get('cursor'))
+    except Exception:
+        return jsonify({'error': 'cursor ไม่ถูกต้อง'}), 400
+    return jsonify({'moods': [mood_to_json(m) for m in moods], 'next_cursor': next_cursor})
+
+# ค้นหาบันทึกจากข้อความใน emotion / trigger / detail (รองรับภาษาไทย)
+# ?q=ข้อความ&page=1 เรียงตามความตรง แล้วตามวันเวลาที่เกิดขึ้นล่าสุด
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE = 50
+
+@app.route('/api/search')
+@login_required
+def api_search():
+    text = request.args.get('q', '').strip()
+    try:
+        page = int(request.args.get('page', '1'))
+    except ValueError:
+        page = 0
+    if page < 1 or page > SEARCH_MAX_PAGE:
+        return jsonify({'error': f'page ต้องอยู่ระหว่าง 1 ถึง {SEARCH_MAX_PAGE}'}), 400
+    if not text:
+        return jsonify({'error': 'กรุณาระบุข้อความที่ต้องการค้นหา (q)'}), 400
+    
+    # ดึงเกิน 1 รายการเพื่อดูว่ามีหน้าถัดไปหรือไม่
+    moods = search_moods(moods_read_collection, current_user.id, text, MOOD_LIST_PROJECTION,
+                         skip=(page - 1) * SEARCH_PAGE_SIZE, limit=SEARCH_PAGE_SIZE + 1)
+    results = [{**mood_to_json(mood), 'score': round(mood.get('score', 0), 3)}
+               for mood in moods[:SEARCH_PAGE_SIZE]]
+    return jsonify({
+        'q': text,
+        'page': page,
+        'results': results,
+        'has_more': len(moods) > SEARCH_PAGE_SIZE and page < SEARCH_MAX_PAGE
+    })
+
+# บันทึกที่เพิ่ม/แก้ไข/ลบหลัง token ที่ client ได้ครั้งก่อน (สำหรับแอปที่เก็บสำเนาไว้ในเครื่อง)
+# ไม่ส่ง since = โหลดทั้งหมด ถ้า has_more เป็น true ให้เรียกซ้ำด้วย token ใหม่จนครบ
+# token ที่เก่ากว่าอายุของ tombstone ได้ 410 (ต้องลบสำเนาแล้วโหลดใหม่ทั้งหมด)
+# อ่านจาก primary เสมอ (secondary ที่ตามไม่ทันจะทำให้ token ข้ามการเปลี่ยนแปลงไป)
+SYNC_PAGE_SIZE = 500
+
+@app.route('/api/sync')
+@login_required
+def api_sync():
+    try:
+        since, synced_at = parse_token(request.args.get('since', ''), SYNC_TOMBSTONE_TTL)
+    except SyncTokenError:
+        return jsonify({'error': 'since ไม่ถูกต้อง'}), 400
+    except SyncTokenExpired:
+        return jsonify({'error': 'token หมดอายุ กรุณาโหลดข้อมูลใหม่ทั้งหมด', 'reset': True}), 410
+    
+    # เวลาก่อน query: การลบที่เกิดหลังจากนี้จะมาในรอบถัดไป
+    now = time.time()
+    # ส่งไม่เกินเลขก่อนการเขียนที่ยังไม่เสร็จ (token จะไม่ข้ามการเปลี่ยนแปลงที่กำลังเขียน)
+    until, writing = sync_horizon(users_collection, current_user.id)
+    moods, deleted, last_seq, has_more = fetch_changes(moods_collection, mood_tombstones_collection,
+                                                       current_user.id, since, until, MOOD_LIST_PROJECTION,
+                                                       SYNC_PAGE_SIZE)
+    # ยังไม่ครบ: เก็บเวลาเดิมไว้ (tombstone ที่ยังไม่ได้รับอาจเก่ากว่าตอนนี้)
+    complete = not has_more and not writing
+    response = jsonify({
+        'moods': [mood_to_json(mood) for mood in moods],
+        'deleted': deleted,
+        'token': make_token(last_seq, now if complete else synced_at),
+        'has_more': has_more
+    })
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
 
 # หน้าประวัติรายการ (Calendar)
+# ข้อมูลแต่ละเดือนโหลดผ่าน /api/history เมื่อเปิดดูเดือนนั้น
 @app.route('/history')
 @login_required
 def history():
-    moods = list(moods_collection.find({'user_id': current_user.id}).sort('created_at', -1))
+    return render_template('history.html', active_page='history')
+
+# บันทึกของเดือนที่เลือก จัดกลุ่มตามวันแล้ว (สำหรับปฏิทินในหน้าประวัติ)
+@app.route('/api/history')
+@login_required
+def api_history():
+    try:
+        month_start = datetime.strptime(request.args.get('month', ''), '%Y-%m')
+    except ValueError:
+        return jsonify({'error': 'month ต้องอยู่ในรูปแบบ YYYY-MM'}), 400
     
-    # แปลง ObjectId เป็น string เพื่อให้ JSON serialize ได้
-    moods_json = []
+    month_start, next_month = month_window(month_start)
+    
+    # ค้นหาเฉพาะช่วงเดือนนั้นด้วย index (user_id, occurred_at)
+    moods = moods_read_collection.find({
+        'user_id': current_user.id,
+        'occurred_at': {'$gte': month_start, '$lt': next_month}
+    }, MOOD_LIST_PROJECTION).sort('occurred_at', 1)
+    
+    # จัดกลุ่มด้วยวันที่จาก occurred_at (YYYY-MM-DD เสมอ แม้ข้อความ date เดิมจะไม่เติม 0)
+    days = {}
     for mood in moods:
-        mood_dict = {
-            'id': str(mood['_id']),
-            'date': mood.get('date', ''),
-            'time': mood.get('time', ''),
-            'color': mood.get('color', ''),
-            'trigger': mood.get('trigger', ''),
-            'emotion': mood.get('emotion', ''),
-            'detail': mood.get('detail', '')
-        }
-        moods_json.append(mood_dict)
+        days.setdefault(mood['occurred_at'].strftime('%Y-%m-%d'), []).append(mood_to_json(mood))
     
-    return render_template('history.html', moods=moods_json, active_page='history')
+    # ETag จากเนื้อหา ถ้าไม่มีอะไรเปลี่ยนเบราว์เซอร์จะได้ 304
+    response = jsonify({'month': month_start.strftime('%Y-%m'), 'days': days})
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
 
 # หน้าสถิติ
 @app.route('/statistics')
 @login_required
 def statistics():
-    moods = list(moods_collection.find({'user_id': current_user.id}))
+    def render():
+        # อ่านสถิติจาก rollup (document เดียว ไม่ขึ้นกับจำนวนบันทึก)
+        stats = get_user_stats(moods_collection, mood_stats_collection, current_user.id)
+        return render_template('statistics.html',
+                               **stats,
+                               active_page='statistics',
+                               pdf_enabled=PDF_ENABLED)
+
+    etag, last_modified = page_validators('statistics')
+    return conditional_page(etag, last_modified, render)
+
+# แนวโน้มจำนวนบันทึกแยกสี/อารมณ์ ต่อวัน สัปดาห์ (เริ่มวันจันทร์) หรือเดือน
+# ?granularity=day|week|month&start=YYYY-MM-DD&end=YYYY-MM-DD (ค่าเริ่มต้น 365 วันล่าสุด, รวมวัน end)
+@app.route('/api/trends')
+@login_required
+def api_trends():
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        return jsonify({'error': 'granularity ต้องเป็น day, week หรือ month'}), 400
     
-    # คำนวณสถิติ
-    total_moods = len(moods)
+    try:
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        end = parse_date(request.args['end']) if request.args.get('end') else today
+        start = parse_date(request.args['start']) if request.args.get('start') else end - timedelta(days=364)
+    except ValueError:
+        return jsonify({'error': 'start/end ต้องอยู่ในรูปแบบ YYYY-MM-DD'}), 400
+    if start > end:
+        return jsonify({'error': 'start ต้องไม่เกิน end'}), 400
     
-    # นับตามสี
-    color_stats = {
-        'แดง': len([m for m in moods if m.get('color') == 'แดง']),
-        'เหลือง': len([m for m in moods if m.get('color') == 'เหลือง']),
-        'น้ำเงิน': len([m for m in moods if m.get('color') == 'น้ำเงิน']),
-        'เขียว': len([m for m in moods if m.get('color') == 'เขียว'])
-    }
+    buckets = get_trends(moods_collection, mood_trends_collection, current_user.id,
+                         granularity, start, end + timedelta(days=1))
     
-    # รวม triggers ตามสี
-    color_triggers = {
-        'แดง': {},
-        'เหลือง': {},
-        'น้ำเงิน': {},
-        'เขียว': {}
-    }
+    response = jsonify({
+        'granularity': granularity,
+        'start': start.strftime('%Y-%m-%d'),
+        'end': end.strftime('%Y-%m-%d'),
+        'buckets': buckets
+    })
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+# ตั้งค่า wkhtmltopdf สำหรับภาษาไทย
+# ขนาดหน้า/ขอบต้องตรงกับ @page ใน pdf_template.html (ที่ WeasyPrint ใช้)
+# ปิด smart shrinking ให้ 1px เท่ากับ 1/96 นิ้วแบบเดียวกับ WeasyPrint
+PDF_OPTIONS = {
+    'encoding': 'UTF-8',
+    'page-size': 'A4',
+    'margin-top': '15mm',
+    'margin-right': '15mm',
+    'margin-bottom': '15mm',
+    'margin-left': '15mm',
+    'no-outline': None,
+    'disable-smart-shrinking': None,
+    'enable-local-file-access': None
+}
+
+# ตัวแปลง PDF: PDF_RENDERER=auto (wkhtmltopdf ถ้ามี ไม่เช่นนั้น WeasyPrint), wkhtmltopdf หรือ weasyprint
+# ตรวจแค่ว่ามีติดตั้งไว้ ตัวแปลงจริงโหลดใน process ที่แปลง PDF
+pdf_renderer = create_renderer(os.getenv('PDF_RENDERER', 'auto'),
+                               wkhtmltopdf=os.getenv('WKHTMLTOPDF_PATH'),
+                               options=PDF_OPTIONS)
+PDF_ENABLED = pdf_renderer is not None
+if not PDF_ENABLED:
+    print("⚠️ Warning: no PDF renderer available (install wkhtmltopdf or WeasyPrint). PDF export disabled.")
+
+# คิวงาน Export PDF (แปลงใน process pool แยก ไม่บล็อก worker ที่รับ request)
+# แต่ละ process ใน pool โหลดตัวแปลงครั้งเดียวแล้วใช้ต่อ จนทำครบ EXPORT_WORKER_MAX_TASKS งาน
+# pool เป็นของแต่ละ gunicorn worker: EXPORT_WORKERS x จำนวน worker = จำนวน process แปลง PDF ทั้งเครื่อง
+# (gunicorn.conf.py ตั้งค่าเริ่มต้นตามจำนวน CPU ของเครื่อง)
+app.config['EXPORT_SPOOL_DIR'] = os.getenv('EXPORT_SPOOL_DIR', os.path.join(tempfile.gettempdir(), 'mood_exports'))
+export_queue = ExportJobQueue(
+    app.config['EXPORT_SPOOL_DIR'],
+    pdf_renderer,
+    max_workers=int(os.getenv('EXPORT_WORKERS', '1')),
+    max_pending=int(os.getenv('EXPORT_MAX_PENDING', '8')),
+    max_pending_per_user=int(os.getenv('EXPORT_MAX_PENDING_PER_USER', '1')),
+    ttl=int(os.getenv('EXPORT_TTL', '3600')),
+    warm_up=pdf_renderer.warm_up if pdf_renderer else None,
+    max_tasks_per_worker=int(os.getenv('EXPORT_WORKER_MAX_TASKS', '200')) or None,
+    job_timeout=int(os.getenv('EXPORT_JOB_TIMEOUT', '600'))
+)
+
+# เริ่ม process แปลง PDF ไว้ก่อนมีงานแรก (เรียกจาก gunicorn post_worker_init)
+# ปิดไว้เป็นค่าเริ่มต้น: ทุก worker จะเปิด process ค้างไว้ตลอด (เครื่องหน่วยความจำน้อยอย่าง free plan ไม่พอ)
+# ถ้าไม่ prewarm process จะเริ่มเมื่อมีงานแรก
+def prewarm_pdf_renderers():
+    if PDF_ENABLED and os.getenv('EXPORT_PREWARM', 'false').lower() in ('1', 'true', 'yes'):
+        export_queue.prewarm()
+
+# จำนวนรายการที่อ่านจาก MongoDB ต่อ batch ตอน Export รายการทั้งหมด
+EXPORT_BATCH_SIZE = 500
+
+# Cache ไฟล์ PDF ที่สร้างแล้ว (key จากข้อมูลที่ใช้สร้างรายงาน ไม่ใช่ตัว HTML)
+# เปลี่ยน PDF_CACHE_VERSION เมื่อแก้ pdf_template.html เพื่อไม่ให้ใช้ไฟล์เก่า
+PDF_CACHE_VERSION = 2
+app.config['PDF_CACHE_DIR'] = os.getenv('PDF_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'mood_pdf_cache'))
+pdf_cache = FileLRUCache(app.config['PDF_CACHE_DIR'],
+                         max_bytes=int(os.getenv('PDF_CACHE_MAX_MB', '200')) * 1024 * 1024,
+                         suffix='.pdf')
+
+def pdf_cache_key(report, filters=None):
+    # export_date ปัดเป็นรายวัน รายงานที่ export ซ้ำในวันเดียวกันจึงใช้ไฟล์เดิมได้
+    return make_cache_key(
+        PDF_CACHE_VERSION,
+        pdf_renderer.name,
+        report,
+        filters,
+        current_user.id,
+        current_user.username,
+        get_data_version(current_user.id),
+        datetime.now().strftime('%Y-%m-%d')
+    )
+
+# ส่ง PDF จาก cache ทันทีถ้ามี (คืนค่า None ถ้าไม่มี)
+# fetch ที่ขอ JSON ได้ JSON แบบเดียวกับสถานะงานที่เสร็จแล้ว (download_url = URL เดิม ซึ่งตอนนี้ได้ไฟล์จาก cache)
+def cached_pdf_response(cache_key, filename):
+    path = pdf_cache.get(cache_key)
+    if path is None:
+        return None
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'job_id': None, 'status': 'done', 'error': None, 'download_url': request.full_path})
+    return send_file(path, mimetype='application/pdf', as_attachment=True, download_name=filename)
+
+# ส่ง HTML เข้าคิว แล้วตอบกลับด้วย job id
+# (fetch ที่ขอ JSON ได้ 202 + job id, ลิงก์ปกติจะกลับไปหน้าสถิติที่รอดาวน์โหลดให้)
+# เมื่อสร้างเสร็จจะเก็บไฟล์ไว้ใน cache ด้วย cache_key
+def enqueue_pdf_export(html, filename, cache_key=None):
+    wants_json = request.accept_mimetypes.best == 'application/json'
+    on_success = partial(pdf_cache.put, cache_key) if cache_key else None
+    try:
+        job_id = export_queue.submit(current_user.id, html, filename, on_success=on_success)
+    except ExportQueueFull as e:
+        if wants_json:
+            return jsonify({'error': str(e)}), 429
+        flash(f'⚠️ {e}', 'error')
+        return redirect(url_for('statistics'))
     
-    for mood in moods:
-        color = mood.get('color', '')
-        trigger = mood.get('trigger', 'ไม่ระบุ')
-        
-        if color in color_triggers:
-            if trigger in color_triggers[color]:
-                color_triggers[color][trigger] += 1
-            else:
-                color_triggers[color][trigger] = 1
-    
-    # จัดเรียง triggers ตามจำนวน (Top 5 ต่อสี)
-    for color in color_triggers:
-        sorted_triggers = sorted(
-            color_triggers[color].items(), 
-            key=lambda x: x[1], 
-            reverse=True
-        )[:5]
-        color_triggers[color] = dict(sorted_triggers)
-    
-    # นับตามอารมณ์ (Top 10)
-    emotions = [m.get('emotion', '') for m in moods if m.get('emotion')]
-    emotion_stats = dict(Counter(emotions).most_common(10))
-    
-    # นับตามสิ่งกระตุ้น (Top 10)
-    triggers = [m.get('trigger', '') for m in moods if m.get('trigger')]
-    trigger_stats = dict(Counter(triggers).most_common(10))
-    
-    return render_template('statistics.html', 
-                         total_moods=total_moods,
-                         color_stats=color_stats,
-                         color_triggers=color_triggers,
-                         emotion_stats=emotion_stats,
-                         trigger_stats=trigger_stats,
-                         active_page='statistics',
-                         pdf_enabled=PDF_ENABLED)
+    if wants_json:
+        return jsonify({
+            'job_id': job_id,
+            'status_url': url_for('export_job_status', job_id=job_id),
+            'download_url': url_for('export_job_download', job_id=job_id)
+        }), 202
+    return redirect(url_for('statistics', export_job=job_id))
+
+# สถานะงาน Export
+@app.route('/export-jobs/<job_id>')
+@login_required
+def export_job_status(job_id):
+    job = export_queue.status(job_id, current_user.id)
+    if job is None:
+        return jsonify({'error': 'ไม่พบงาน Export'}), 404
+    return jsonify({
+        'job_id': job_id,
+        'status': job['status'],
+        'error': job['error'],
+        'download_url': url_for('export_job_download', job_id=job_id) if job['status'] == 'done' else None
+    })
+
+# ดาวน์โหลด PDF ที่สร้างเสร็จแล้ว
+@app.route('/export-jobs/<job_id>/download')
+@login_required
+def export_job_download(job_id):
+    job = export_queue.status(job_id, current_user.id)
+    if job is None or job['status'] != 'done':
+        flash('❌ ไม่พบไฟล์ PDF หรือไฟล์หมดอายุแล้ว', 'error')
+        return redirect(url_for('statistics'))
+    return send_file(export_queue.pdf_path(job_id), mimetype='application/pdf',
+                     as_attachment=True, download_name=job['filename'])
 
 # Export PDF
 @app.route('/export-pdf')
@@ -292,55 +936,30 @@ def export_pdf():
         return redirect(url_for('statistics'))
     
     try:
-        moods = list(moods_collection.find({'user_id': current_user.id}))
-        user_data = users_collection.find_one({'_id': ObjectId(current_user.id)})
-        
-        # คำนวณสถิติ
-        total_moods = len(moods)
-        color_stats = {
-            'แดง': len([m for m in moods if m.get('color') == 'แดง']),
-            'เหลือง': len([m for m in moods if m.get('color') == 'เหลือง']),
-            'น้ำเงิน': len([m for m in moods if m.get('color') == 'น้ำเงิน']),
-            'เขียว': len([m for m in moods if m.get('color') == 'เขียว'])
-        }
+        filename = f'mood_statistics_{current_user.username}.pdf'
+        cache_key = pdf_cache_key('statistics')
+        cached = cached_pdf_response(cache_key, filename)
+        if cached:
+            return cached
         
-        emotions = [m.get('emotion', '') for m in moods if m.get('emotion')]
-        emotion_stats = dict(Counter(emotions).most_common(10))
+        user_data = get_user_data(current_user.id)
         
-        triggers = [m.get('trigger', '') for m in moods if m.get('trigger')]
-        trigger_stats = dict(Counter(triggers).most_common(10))
+        # อ่านสถิติจาก rollup
+        stats = get_user_stats(moods_collection, mood_stats_collection, current_user.id)
         
         # Render HTML (เฉพาะสถิติ)
         html = render_template('pdf_template.html',
                               username=user_data.get('username', ''),
-                              total_moods=total_moods,
-                              color_stats=color_stats,
-                              emotion_stats=emotion_stats,
-                              trigger_stats=trigger_stats,
+                              total_moods=stats['total_moods'],
+                              color_stats=stats['color_stats'],
+                              emotion_stats=stats['emotion_stats'],
+                              trigger_stats=stats['trigger_stats'],
                               export_date=datetime.now().strftime('%d/%m/%Y %H:%M'),
                               include_all_entries=False,  # ไม่รวมรายการทั้งหมด
                               moods=None)
         
-        # ตั้งค่า wkhtmltopdf สำหรับภาษาไทย
-        options = {
-            'encoding': 'UTF-8',
-            'page-size': 'A4',
-            'margin-top': '15mm',
-            'margin-right': '15mm',
-            'margin-bottom': '15mm',
-            'margin-left': '15mm',
-            'no-outline': None,
-            'enable-local-file-access': None
-        }
-        
-        # แปลงเป็น PDF
-        pdf = pdfkit.from_string(html, False, configuration=pdfkit_config, options=options)
-        
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=mood_statistics_{current_user.username}.pdf'
-        
-        return response
+        # ส่งเข้าคิวแปลงเป็น PDF
+        return enqueue_pdf_export(html, filename, cache_key)
     except Exception as e:
         print(f"PDF Export Error: {e}")
         flash(f'❌ ไม่สามารถสร้าง PDF ได้: {str(e)}', 'error')
@@ -355,60 +974,61 @@ def export_pdf_full():
         return redirect(url_for('statistics'))
     
     try:
-        moods = list(moods_collection.find({'user_id': current_user.id}).sort('created_at', -1))
-        user_data = users_collection.find_one({'_id': ObjectId(current_user.id)})
-        
-        # คำนวณสถิติ
-        total_moods = len(moods)
-        color_stats = {
-            'แดง': len([m for m in moods if m.get('color') == 'แดง']),
-            'เหลือง': len([m for m in moods if m.get('color') == 'เหลือง']),
-            'น้ำเงิน': len([m for m in moods if m.get('color') == 'น้ำเงิน']),
-            'เขียว': len([m for m in moods if m.get('color') == 'เขียว'])
-        }
+        filename = f'mood_full_report_{current_user.username}.pdf'
+        cache_key = pdf_cache_key('full')
+        cached = cached_pdf_response(cache_key, filename)
+        if cached:
+            return cached
         
-        emotions = [m.get('emotion', '') for m in moods if m.get('emotion')]
-        emotion_stats = dict(Counter(emotions).most_common(10))
-        
-        triggers = [m.get('trigger', '') for m in moods if m.get('trigger')]
-        trigger_stats = dict(Counter(triggers).most_common(10))
-        
-        # Render HTML (รวมรายการทั้งหมด)
-        html = render_template('pdf_template.html',
-                              username=user_data.get('username', ''),
-                              total_moods=total_moods,
-                              color_stats=color_stats,
-                              emotion_stats=emotion_stats,
-                              trigger_stats=trigger_stats,
-                              export_date=datetime.now().strftime('%d/%m/%Y %H:%M'),
-                              include_all_entries=True,  # รวมรายการทั้งหมด
-                              moods=moods)
-        
-        # ตั้งค่า wkhtmltopdf สำหรับภาษาไทย
-        options = {
-            'encoding': 'UTF-8',
-            'page-size': 'A4',
-            'margin-top': '15mm',
-            'margin-right': '15mm',
-            'margin-bottom': '15mm',
-            'margin-left': '15mm',
-            'no-outline': None,
-            'enable-local-file-access': None
-        }
+        user_data = get_user_data(current_user.id)
         
-        # แปลงเป็น PDF
-        pdf = pdfkit.from_string(html, False, configuration=pdfkit_config, options=options)
+        # สถิติอ่านจาก rollup ส่วนรายการอ่านจาก cursor ทีละ batch
+        # (ไม่โหลดประวัติทั้งหมดเข้าหน่วยความจำ)
+        stats = get_user_stats(moods_collection, mood_stats_collection, current_user.id)
+        moods = (moods_read_collection.find({'user_id': current_user.id}, MOOD_LIST_PROJECTION)
+                 .sort('occurred_at', -1)
+                 .batch_size(EXPORT_BATCH_SIZE))
         
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=mood_full_report_{current_user.username}.pdf'
+        # Render HTML แบบ stream (รวมรายการทั้งหมด) แล้วเขียนลงไฟล์ทีละส่วน
+        html = stream_template('pdf_template.html',
+                               username=user_data.get('username', ''),
+                               total_moods=stats['total_moods'],
+                               color_stats=stats['color_stats'],
+                               emotion_stats=stats['emotion_stats'],
+                               trigger_stats=stats['trigger_stats'],
+                               export_date=datetime.now().strftime('%d/%m/%Y %H:%M'),
+                               include_all_entries=True,  # รวมรายการทั้งหมด
+                               moods=moods)
         
-        return response
+        # ส่งเข้าคิวแปลงเป็น PDF
+        return enqueue_pdf_export(html, filename, cache_key)
     except Exception as e:
         print(f"PDF Export Error: {e}")
         flash(f'❌ ไม่สามารถสร้าง PDF ได้: {str(e)}', 'error')
         return redirect(url_for('statistics'))
     
+# สร้าง Query จากตัวกรอง (ใช้ร่วมกันระหว่าง Export PDF แบบกรอง และ Export ข้อมูล)
+# คืนค่า (query, ทิศทางการเรียง, จำนวนสูงสุด หรือ 0 ถ้าไม่จำกัด) เรียงด้วย occurred_at
+def build_mood_filter_query(user_id, selected_colors, start_date, end_date, emotion_filter, sort_order, limit):
+    query = {'user_id': user_id}
+    
+    # กรองตามสี
+    if selected_colors:
+        query['color'] = {'$in': selected_colors}
+    
+    # กรองตามช่วงเวลา (raise ValueError ถ้าวันที่ไม่ใช่ YYYY-MM-DD)
+    date_query = date_range_query(start_date, end_date)
+    if date_query:
+        query['occurred_at'] = date_query
+    
+    # กรองตามอารมณ์
+    if emotion_filter:
+        query['emotion'] = emotion_filter
+    
+    sort_direction = -1 if sort_order == 'desc' else 1
+    limit_count = int(limit) if limit else 0
+    return query, sort_direction, limit_count
+
 # Export PDF แบบกรอง (ใหม่!)
 @app.route('/export-pdf-filtered')
 @login_required
@@ -426,56 +1046,37 @@ def export_pdf_filtered():
         sort_order = request.args.get('sort_order', 'desc')  # desc หรือ asc
         limit = request.args.get('limit', '0')
         
-        # สร้าง Query สำหรับ MongoDB
-        query = {'user_id': current_user.id}
-        
-        # กรองตามสี
-        if selected_colors:
-            query['color'] = {'$in': selected_colors}
-        
-        # กรองตามช่วงเวลา
-        date_query = {}
-        if start_date:
-            date_query['$gte'] = start_date
-        if end_date:
-            date_query['$lte'] = end_date
-        if date_query:
-            query['date'] = date_query
-        
-        # กรองตามอารมณ์
-        if emotion_filter:
-            query['emotion'] = emotion_filter
+        filename = f'mood_filtered_{current_user.username}.pdf'
+        cache_key = pdf_cache_key('filtered', {
+            'colors': sorted(selected_colors),
+            'start_date': start_date,
+            'end_date': end_date,
+            'emotion': emotion_filter,
+            'sort_order': sort_order,
+            'limit': limit
+        })
+        cached = cached_pdf_response(cache_key, filename)
+        if cached:
+            return cached
         
         # ดึงข้อมูล
-        sort_direction = -1 if sort_order == 'desc' else 1
-        moods_query = moods_collection.find(query).sort('created_at', sort_direction)
+        query, sort_direction, limit_count = build_mood_filter_query(
+            current_user.id, selected_colors, start_date, end_date, emotion_filter, sort_order, limit)
+        moods_query = moods_read_collection.find(query).sort('occurred_at', sort_direction)
         
         # จำกัดจำนวน
-        if limit and limit != '0':
-            moods_query = moods_query.limit(int(limit))
+        if limit_count:
+            moods_query = moods_query.limit(limit_count)
         
         moods = list(moods_query)
-        user_data = users_collection.find_one({'_id': ObjectId(current_user.id)})
-        
-        # คำนวณสถิติจากข้อมูลที่กรองแล้ว
-        total_moods = len(moods)
+        user_data = get_user_data(current_user.id)
         
-        if total_moods == 0:
+        if not moods:
             flash('❌ ไม่พบข้อมูลตามเงื่อนไขที่กรอง กรุณาเปลี่ยนตัวกรอง', 'error')
             return redirect(url_for('statistics'))
         
-        color_stats = {
-            'แดง': len([m for m in moods if m.get('color') == 'แดง']),
-            'เหลือง': len([m for m in moods if m.get('color') == 'เหลือง']),
-            'น้ำเงิน': len([m for m in moods if m.get('color') == 'น้ำเงิน']),
-            'เขียว': len([m for m in moods if m.get('color') == 'เขียว'])
-        }
-        
-        emotions = [m.get('emotion', '') for m in moods if m.get('emotion')]
-        emotion_stats = dict(Counter(emotions).most_common(10))
-        
-        triggers = [m.get('trigger', '') for m in moods if m.get('trigger')]
-        trigger_stats = dict(Counter(triggers).most_common(10))
+        # คำนวณสถิติจากข้อมูลที่กรองแล้ว
+        stats = compute_stats(moods)
         
         # สร้างข้อความสรุปตัวกรอง
         filter_summary = []
@@ -496,40 +1097,87 @@ def export_pdf_filtered():
         # Render HTML
         html = render_template('pdf_template.html',
                               username=user_data.get('username', ''),
-                              total_moods=total_moods,
-                              color_stats=color_stats,
-                              emotion_stats=emotion_stats,
-                              trigger_stats=trigger_stats,
+                              total_moods=stats['total_moods'],
+                              color_stats=stats['color_stats'],
+                              emotion_stats=stats['emotion_stats'],
+                              trigger_stats=stats['trigger_stats'],
                               export_date=datetime.now().strftime('%d/%m/%Y %H:%M'),
                               include_all_entries=True,
                               moods=moods,
                               filter_summary=' | '.join(filter_summary))
         
-        # ตั้งค่า wkhtmltopdf สำหรับภาษาไทย
-        options = {
-            'encoding': 'UTF-8',
-            'page-size': 'A4',
-            'margin-top': '15mm',
-            'margin-right': '15mm',
-            'margin-bottom': '15mm',
-            'margin-left': '15mm',
-            'no-outline': None,
-            'enable-local-file-access': None
-        }
-        
-        # แปลงเป็น PDF
-        pdf = pdfkit.from_string(html, False, configuration=pdfkit_config, options=options)
-        
-        response = make_response(pdf)
-        response.headers['Content-Type'] = 'application/pdf'
-        response.headers['Content-Disposition'] = f'attachment; filename=mood_filtered_{current_user.username}.pdf'
-        
-        return response
+        # ส่งเข้าคิวแปลงเป็น PDF
+        return enqueue_pdf_export(html, filename, cache_key)
     except Exception as e:
         print(f"PDF Export Error: {e}")
         flash(f'❌ ไม่สามารถสร้าง PDF ได้: {str(e)}', 'error')
         return redirect(url_for('statistics'))
 
+# header Content-Disposition สำหรับดาวน์โหลดไฟล์ (แบบเดียวกับ send_file)
+# ชื่อที่ไม่ใช่ ASCII (เช่นชื่อผู้ใช้ภาษาไทย) ส่งใน filename* ตาม RFC 5987 พร้อมชื่อ ASCII สำรองใน filename
+def attachment_options(filename):
+    try:
+        filename.encode('ascii')
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize('NFKD', filename).encode('ascii', 'ignore').decode('ascii')
+        return {'filename': simple, 'filename*': f"UTF-8''{quote(filename, safe='!#$&+^`|~')}"}
+    return {'filename': filename}
+
+# Export ข้อมูลบันทึกเป็น NDJSON หรือ CSV (ตัวกรองเดียวกับ Export PDF แบบกรอง)
+# ส่งข้อมูลแบบ stream ทีละ batch จาก cursor ไม่สะสมข้อมูลในหน่วยความจำ
+@app.route('/export')
+@login_required
+def export_data():
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in ('ndjson', 'csv'):
+        return jsonify({'error': 'format ต้องเป็น ndjson หรือ csv'}), 400
+    
+    try:
+        query, sort_direction, limit_count = build_mood_filter_query(
+            current_user.id,
+            request.args.getlist('colors'),
+            request.args.get('start_date'),
+            request.args.get('end_date'),
+            request.args.get('emotion'),
+            request.args.get('sort_order', 'desc'),
+            request.args.get('limit', '0'))
+    except ValueError:
+        return jsonify({'error': 'limit ต้องเป็นตัวเลข และวันที่ต้องอยู่ในรูปแบบ YYYY-MM-DD'}), 400
+    
+    projection = {'_id': 0, **{field: 1 for field in MOOD_FIELDS}}
+    moods = (moods_read_collection.find(query, projection)
+             .sort('occurred_at', sort_direction)
+             .batch_size(EXPORT_BATCH_SIZE))
+    if limit_count:
+        moods = moods.limit(limit_count)
+    
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(MOOD_FIELDS)
+        
+        count = 0
+        for mood in moods:
+            if fmt == 'csv':
+                writer.writerow([mood.get(field, '') for field in MOOD_FIELDS])
+            else:
+                buffer.write(json.dumps({field: mood.get(field, '') for field in MOOD_FIELDS}, ensure_ascii=False))
+                buffer.write('\n')
+            
+            count += 1
+            if count % EXPORT_BATCH_SIZE == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+    
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    response = Response(stream_with_context(generate()), content_type=f'{mimetype}; charset=utf-8')
+    response.headers.set('Content-Disposition', 'attachment',
+                         **attachment_options(f'moods_{current_user.username}.{fmt}'))
+    return response
+
 # หน้าตั้งค่าบัญชี
 @app.route('/settings', methods=['GET', 'POST'])
 @login_required
@@ -562,6 +1210,7 @@ def settings():
                     'updated_at': datetime.now()
                 }}
             )
+            invalidate_user_data(current_user.id)
             flash('อัพเดทข้อมูลส่วนตัวสำเร็จ!', 'success')
             return redirect(url_for('settings'))
         
@@ -577,24 +1226,33 @@ def settings():
                 return redirect(url_for('settings'))
             
             if file and allowed_file(file.filename):
-                # ลบรูปเก่า (ถ้ามี)
-                user_data = users_collection.find_one({'_id': ObjectId(current_user.id)})
-                old_picture = user_data.get('profile_picture')
-                if old_picture:
-                    old_path = os.path.join(app.config['UPLOAD_FOLDER'], old_picture)
-                    if os.path.exists(old_path):
-                        os.remove(old_path)
-                
-                # บันทึกรูปใหม่
-                filename = secure_filename(f"{current_user.id}_{file.filename}")
-                filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                file.save(filepath)
-                
+                user_data = get_user_data(current_user.id)
+
+                if AVATAR_PROCESSING:
+                    # ครอป/ย่อรูปเป็นขนาดที่ใช้จริง และบันทึกทั้ง WebP และ JPEG
+                    try:
+                        avatar_hash = process_avatar(file.read(), app.config['UPLOAD_FOLDER'], current_user.id)
+                    except InvalidImage:
+                        flash('ไม่สามารถอ่านไฟล์รูปภาพได้', 'error')
+                        return redirect(url_for('settings'))
+
+                    # ลบรูปเก่า (ถ้าอัพโหลดรูปเดิมซ้ำ ชื่อไฟล์จะเหมือนเดิมจึงไม่ต้องลบ)
+                    if user_data.get('avatar') != avatar_hash:
+                        remove_profile_picture_files(user_data)
+                    update = {'$set': {'avatar': avatar_hash}, '$unset': {'profile_picture': ''}}
+                else:
+                    # ลบรูปเก่า (ถ้ามี)
+                    remove_profile_picture_files(user_data)
+
+                    # บันทึกรูปใหม่ตามไฟล์ต้นฉบับ
+                    filename = secure_filename(f"{current_user.id}_{file.filename}")
+                    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
+                    file.save(filepath)
+                    update = {'$set': {'profile_picture': filename}, '$unset': {'avatar': ''}}
+
                 # อัพเดท database
-                users_collection.update_one(
-                    {'_id': ObjectId(current_user.id)},
-                    {'$set': {'profile_picture': filename}}
-                )
+                users_collection.update_one({'_id': ObjectId(current_user.id)}, update)
+                invalidate_user_data(current_user.id)
                 
                 flash('อัพโหลดรูปโปรไฟล์สำเร็จ!', 'success')
                 return redirect(url_for('settings'))
@@ -603,20 +1261,18 @@ def settings():
                 return redirect(url_for('settings'))
         
         elif action == 'delete_profile_picture':
-            user_data = users_collection.find_one({'_id': ObjectId(current_user.id)})
-            old_picture = user_data.get('profile_picture')
+            user_data = get_user_data(current_user.id)
             
-            if old_picture:
+            if user_data.get('avatar') or user_data.get('profile_picture'):
                 # ลบไฟล์
-                old_path = os.path.join(app.config['UPLOAD_FOLDER'], old_picture)
-                if os.path.exists(old_path):
-                    os.remove(old_path)
+                remove_profile_picture_files(user_data)
                 
                 # อัพเดท database
                 users_collection.update_one(
                     {'_id': ObjectId(current_user.id)},
-                    {'$unset': {'profile_picture': ''}}
+                    {'$unset': {'profile_picture': '', 'avatar': ''}}
                 )
+                invalidate_user_data(current_user.id)
                 flash('ลบรูปโปรไฟล์สำเร็จ!', 'success')
             else:
                 flash('ไม่มีรูปโปรไฟล์ให้ลบ', 'error')
@@ -629,11 +1285,7 @@ def settings():
             confirm_password = request.form.get('confirm_password', '')
             
             # ตรวจสอบรหัสผ่านเดิม
-            user_data = users_collection.find_one({'_id': ObjectId(current_user.id)})
-            if not bcrypt.checkpw(old_password.encode('utf-8'), user_data['password']):
-                flash('รหัสผ่านเดิมไม่ถูกต้อง', 'error')
-                return redirect(url_for('settings'))
-            
+            user_data = get_user_data(current_user.id)
             if len(new_password) < 6:
                 flash('รหัสผ่านต้องมีอย่างน้อย 6 ตัวอักษร', 'error')
                 return redirect(url_for('settings'))
@@ -642,12 +1294,21 @@ def settings():
                 flash('รหัสผ่านใหม่ไม่ตรงกัน', 'error')
                 return redirect(url_for('settings'))
             
-            # อัพเดทรหัสผ่าน
-            hashed_password = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+            try:
+                if not password_hasher.verify(old_password, user_data['password']):
+                    flash('รหัสผ่านเดิมไม่ถูกต้อง', 'error')
+                    return redirect(url_for('settings'))
+                
+                # อัพเดทรหัสผ่าน
+                hashed_password = password_hasher.hash(new_password)
+            except PasswordHasherBusy as e:
+                flash(str(e), 'error')
+                return redirect(url_for('settings'))
             users_collection.update_one(
                 {'_id': ObjectId(current_user.id)},
                 {'$set': {'password': hashed_password}}
             )
+            invalidate_user_data(current_user.id)
             flash('เปลี่ยนรหัสผ่านสำเร็จ!', 'success')
             return redirect(url_for('settings'))
         
@@ -657,41 +1318,83 @@ def settings():
                 {'_id': ObjectId(current_user.id)},
                 {'$set': {'theme': theme}}
             )
+            invalidate_user_data(current_user.id)
             flash('เปลี่ยน Theme สำเร็จ!', 'success')
             return redirect(url_for('settings'))
     
     # ดึงข้อมูลผู้ใช้
-    user_data = users_collection.find_one({'_id': ObjectId(current_user.id)})
+    user_data = get_user_data(current_user.id)
     return render_template('settings.html', user=user_data, active_page='settings')
 
 # บันทึกความรู้สึกใหม่
 @app.route('/add', methods=['POST'])
 @login_required
 def add_mood():
+    occurred_at = parse_occurred_at(request.form['date'], request.form['time'])
+    if occurred_at is None:
+        flash('วันที่หรือเวลาไม่ถูกต้อง', 'error')
+        return redirect(url_for('dashboard'))
+    
+    now = datetime.now()
     mood_data = {
         'user_id': current_user.id,
         'username': current_user.username,
         'date': request.form['date'],
         'time': request.form['time'],
+        'occurred_at': occurred_at,
         'color': request.form['color'],
         'trigger': request.form['trigger'],
         'emotion': request.form['emotion'],
         'detail': request.form['detail'],
-        'created_at': datetime.now(),
-        'updated_at': None
+        'created_at': now,
+        'updated_at': now
     }
+    mood_data['search'] = search_fields(mood_data)
     
-    moods_collection.insert_one(mood_data)
+    with sync_write(users_collection, current_user.id) as seq:
+        mood_data['modified_at'] = seq
+        moods_collection.insert_one(mood_data)
+    update_rollup(mood_stats_collection, current_user.id, new_mood=mood_data)
+    update_trends(mood_trends_collection, current_user.id, new_mood=mood_data)
+    bump_data_version(current_user.id)
     flash('บันทึกความรู้สึกสำเร็จ!', 'success')
     return redirect(url_for('dashboard'))
 
+# ใส่เลขลำดับ sync ให้บันทึกที่นำเข้าแต่ละ batch (ใช้ครอบการเขียน)
+def sync_imported_moods(user_id, moods):
+    return assign_sync_seq(users_collection, user_id, moods)
+
+# บวกบันทึกที่นำเข้าแต่ละ batch เข้า rollup สถิติและ bucket แนวโน้ม
+def add_imported_moods(user_id, moods):
+    add_to_rollup(mood_stats_collection, user_id, moods)
+    add_to_trends(mood_trends_collection, user_id, moods)
+
+# นำเข้าบันทึกจากไฟล์ CSV/NDJSON (ฟิลด์: date, time, color, trigger, emotion, detail)
+# ตอบกลับเป็นรายงาน JSON ว่าเพิ่มได้กี่รายการ และแถวไหนผิดพลาดเพราะอะไร
+@app.route('/import', methods=['POST'])
+@login_required
+def import_moods_route():
+    file = request.files.get('file')
+    if file is None or file.filename == '':
+        return jsonify({'error': 'ไม่ได้เลือกไฟล์'}), 400
+    
+    try:
+        fmt = detect_format(file.filename, request.form.get('format'))
+    except ImportFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    report = import_moods(parse_rows(file.stream, fmt), moods_collection,
+                          current_user.id, current_user.username,
+                          write_context=partial(sync_imported_moods, current_user.id),
+                          on_batch=partial(add_imported_moods, current_user.id))
+    if report['inserted']:
+        bump_data_version(current_user.id)
+    return jsonify(report)
+
 # แสดงฟอร์มแก้ไข
 @app.route('/edit/<mood_id>')
 @login_required
 def edit_mood(mood_id):
-    # ดึงข้อมูลของผู้ใช้คนนี้
-    moods = list(moods_collection.find({'user_id': current_user.id}).sort('created_at', -1))
-    
     # หารายการที่ต้องการแก้ไข และเช็คว่าเป็นของผู้ใช้คนนี้
     mood_to_edit = moods_collection.find_one({
         '_id': ObjectId(mood_id),
@@ -702,7 +1405,8 @@ def edit_mood(mood_id):
         flash('ไม่พบรายการที่ต้องการแก้ไข', 'error')
         return redirect(url_for('dashboard'))
     
-    return render_template('dashboard.html', moods=moods, edit_mood=mood_to_edit)
+    return render_template('dashboard.html', load_recent_moods=partial(recent_moods_panel, current_user.id),
+                           edit_mood=mood_to_edit)
 
 # อัพเดทรายการที่แก้ไข
 @app.route('/update/<mood_id>', methods=['POST'])
@@ -718,20 +1422,32 @@ def update_mood(mood_id):
         flash('ไม่สามารถแก้ไขรายการนี้ได้', 'error')
         return redirect(url_for('dashboard'))
     
+    occurred_at = parse_occurred_at(request.form['date'], request.form['time'])
+    if occurred_at is None:
+        flash('วันที่หรือเวลาไม่ถูกต้อง', 'error')
+        return redirect(url_for('edit_mood', mood_id=mood_id))
+    
     updated_data = {
         'date': request.form['date'],
         'time': request.form['time'],
+        'occurred_at': occurred_at,
         'color': request.form['color'],
         'trigger': request.form['trigger'],
         'emotion': request.form['emotion'],
         'detail': request.form['detail'],
         'updated_at': datetime.now()
     }
+    updated_data['search'] = search_fields(updated_data)
     
-    moods_collection.update_one(
-        {'_id': ObjectId(mood_id), 'user_id': current_user.id},
-        {'$set': updated_data}
-    )
+    with sync_write(users_collection, current_user.id) as seq:
+        updated_data['modified_at'] = seq
+        moods_collection.update_one(
+            {'_id': ObjectId(mood_id), 'user_id': current_user.id},
+            {'$set': updated_data}
+        )
+    update_rollup(mood_stats_collection, current_user.id, old_mood=mood, new_mood=updated_data)
+    update_trends(mood_trends_collection, current_user.id, old_mood=mood, new_mood=updated_data)
+    bump_data_version(current_user.id)
     
     flash('แก้ไขบันทึกสำเร็จ!', 'success')
     return redirect(url_for('dashboard'))
@@ -740,20 +1456,216 @@ def update_mood(mood_id):
 @app.route('/delete/<mood_id>')
 @login_required
 def delete_mood(mood_id):
-    # ลบเฉพาะถ้าเป็นของผู้ใช้คนนี้
-    result = moods_collection.delete_one({
-        '_id': ObjectId(mood_id),
-        'user_id': current_user.id
-    })
+    # จองเลขลำดับก่อนลบ (ถ้าจองไม่ได้ก็ยังไม่ลบ) แล้วเก็บ id ที่ลบไว้ให้ client ที่ sync อยู่ลบสำเนาของตัวเองด้วย
+    with sync_write(users_collection, current_user.id) as seq:
+        # ลบเฉพาะถ้าเป็นของผู้ใช้คนนี้
+        deleted = moods_collection.find_one_and_delete({
+            '_id': ObjectId(mood_id),
+            'user_id': current_user.id
+        }, projection={**STATS_PROJECTION, **TRENDS_PROJECTION})
+        if deleted is not None:
+            record_tombstone(mood_tombstones_collection, current_user.id, mood_id, seq, datetime.now(timezone.utc))
     
-    if result.deleted_count > 0:
+    if deleted is not None:
+        update_rollup(mood_stats_collection, current_user.id, old_mood=deleted)
+        update_trends(mood_trends_collection, current_user.id, old_mood=deleted)
+        bump_data_version(current_user.id)
         flash('ลบบันทึกสำเร็จ!', 'success')
     else:
         flash('ไม่สามารถลบรายการนี้ได้', 'error')
     
     return redirect(url_for('dashboard'))
 
+# คำสั่ง CLI: สร้าง/ตรวจสอบ rollup สถิติจากข้อมูลจริง
+#   flask rebuild-mood-stats            สร้างใหม่ทุกผู้ใช้
+#   flask rebuild-mood-stats --verify   ตรวจสอบอย่างเดียว (exit 1 ถ้าไม่ตรง)
+@app.cli.command('rebuild-mood-stats')
+@click.option('--user', 'username', default=None, help='ทำเฉพาะผู้ใช้คนนี้')
+@click.option('--verify', is_flag=True, help='ตรวจสอบโดยไม่แก้ไขข้อมูล')
+def rebuild_mood_stats_command(username, verify):
+    query = {'username': username} if username else {}
+    mismatched = 0
+    for user in users_collection.find(query, {'username': 1}):
+        user_id = str(user['_id'])
+        if verify:
+            if not verify_rollup(moods_collection, mood_stats_collection, user_id):
+                mismatched += 1
+                click.echo(f"❌ {user['username']}: rollup ไม่ตรงกับข้อมูลจริง")
+        else:
+            rebuild_rollup(moods_collection, mood_stats_collection, user_id)
+            rebuild_trends(moods_collection, mood_trends_collection, user_id)
+            click.echo(f"✅ {user['username']}: สร้าง rollup และ bucket แนวโน้มใหม่แล้ว")
+    
+    if verify:
+        if mismatched:
+            raise SystemExit(1)
+        click.echo('✅ rollup ตรงกับข้อมูลจริงทั้งหมด')
+
+# คำสั่ง CLI: นำเข้าบันทึกจากไฟล์ให้ผู้ใช้
+#   flask import-moods <username> <ไฟล์.csv|ไฟล์.ndjson>
+@app.cli.command('import-moods')
+@click.argument('username')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', default=None, help='csv หรือ ndjson (ค่าเริ่มต้นดูจากนามสกุลไฟล์)')
+@click.option('--batch-size', default=1000, show_default=True)
+def import_moods_command(username, path, fmt, batch_size):
+    user = users_collection.find_one({'username': username})
+    if user is None:
+        raise click.ClickException(f'ไม่พบผู้ใช้ {username}')
+    user_id = str(user['_id'])
+    
+    try:
+        fmt = detect_format(path, fmt)
+    except ImportFormatError as e:
+        raise click.ClickException(str(e))
+    
+    with open(path, 'rb') as f:
+        report = import_moods(parse_rows(f, fmt), moods_collection, user_id, username,
+                              batch_size=batch_size,
+                              write_context=partial(sync_imported_moods, user_id),
+                              on_batch=partial(add_imported_moods, user_id))
+    if report['inserted']:
+        bump_data_version(user_id)
+    
+    for error in report['errors']:
+        click.echo(f"❌ แถว {error['row']}: {error['error']}")
+    if report['truncated']:
+        click.echo(f"... แสดงเฉพาะ {len(report['errors'])} แถวแรก")
+    click.echo(f"✅ นำเข้าสำเร็จ {report['inserted']} รายการ, ผิดพลาด {report['error_count']} รายการ")
+
+# Query หลักของแต่ละ route สำหรับตรวจสอบด้วย explain
+# (ชื่อ route, collection, filter, sort, ต้องเรียงด้วย index หรือไม่)
+def index_checked_queries():
+    user_id = '000000000000000000000000'
+    return [
+        ('dashboard/edit_mood', moods_collection,
+         {'user_id': user_id}, [('created_at', -1), ('_id', -1)], True),
+        ('export_pdf_full', moods_collection, {'user_id': user_id}, [('occurred_at', -1)], True),
+        ('api_history', moods_collection,
+         {'user_id': user_id, 'occurred_at': {'$gte': datetime(2024, 1, 1), '$lt': datetime(2024, 2, 1)}},
+         [('occurred_at', 1)], True),
+        ('export_pdf_filtered/export_data', moods_collection,
+         {'user_id': user_id, 'color': {'$in': MOOD_COLORS}, 'occurred_at': {'$gte': datetime(2024, 1, 1), '$lt': datetime(2025, 1, 1)}, 'emotion': 'เครียด'},
+         [('occurred_at', -1)], True),
+        ('api_sync', moods_collection,
+         {'user_id': user_id, 'modified_at': {'$gt': 0, '$lte': 100}}, [('modified_at', 1)], True),
+        ('api_sync (tombstones)', mood_tombstones_collection,
+         {'user_id': user_id, 'modified_at': {'$gt': 0, '$lte': 100}}, [('modified_at', 1)], True),
+        ('api_search', moods_collection,
+         {'user_id': user_id, '$text': {'$search': search_query('ประชุมงาน deadline')}}, None, False),
+        ('api_trends', mood_trends_collection,
+         {'user_id': user_id, 'day': {'$gte': datetime(2024, 1, 1), '$lt': datetime(2025, 1, 1)}},
+         [('day', 1)], True),
+        ('login/register (username)', users_collection, {'username': 'explain-check'}, None, False),
+        ('register (email)', users_collection, {'email': 'explain-check'}, None, False),
+    ]
+
+def _plan_stages(plan):
+    # เดินทุก stage ใน winning plan (รองรับทั้ง classic และ SBE)
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+# คำสั่ง CLI: เติม occurred_at ให้บันทึกเก่า (รันซ้ำได้ จะทำเฉพาะบันทึกที่ยังไม่มี)
+@app.cli.command('backfill-occurred-at')
+@click.option('--batch-size', default=1000, show_default=True, help='จำนวนบันทึกที่อัพเดทต่อครั้ง')
+def backfill_occurred_at_command(batch_size):
+    def progress(report):
+        click.echo(f"... อัพเดทแล้ว {report['updated']} รายการ")
+    
+    report = backfill_occurred_at(moods_collection, batch_size=batch_size, on_batch=progress)
+    if report['invalid']:
+        click.echo(f"⚠️ อ่านวันที่/เวลาไม่ได้ {report['invalid']} รายการ (occurred_at เป็น null)")
+    click.echo(f"✅ เติม occurred_at เรียบร้อย {report['updated']} รายการ")
+
+# คำสั่ง CLI: เติมฟิลด์ search (token สำหรับค้นหา) ให้บันทึกเก่า (รันซ้ำได้)
+@app.cli.command('backfill-search')
+@click.option('--batch-size', default=1000, show_default=True, help='จำนวนบันทึกที่อัพเดทต่อครั้ง')
+def backfill_search_command(batch_size):
+    def progress(report):
+        click.echo(f"... อัพเดทแล้ว {report['updated']} รายการ")
+    
+    report = backfill_search_fields(moods_collection, batch_size=batch_size, on_batch=progress)
+    click.echo(f"✅ เติมฟิลด์ search เรียบร้อย {report['updated']} รายการ")
+
+# คำสั่ง CLI: build CSS/JS ลง static/dist (รันทุกครั้งที่ deploy หรือแก้ไฟล์ใน assets/)
+@app.cli.command('build-assets')
+def build_assets_command():
+    def report(name, path, sizes):
+        compressed = ', '.join(f'{encoding} {sizes[encoding]:,}' for encoding in ('br', 'gzip') if encoding in sizes)
+        click.echo(f"✅ {name} -> {path} ({sizes['raw']:,} bytes{', ' + compressed if compressed else ''})")
+    
+    build_assets(ASSETS_SOURCE_DIR, app.config['ASSET_DIST_DIR'], on_asset=report)
+
+# คำสั่ง CLI: ดาวน์โหลด Chart.js / Font Awesome ลง assets/vendor (สำหรับเครื่องที่ไม่มี internet)
+@app.cli.command('vendor-assets')
+def vendor_assets_command():
+    try:
+        downloaded = vendor_packages(ASSETS_SOURCE_DIR)
+    except OSError as e:
+        raise click.ClickException(f'ดาวน์โหลดไม่สำเร็จ: {e}')
+    for path in downloaded:
+        click.echo(f'✅ {path}')
+    click.echo(f'✅ ดาวน์โหลดเรียบร้อย {len(downloaded)} ไฟล์ (รัน `flask build-assets` ต่อ)')
+
+# คำสั่ง CLI: เติม modified_at (เลขลำดับ sync) ให้บันทึกเก่า (รันซ้ำได้ จะทำเฉพาะบันทึกที่ยังไม่มี)
+@app.cli.command('backfill-sync')
+@click.option('--batch-size', default=1000, show_default=True, help='จำนวนบันทึกที่อัพเดทต่อครั้ง')
+def backfill_sync_command(batch_size):
+    def progress(report):
+        click.echo(f"... อัพเดทแล้ว {report['updated']} รายการ")
+    
+    report = backfill_modified_at(moods_collection, users_collection, batch_size=batch_size, on_batch=progress)
+    if report['orphaned']:
+        click.echo(f"⚠️ ไม่พบผู้ใช้ของบันทึก {report['orphaned']} รายการ (modified_at เป็น 0)")
+    click.echo(f"✅ เติม modified_at เรียบร้อย {report['updated']} รายการ")
+
+# คำสั่ง CLI: เติมข้อมูลของบันทึกเก่าทั้งหมด (occurred_at, search, modified_at) ตามลำดับ
+# ไม่อยู่ใน startCommand (ทุกครั้งที่ start จะต้องสแกนทั้ง collection) รันครั้งเดียวหลัง deploy
+# ที่เพิ่มฟิลด์ใหม่ (Render Shell หรือ one-off job) รันซ้ำได้ จะทำเฉพาะบันทึกที่ยังไม่มี
+@app.cli.command('migrate')
+@click.option('--batch-size', default=1000, show_default=True, help='จำนวนบันทึกที่อัพเดทต่อครั้ง')
+@click.pass_context
+def migrate_command(ctx, batch_size):
+    for command in (backfill_occurred_at_command, backfill_search_command, backfill_sync_command):
+        click.echo(f'▶️ {command.name}')
+        ctx.invoke(command, batch_size=batch_size)
+
+# คำสั่ง CLI: สร้าง index
+@app.cli.command('ensure-indexes')
+def ensure_indexes_command():
+    ensure_indexes()
+    click.echo('✅ สร้าง index เรียบร้อย')
+
+# คำสั่ง CLI: ตรวจสอบว่า query ของทุก route ใช้ index (exit 1 ถ้ามี collection scan หรือ sort ในหน่วยความจำ)
+@app.cli.command('check-indexes')
+def check_indexes_command():
+    failed = 0
+    for name, collection, query, sort, sort_by_index in index_checked_queries():
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        stages = set(_plan_stages(cursor.explain()['queryPlanner']['winningPlan']))
+        
+        if 'COLLSCAN' in stages:
+            failed += 1
+            click.echo(f"❌ {name}: collection scan ({', '.join(sorted(stages))})")
+        elif sort_by_index and 'SORT' in stages:
+            failed += 1
+            click.echo(f"❌ {name}: in-memory sort ({', '.join(sorted(stages))})")
+        else:
+            click.echo(f"✅ {name}: {', '.join(sorted(stages))}")
+    
+    if failed:
+        raise SystemExit(1)
+
 if __name__ == '__main__':
     import os
+    ensure_indexes()
     port = int(os.environ.get('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=True)
\ No newline at end of file
@@ -0,0 +1,189 @@
+# CSS/JS ของหน้าเว็บ (แยกออกจาก template เพื่อให้เบราว์เซอร์ cache ได้)
+# ไฟล์ต้นฉบับอยู่ใน assets/ คำสั่ง `flask build-assets` รวมเป็น bundle ตั้งชื่อไฟล์ด้วย hash ของเนื้อหา
+# แล้วบีบอัดไว้ล่วงหน้า (.gz และ .br) ใน static/dist พร้อม manifest.json ที่บอกว่า bundle ไหนอยู่ไฟล์ไหน
+# ชื่อไฟล์เปลี่ยนทุกครั้งที่เนื้อหาเปลี่ยน จึงให้เบราว์เซอร์ cache แบบ immutable ได้ 1 ปี
+#
+# Chart.js / Font Awesome ใช้จาก CDN เป็นค่าเริ่มต้น `flask vendor-assets` ดาวน์โหลดไว้ใน assets/vendor
+# (commit ไว้สำหรับเครื่องที่ไม่มี internet) แล้ว build-assets จะรวมไปด้วยและ template จะใช้ไฟล์ในเครื่องแทน
+import gzip
+import hashlib
+import json
+import os
+import urllib.request
+from collections import namedtuple
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# ชื่อ bundle -> ไฟล์ต้นฉบับใน assets/ (ต่อกันตามลำดับ)
+BUNDLES = {
+    'base.css': ['css/base.css'],
+    'base.js': ['js/base.js'],
+    'dashboard.css': ['css/dashboard.css'],
+    'dashboard.js': ['js/dashboard.js'],
+    'statistics.css': ['css/statistics.css'],
+    'statistics.js': ['js/statistics.js'],
+    'statistics-charts.js': ['js/statistics-charts.js']
+}
+
+# ไฟล์ของ library ภายนอก เก็บใน assets/vendor/<name>-<version>/ (เลขเวอร์ชันใน path ทำหน้าที่แทน hash)
+# entry: ไฟล์ที่ template อ้างถึง, files: ทุกไฟล์ที่ต้องมี (Font Awesome อ้างถึง ../webfonts/ จาก CSS)
+VendorPackage = namedtuple('VendorPackage', 'name version cdn_base entry files')
+
+VENDOR_PACKAGES = {
+    'chart.js': VendorPackage(
+        'chart.js', '4.4.0', 'https://cdnjs.cloudflare.com/ajax/libs/Chart.js/4.4.0/',
+        'chart.umd.min.js', ('chart.umd.min.js',)),
+    'font-awesome': VendorPackage(
+        'font-awesome', '6.4.0', 'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.4.0/',
+        'css/all.min.css', (
+            'css/all.min.css',
+            'webfonts/fa-brands-400.woff2', 'webfonts/fa-brands-400.ttf',
+            'webfonts/fa-regular-400.woff2', 'webfonts/fa-regular-400.ttf',
+            'webfonts/fa-solid-900.woff2', 'webfonts/fa-solid-900.ttf',
+            'webfonts/fa-v4compatibility.woff2', 'webfonts/fa-v4compatibility.ttf'
+        ))
+}
+
+MANIFEST_NAME = 'manifest.json'
+
+# ไฟล์ที่บีบอัดแล้วเล็กลง (woff2/รูปภาพบีบอัดมาแล้ว) และขนาดขั้นต่ำที่คุ้มจะบีบอัด
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.svg', '.ttf')
+MIN_COMPRESS_SIZE = 256
+
+# Content-Encoding -> นามสกุลของไฟล์ที่บีบอัดไว้ (เรียงตามลำดับที่อยากส่ง)
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+
+def vendor_path(package, filename):
+    return f'vendor/{package.name}-{package.version}/{filename}'
+
+
+def bundle_content(source_dir, name):
+    parts = []
+    for source in BUNDLES[name]:
+        with open(os.path.join(source_dir, source), 'rb') as f:
+            parts.append(f.read())
+    return b'\n'.join(parts)
+
+
+def fingerprinted_name(name, data):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def _write_asset(dist_dir, relative_path, data):
+    """เขียนไฟล์และไฟล์ที่บีบอัดแล้ว คืนค่าขนาด {'raw': n, 'gzip': n, 'br': n}"""
+    path = os.path.join(dist_dir, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    sizes = {'raw': len(data)}
+
+    if len(data) < MIN_COMPRESS_SIZE or not relative_path.endswith(COMPRESSIBLE_EXTENSIONS):
+        return sizes
+    # mtime=0 ให้ build ซ้ำได้ไฟล์เดิมทุก byte
+    variants = {'gzip': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['br'] = brotli.compress(data, quality=11)
+    for encoding, extension in PRECOMPRESSED:
+        compressed = variants.get(encoding)
+        if compressed is not None and len(compressed) < len(data):
+            with open(path + extension, 'wb') as f:
+                f.write(compressed)
+            sizes[encoding] = len(compressed)
+    return sizes
+
+
+def _remove_unused(dist_dir, keep):
+    """ลบไฟล์ใน dist ที่ไม่อยู่ใน keep (path ใน dist) รวมถึงไฟล์ที่บีบอัดไว้ของไฟล์นั้น"""
+    keep = {os.path.normpath(path) for path in keep}
+    keep |= {path + extension for path in keep for _, extension in PRECOMPRESSED}
+    keep.add(MANIFEST_NAME)
+    for root, dirs, files in os.walk(dist_dir, topdown=False):
+        for filename in files:
+            path = os.path.join(root, filename)
+            if os.path.relpath(path, dist_dir) not in keep:
+                os.remove(path)
+        if root != dist_dir and not os.listdir(root):
+            os.rmdir(root)
+
+
+def build_assets(source_dir, dist_dir, on_asset=None):
+    """สร้าง bundle ใหม่ใน static/dist คืนค่า manifest {ชื่อ bundle หรือ path ของ vendor: path ใน dist}
+
+    เก็บไฟล์ของ build ก่อนหน้าไว้หนึ่งรุ่น (หน้าที่เบราว์เซอร์ cache ไว้หรือ worker ที่ยังไม่ restart
+    ยังอ้างถึงอยู่) ไฟล์ที่เก่ากว่านั้นถูกลบ
+    on_asset(ชื่อ, path ใน dist, ขนาด) ถูกเรียกหลังเขียนแต่ละไฟล์
+    """
+    previous = load_manifest(dist_dir) or {}
+    os.makedirs(dist_dir, exist_ok=True)
+    manifest = {}
+
+    for name in BUNDLES:
+        data = bundle_content(source_dir, name)
+        built = fingerprinted_name(name, data)
+        sizes = _write_asset(dist_dir, built, data)
+        manifest[name] = built
+        if on_asset is not None:
+            on_asset(name, built, sizes)
+
+    # library ภายนอกที่ดาวน์โหลดไว้แล้วเท่านั้น (ที่ไม่มีจะใช้จาก CDN)
+    for package in VENDOR_PACKAGES.values():
+        paths = [vendor_path(package, filename) for filename in package.files]
+        if not all(os.path.isfile(os.path.join(source_dir, path)) for path in paths):
+            continue
+        for path in paths:
+            with open(os.path.join(source_dir, path), 'rb') as f:
+                sizes = _write_asset(dist_dir, path, f.read())
+            manifest[path] = path
+            if on_asset is not None:
+                on_asset(path, path, sizes)
+
+    # เขียนไฟล์ใหม่แล้วค่อยแทนที่ worker ที่กำลังเริ่มจึงไม่อ่านได้ manifest ที่เขียนไม่ครบ
+    path = os.path.join(dist_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+    _remove_unused(dist_dir, list(manifest.values()) + list(previous.values()))
+    return manifest
+
+
+def load_manifest(dist_dir):
+    """อ่าน manifest ที่ build ไว้ คืนค่า None ถ้ายังไม่ได้ build"""
+    try:
+        with open(os.path.join(dist_dir, MANIFEST_NAME), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def vendor_packages(source_dir, timeout=30):
+    """ดาวน์โหลดไฟล์ของ library ภายนอกที่ยังไม่มีลง assets/vendor คืนค่า list ของ path ที่ดาวน์โหลด"""
+    downloaded = []
+    for package in VENDOR_PACKAGES.values():
+        for filename in package.files:
+            path = os.path.join(source_dir, vendor_path(package, filename))
+            if os.path.isfile(path):
+                continue
+            with urllib.request.urlopen(package.cdn_base + filename, timeout=timeout) as response:
+                data = response.read()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+            downloaded.append(vendor_path(package, filename))
+    return downloaded
+
+
+def precompressed_file(dist_dir, filename, quality):
+    """เลือกไฟล์ที่บีบอัดไว้แล้วตาม Accept-Encoding
+
+    quality(encoding) คืนค่าน้ำหนักที่ client ยอมรับ (0 = ไม่รับ)
+    คืนค่า (ชื่อไฟล์ที่จะส่ง, Content-Encoding หรือ None)
+    """
+    for encoding, extension in PRECOMPRESSED:
+        if quality(encoding) > 0 and os.path.isfile(os.path.join(dist_dir, filename + extension)):
+            return filename + extension, encoding
+    return filename, None
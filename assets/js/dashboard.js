@@ -0,0 +1,187 @@
+// ค่าจาก template อยู่ใน data-* ของฟอร์ม (ไฟล์นี้เป็น static จึงใช้ Jinja ไม่ได้)
+const moodForm = document.getElementById('moodForm');
+const isEditMode = moodForm.dataset.editMode === 'true';
+
+// ============================================================
+// 📚 ส่วนที่ 1: กำหนดตัวเลือกอารมณ์ตามสี (เพิ่มลบได้ที่นี่!)
+// ============================================================
+
+const emotionsByColor = {
+    // 🔴 สีแดง: พลังงานสูง + ไม่พอใจ (High Energy + Unpleasant)
+    'แดง': [
+        '─────ความโกรธ─────','คับข้องใจ','ขุ่นเคือง','ไม่พอใจ','ผิดหวัง','หงุดหงิด','รำคาญ','หัวเสีย','โกรธ','โมโห','ฉุนเฉียว','เดือดดาล','เกรี้ยวกราด',
+        '─────ความกลัว─────','อึดอัด','เป็นห่วง','หนักใจ','กลุ้มใจ','วิตกกังวล','กระวนกระวาย','ตกใจ','กลัว','หวาดกลัว','หวาดระแวง',
+        '─────ความเครียด─────','เครียด','เครียดมาก','กดดัน','วุ่นวาย','กระสับกระส่าย',
+        // 👉 เพิ่มเองได้ที่นี่!
+    ],
+
+    // 🟡 สีเหลือง: พลังงานสูง + พอใจ (High Energy + Pleasant)
+    'เหลือง': [
+        '─────ความสุข─────','รื่นรมย์','เพลิดเพลิน','เบิกบานใจ','สนุกสนาน','มีความสุข','ดีใจ','รื่นเริงบรรเทิงใจ','เปี่ยมสุข',
+        '─────มีพลัง─────','มีสมาธิ','มีพลัง','มีชีวิตชีวา','ตื่นตัว','ตื่นเต้น','มีความหวัง','มองโลกในแง่ดี','มีแรงผลักดัน','มีแรงบันดาลใจ','กระปรี้กระเปร่า','กระตือรือร้น','กระฉับกระเฉง','ฮึกเหิม','ประหลาดใจ',
+        '─────ความภูมิใจ─────','เชื่อมั่น','มั่นใจ','ภูมิใจ','อิ่มเอมใจ','สำราญใจ','ยินดี','ปลื้มปิติ','ปีติยินดี',
+        '─────ความขอบคุณ─────','รู้สึกโชคดี','ขอบคุณ','ซาบซึ้งใจ','สำนึกบุญคุณ','ประทับใจ',
+        // 👉 เพิ่มเองได้ที่นี่!
+    ],
+
+    // 🔵 สีน้ำเงิน: พลังงานต่ำ + ไม่พอใจ (Low Energy + Unpleasant)
+    'น้ำเงิน': [
+        '─────ความเบื่อ─────','เซ็ง','เบื่อ','เบื่อหน่าย','ขยะแขยง','เฉยเมย','ไม่สนใจ',        
+        '─────ความเศร้า─────','เศร้า','โศกเศร้า','เสียใจ','หดหู่','หม่นหมอง','ทุกข์ระทม','ซึมเศร้า',    
+        '─────ความเหงา─────','เหงา','แปลกแยก','โดดเดี่ยว','อ้างว้าง',
+        '─────ความท้อแท้─────','เหนื่อย','เหนื่อยหน่าย','ท้อแท้','มองโลกในแง่ร้าย','หมดหวัง','สิ้นหวัง','ว่างเปล่า','อิดโรย','อ่อนล้า','หมดเรี่ยวแรง','หมดไฟ','หมดอาลัยตายอยาก',
+        // 👉 เพิ่มเองได้ที่นี่!
+    ],
+
+    // 🟢 สีเขียว: พลังงานต่ำ + พอใจ (Low Energy + Pleasant)
+    'เขียว': [
+        '─────ความพึงพอใจ─────','พึงพอใจ','พอใจ','โดนใจ','ถูกใจ','รัก',
+        '─────ความผ่อนคลาย─────','สบาย','สะดวกสบาย','ผ่อนคลาย','เป็นสุข',
+        '─────ความสงบ─────','สบายใจ','ไร้กังวล','สงบ','เงียบสงบ','สงบสุข',
+        '─────ความอบอุ่น─────','ปลอดภัย','มั่นคง','อบอุ่น','อบอุ่นใจ',
+        // 👉 เพิ่มเองได้ที่นี่!
+    ]
+};
+
+// ============================================================
+// 📚 ส่วนที่ 2: ฟังก์ชันอัพเดทตัวเลือกอารมณ์
+// ============================================================
+
+function updateEmotionOptions(color) {
+    const emotionSelect = document.getElementById('emotionSelect');
+    const emotions = emotionsByColor[color] || [];
+
+    // ล้างตัวเลือกเก่า
+    emotionSelect.innerHTML = '<option value="">-- กรุณาเลือกอารมณ์ --</option>';
+
+    // เพิ่มตัวเลือกใหม่
+    emotions.forEach(emotion => {
+        const option = document.createElement('option');
+        option.value = emotion;
+        option.textContent = emotion;
+        emotionSelect.appendChild(option);
+    });
+
+    // เปิดการใช้งาน dropdown
+    emotionSelect.disabled = false;
+
+    // ถ้าเป็นโหมดแก้ไข ให้เลือกอารมณ์เดิม
+    const savedEmotion = moodForm.dataset.savedEmotion;
+    if (isEditMode && savedEmotion && emotions.includes(savedEmotion)) {
+        emotionSelect.value = savedEmotion;
+    }
+}
+
+// ============================================================
+// 📚 ส่วนที่ 3: เริ่มต้นเมื่อโหลดหน้า
+// ============================================================
+
+document.addEventListener('DOMContentLoaded', function() {
+    // ตั้งค่าวันที่และเวลาเริ่มต้น (ถ้าเป็นการเพิ่มใหม่)
+    if (!isEditMode) {
+        const now = new Date();
+        const dateInput = document.getElementById('dateInput');
+        const timeInput = document.getElementById('timeInput');
+
+        // Format: YYYY-MM-DD
+        const year = now.getFullYear();
+        const month = String(now.getMonth() + 1).padStart(2, '0');
+        const day = String(now.getDate()).padStart(2, '0');
+        dateInput.value = `${year}-${month}-${day}`;
+
+        // Format: HH:MM
+        const hours = String(now.getHours()).padStart(2, '0');
+        const minutes = String(now.getMinutes()).padStart(2, '0');
+        timeInput.value = `${hours}:${minutes}`;
+    }
+
+    // ถ้าเป็นโหมดแก้ไข ให้อัพเดทตัวเลือกอารมณ์ตามสีที่เลือกไว้
+    if (isEditMode) {
+        const selectedColor = document.querySelector('input[name="color"]:checked');
+        if (selectedColor) {
+            updateEmotionOptions(selectedColor.value);
+        }
+    }
+});
+
+// ============================================================
+// 📚 ส่วนที่ 5: โหลดบันทึกเพิ่ม (ดึงทีละหน้าจาก /api/moods)
+// ============================================================
+
+const badgeColors = {
+    'แดง': 'background-color: #ff6b6b;',
+    'เหลือง': 'background-color: #ffd93d; color: #333;',
+    'น้ำเงิน': 'background-color: #6bcfff;',
+    'เขียว': 'background-color: #51cf66;'
+};
+
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+function renderMoodItem(mood) {
+    const item = document.createElement('div');
+    item.className = `mood-item ${mood.color}`;
+    item.innerHTML = `
+        <div class="mood-header">
+            <div class="mood-datetime">📅 ${escapeHtml(mood.date)} เวลา ${escapeHtml(mood.time)}</div>
+            <div class="mood-color-badge" style="${badgeColors[mood.color] || ''}">${escapeHtml(mood.color)}</div>
+        </div>
+        <div class="mood-emotion">😊 ${escapeHtml(mood.emotion)}</div>
+        <div class="mood-trigger">💥 สิ่งกระตุ้น: ${escapeHtml(mood.trigger)}</div>
+        <div class="mood-detail">${escapeHtml(mood.detail)}</div>
+        <div class="mood-footer">
+            <a href="/edit/${mood.id}"><button class="btn-edit">✏️ แก้ไข</button></a>
+            <a href="/delete/${mood.id}" onclick="return confirm('คุณต้องการลบบันทึกนี้?')"><button class="btn-delete">🗑️ ลบ</button></a>
+        </div>
+    `;
+    return item;
+}
+
+async function loadMoreMoods() {
+    const button = document.getElementById('loadMoreBtn');
+    button.disabled = true;
+
+    const response = await fetch(`${moodForm.dataset.moreUrl}?cursor=${encodeURIComponent(button.dataset.cursor)}`);
+    if (!response.ok) {
+        button.disabled = false;
+        alert('❌ ไม่สามารถโหลดบันทึกเพิ่มได้');
+        return;
+    }
+
+    const data = await response.json();
+    const moodList = document.getElementById('moodList');
+    data.moods.forEach(mood => moodList.appendChild(renderMoodItem(mood)));
+
+    if (data.next_cursor) {
+        button.dataset.cursor = data.next_cursor;
+        button.disabled = false;
+    } else {
+        button.remove();
+    }
+}
+
+// ============================================================
+// 📚 ส่วนที่ 4: Validation ก่อน Submit
+// ============================================================
+
+moodForm.addEventListener('submit', function(e) {
+    const emotionSelect = document.getElementById('emotionSelect');
+    const selectedColor = document.querySelector('input[name="color"]:checked');
+
+    if (!selectedColor) {
+        e.preventDefault();
+        alert('❌ กรุณาเลือกสีที่แทนความรู้สึก');
+        return false;
+    }
+
+    if (!emotionSelect.value) {
+        e.preventDefault();
+        alert('❌ กรุณาเลือกอารมณ์');
+        return false;
+    }
+
+    return true;
+});
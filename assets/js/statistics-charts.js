@@ -0,0 +1,245 @@
+// ข้อมูลกราฟมาจาก <script type="application/json" id="statisticsChartData"> (ไม่มีถ้ายังไม่มีบันทึก)
+const chartDataElement = document.getElementById('statisticsChartData');
+if (chartDataElement) {
+    const chartData = JSON.parse(chartDataElement.textContent);
+
+    // ข้อมูล Triggers ตามสี
+    const colorTriggersData = chartData.color_triggers;
+
+    // กราฟแท่งแนวตั้ง
+    const colorData = {
+        labels: ['แดง', 'เหลือง', 'น้ำเงิน', 'เขียว'],
+        datasets: [{
+            label: 'จำนวนบันทึก',
+            data: chartData.color_counts,
+            backgroundColor: [
+                'rgba(255, 107, 107, 0.8)',
+                'rgba(255, 217, 61, 0.8)',
+                'rgba(107, 207, 255, 0.8)',
+                'rgba(81, 207, 102, 0.8)'
+            ],
+            borderColor: [
+                '#ff6b6b',
+                '#ffd93d',
+                '#6bcfff',
+                '#51cf66'
+            ],
+            borderWidth: 2,
+            borderRadius: 8,
+            barThickness: 80
+        }]
+    };
+
+    const colorChart = new Chart(document.getElementById('colorChart'), {
+        type: 'bar',
+        data: colorData,
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            scales: {
+                y: {
+                    beginAtZero: true,
+                    ticks: {
+                        stepSize: 1,
+                        font: {
+                            size: 14
+                        }
+                    },
+                    title: {
+                        display: true,
+                        text: 'จำนวน (ครั้ง)',
+                        font: {
+                            size: 16,
+                            weight: 'bold'
+                        }
+                    }
+                },
+                x: {
+                    ticks: {
+                        font: {
+                            size: 16,
+                            weight: 'bold'
+                        }
+                    },
+                    title: {
+                        display: true,
+                        text: 'สีแทนความรู้สึก',
+                        font: {
+                            size: 16,
+                            weight: 'bold'
+                        }
+                    }
+                }
+            },
+            plugins: {
+                legend: {
+                    display: false
+                },
+                tooltip: {
+                    callbacks: {
+                        afterLabel: function(context) {
+                            const colorName = context.label;
+                            const triggers = colorTriggersData[colorName];
+
+                            if (!triggers || Object.keys(triggers).length === 0) {
+                                return '\n💥 ไม่มีสิ่งกระตุ้น';
+                            }
+
+                            let triggerText = '\n\n💥 สิ่งกระตุ้นที่พบบ่อย:';
+                            for (const [trigger, count] of Object.entries(triggers)) {
+                                triggerText += `\n  • ${trigger} (${count} ครั้ง)`;
+                            }
+                            return triggerText;
+                        }
+                    },
+                    backgroundColor: 'rgba(0, 0, 0, 0.9)',
+                    titleFont: {
+                        size: 16,
+                        weight: 'bold'
+                    },
+                    bodyFont: {
+                        size: 14,
+                        family: 'monospace'
+                    },
+                    padding: 15,
+                    displayColors: false,
+                    cornerRadius: 8
+                }
+            },
+            animation: {
+                duration: 1000,
+                easing: 'easeInOutQuart'
+            }
+        }
+    });
+
+    // กราฟอารมณ์
+    const emotionData = {
+        labels: chartData.emotion_labels,
+        datasets: [{
+            label: 'จำนวนครั้ง',
+            data: chartData.emotion_counts,
+            backgroundColor: [
+                'rgba(102, 126, 234, 0.8)',
+                'rgba(118, 75, 162, 0.8)',
+                'rgba(255, 107, 107, 0.8)',
+                'rgba(255, 217, 61, 0.8)',
+                'rgba(81, 207, 102, 0.8)',
+                'rgba(107, 207, 255, 0.8)',
+                'rgba(255, 159, 64, 0.8)',
+                'rgba(201, 203, 207, 0.8)',
+                'rgba(255, 99, 132, 0.8)',
+                'rgba(54, 162, 235, 0.8)'
+            ],
+            borderWidth: 2,
+            borderColor: '#fff'
+        }]
+    };
+
+    const emotionChart = new Chart(document.getElementById('emotionChart'), {
+        type: 'pie',
+        data: emotionData,
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        padding: 15,
+                        font: {
+                            size: 12
+                        }
+                    }
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            const total = context.dataset.data.reduce((a, b) => a + b, 0);
+                            const percentage = ((context.parsed / total) * 100).toFixed(1);
+                            return `${context.label}: ${context.parsed} ครั้ง (${percentage}%)`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+
+    // กราฟสิ่งกระตุ้น
+    const triggerData = {
+        labels: chartData.trigger_labels,
+        datasets: [{
+            label: 'จำนวนครั้ง',
+            data: chartData.trigger_counts,
+            backgroundColor: [
+                'rgba(81, 207, 102, 0.8)',
+                'rgba(107, 207, 255, 0.8)',
+                'rgba(255, 217, 61, 0.8)',
+                'rgba(255, 107, 107, 0.8)',
+                'rgba(102, 126, 234, 0.8)',
+                'rgba(118, 75, 162, 0.8)',
+                'rgba(255, 159, 64, 0.8)',
+                'rgba(201, 203, 207, 0.8)',
+                'rgba(255, 99, 132, 0.8)',
+                'rgba(54, 162, 235, 0.8)'
+            ],
+            borderWidth: 2,
+            borderColor: '#fff'
+        }]
+    };
+
+    const triggerChart = new Chart(document.getElementById('triggerChart'), {
+        type: 'pie',
+        data: triggerData,
+        options: {
+            responsive: true,
+            maintainAspectRatio: false,
+            plugins: {
+                legend: {
+                    position: 'bottom',
+                    labels: {
+                        padding: 15,
+                        font: {
+                            size: 12
+                        }
+                    }
+                },
+                tooltip: {
+                    callbacks: {
+                        label: function(context) {
+                            const total = context.dataset.data.reduce((a, b) => a + b, 0);
+                            const percentage = ((context.parsed / total) * 100).toFixed(1);
+                            return `${context.label}: ${context.parsed} ครั้ง (${percentage}%)`;
+                        }
+                    }
+                }
+            }
+        }
+    });
+}
+
+    // รอให้งาน Export PDF ในคิวเสร็จ แล้วดาวน์โหลดอัตโนมัติ
+    const exportJobId = new URLSearchParams(window.location.search).get('export_job');
+    if (exportJobId) {
+        const notice = document.createElement('div');
+        notice.className = 'alert alert-success';
+        notice.textContent = '⏳ กำลังสร้าง PDF กรุณารอสักครู่...';
+        document.querySelector('.content-area').prepend(notice);
+        history.replaceState(null, '', window.location.pathname);
+
+        async function pollExportJob() {
+            const response = await fetch(`/export-jobs/${encodeURIComponent(exportJobId)}`);
+            const job = response.ok ? await response.json() : { status: 'failed', error: 'ไม่พบงาน Export' };
+
+            if (job.status === 'done') {
+                notice.textContent = '✅ สร้าง PDF สำเร็จ กำลังดาวน์โหลด...';
+                window.location.href = job.download_url;
+            } else if (job.status === 'failed') {
+                notice.className = 'alert alert-error';
+                notice.textContent = `❌ ไม่สามารถสร้าง PDF ได้: ${job.error}`;
+            } else {
+                setTimeout(pollExportJob, 1000);
+            }
+        }
+        pollExportJob();
+    }
@@ -0,0 +1,122 @@
+// ============================================================
+// Modal Functions
+// ============================================================
+
+function openFilterModal() {
+    document.getElementById('filterModal').classList.add('active');
+}
+
+function closeFilterModal() {
+    document.getElementById('filterModal').classList.remove('active');
+}
+
+// ปิด modal เมื่อคลิกนอก modal
+window.onclick = function(event) {
+    const modal = document.getElementById('filterModal');
+    if (event.target === modal) {
+        closeFilterModal();
+    }
+}
+
+// ============================================================
+// Filter Functions
+// ============================================================
+
+function resetFilter() {
+    // เลือกสีทั้งหมด
+    document.querySelectorAll('input[name="colors"]').forEach(cb => cb.checked = true);
+
+    // ล้างวันที่
+    document.getElementById('startDate').value = '';
+    document.getElementById('endDate').value = '';
+
+    // รีเซ็ตอารมณ์
+    document.getElementById('emotionFilter').value = '';
+
+    // รีเซ็ตการเรียงลำดับ
+    document.getElementById('sortOrder').value = 'desc';
+
+    // รีเซ็ตจำนวน
+    document.getElementById('limitInput').value = '0';
+}
+
+function applyFilter() {
+    // รับค่าจากฟอร์ม
+    const selectedColors = Array.from(document.querySelectorAll('input[name="colors"]:checked'))
+        .map(cb => cb.value);
+
+    const startDate = document.getElementById('startDate').value;
+    const endDate = document.getElementById('endDate').value;
+    const emotion = document.getElementById('emotionFilter').value;
+    const sortOrder = document.getElementById('sortOrder').value;
+    const limit = document.getElementById('limitInput').value;
+
+    // ตรวจสอบว่าเลือกอย่างน้อย 1 สี
+    if (selectedColors.length === 0) {
+        alert('❌ กรุณาเลือกอย่างน้อย 1 สี');
+        return;
+    }
+
+    // สร้าง URL พร้อม Query Parameters
+    const params = new URLSearchParams();
+
+    // เพิ่มสี
+    selectedColors.forEach(color => params.append('colors', color));
+
+    // เพิ่มวันที่
+    if (startDate) params.append('start_date', startDate);
+    if (endDate) params.append('end_date', endDate);
+
+    // เพิ่มอารมณ์
+    if (emotion) params.append('emotion', emotion);
+
+    // เพิ่มการเรียงลำดับ
+    params.append('sort_order', sortOrder);
+
+    // เพิ่มจำนวน
+    if (limit && limit !== '0') params.append('limit', limit);
+
+    // แสดงสรุปตัวกรอง
+    showFilterSummary(selectedColors, startDate, endDate, emotion, sortOrder, limit);
+
+    // Redirect ไป Export
+    window.location.href = `/export-pdf-filtered?${params.toString()}`;
+}
+
+function showFilterSummary(colors, startDate, endDate, emotion, sortOrder, limit) {
+    const summary = document.getElementById('filterSummary');
+    const tags = document.getElementById('filterTags');
+    tags.innerHTML = '';
+
+    // แสดงสี
+    colors.forEach(color => {
+        tags.innerHTML += `<span class="filter-tag">สี: ${color}</span>`;
+    });
+
+    // แสดงช่วงเวลา
+    if (startDate || endDate) {
+        const dateText = startDate && endDate ? `${startDate} ถึง ${endDate}` :
+                        startDate ? `ตั้งแต่ ${startDate}` :
+                        `จนถึง ${endDate}`;
+        tags.innerHTML += `<span class="filter-tag">📅 ${dateText}</span>`;
+    }
+
+    // แสดงอารมณ์
+    if (emotion) {
+        tags.innerHTML += `<span class="filter-tag">😊 ${emotion}</span>`;
+    }
+
+    // แสดงการเรียง
+    const sortText = sortOrder === 'desc' ? 'ใหม่สุดก่อน' : 'เก่าสุดก่อน';
+    tags.innerHTML += `<span class="filter-tag">📊 ${sortText}</span>`;
+
+    // แสดงจำนวน
+    if (limit && limit !== '0') {
+        tags.innerHTML += `<span class="filter-tag">📝 ${limit} รายการ</span>`;
+    }
+
+    summary.classList.add('active');
+
+    // ปิด modal
+    closeFilterModal();
+}
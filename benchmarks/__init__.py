@@ -0,0 +1,20 @@
+# ชุดวัดประสิทธิภาพ (benchmark) ของแอป
+#
+#   benchmarks/data.py  สร้างผู้ใช้และบันทึกความรู้สึกจำลองจาก seed (ได้ข้อมูลเดิมทุกครั้ง)
+#   benchmarks/run.py   ยิง request ผ่าน Flask test client แล้วเขียนรายงาน JSON
+#   benchmarks/stats.py เทียบการคำนวณสถิติแบบรอบเดียวกับโค้ดเดิมที่วนหลายรอบ (1k/10k/100k รายการ)
+#   benchmarks/facet.py เทียบหน้าสถิติแบบดึงทุกบันทึกกับ $facet (เวลาและขนาดข้อมูลตามจำนวนบันทึก)
+#   benchmarks/load.py  load test ผ่าน gunicorn จริง รายงาน requests/sec ต่อการตั้งค่า worker
+#
+# รันจาก root ของ repo:
+#   pip install -r benchmarks/requirements.txt
+#   python -m benchmarks.run --entries 10000 --output bench.json
+#   python -m benchmarks.run --entries 10000 --baseline bench.json   # เทียบกับผลครั้งก่อน
+#   python -m benchmarks.run --mongodb-uri mongodb://localhost:27017  # ใช้ MongoDB จริงแทน mongomock
+#   python -m benchmarks.run --routes export_ndjson,export_csv_filtered --entries 100000
+#       --mongodb-uri mongodb://localhost:27017  # /export แบบ stream: peak KiB ไม่ควรโตตาม --entries
+#                                                # (mongomock โหลดผลลัพธ์ทั้งหมดไว้ในหน่วยความจำก่อน)
+#   python -m benchmarks.data --entries 100000 > moods.ndjson          # ไฟล์สำหรับ `flask import-moods`
+#   python -m benchmarks.stats
+#   python -m benchmarks.facet --sizes 1000,10000,100000 --mongodb-uri mongodb://localhost:27017
+#   python -m benchmarks.load --configs sync:4x1,gthread:2x4 --output load.json
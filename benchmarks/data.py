@@ -0,0 +1,192 @@
+# สร้างผู้ใช้และบันทึกความรู้สึกจำลองสำหรับ benchmark
+# ใช้ random.Random(seed) ตัวเดียว seed เดียวกันจึงได้ข้อมูลเหมือนเดิมทุกครั้ง (เทียบผลระหว่างเวอร์ชันได้)
+#
+# การกระจายของข้อมูลเลียนแบบการใช้งานจริง:
+#   - สัดส่วนสีต่างกันในแต่ละผู้ใช้
+#   - อารมณ์และสิ่งกระตุ้นเบ้แบบ Zipf (ไม่กี่ค่าที่ใช้บ่อยมาก ที่เหลือนานๆ ครั้ง)
+#   - เวลาในวันกระจุกช่วงเช้าและค่ำ, มีรายละเอียดประมาณ 60% ของบันทึก
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+from mood_import import validate_row
+
+# รายการเดียวกับตัวเลือกในหน้า Dashboard (ไม่รวมหัวข้อคั่นกลุ่ม)
+EMOTIONS_BY_COLOR = {
+    'แดง': [
+        'คับข้องใจ', 'ขุ่นเคือง', 'ไม่พอใจ', 'ผิดหวัง', 'หงุดหงิด', 'รำคาญ', 'หัวเสีย', 'โกรธ', 'โมโห',
+        'ฉุนเฉียว', 'เดือดดาล', 'เกรี้ยวกราด', 'อึดอัด', 'เป็นห่วง', 'หนักใจ', 'กลุ้มใจ', 'วิตกกังวล',
+        'กระวนกระวาย', 'ตกใจ', 'กลัว', 'หวาดกลัว', 'หวาดระแวง', 'เครียด', 'เครียดมาก', 'กดดัน', 'วุ่นวาย',
+        'กระสับกระส่าย'
+    ],
+    'เหลือง': [
+        'รื่นรมย์', 'เพลิดเพลิน', 'เบิกบานใจ', 'สนุกสนาน', 'มีความสุข', 'ดีใจ', 'รื่นเริงบรรเทิงใจ', 'เปี่ยมสุข',
+        'มีสมาธิ', 'มีพลัง', 'มีชีวิตชีวา', 'ตื่นตัว', 'ตื่นเต้น', 'มีความหวัง', 'มองโลกในแง่ดี', 'มีแรงผลักดัน',
+        'มีแรงบันดาลใจ', 'กระปรี้กระเปร่า', 'กระตือรือร้น', 'กระฉับกระเฉง', 'ฮึกเหิม', 'ประหลาดใจ', 'เชื่อมั่น',
+        'มั่นใจ', 'ภูมิใจ', 'อิ่มเอมใจ', 'สำราญใจ', 'ยินดี', 'ปลื้มปิติ', 'ปีติยินดี', 'รู้สึกโชคดี', 'ขอบคุณ',
+        'ซาบซึ้งใจ', 'สำนึกบุญคุณ', 'ประทับใจ'
+    ],
+    'น้ำเงิน': [
+        'เซ็ง', 'เบื่อ', 'เบื่อหน่าย', 'ขยะแขยง', 'เฉยเมย', 'ไม่สนใจ', 'เศร้า', 'โศกเศร้า', 'เสียใจ', 'หดหู่',
+        'หม่นหมอง', 'ทุกข์ระทม', 'ซึมเศร้า', 'เหงา', 'แปลกแยก', 'โดดเดี่ยว', 'อ้างว้าง', 'เหนื่อย', 'เหนื่อยหน่าย',
+        'ท้อแท้', 'มองโลกในแง่ร้าย', 'หมดหวัง', 'สิ้นหวัง', 'ว่างเปล่า', 'อิดโรย', 'อ่อนล้า', 'หมดเรี่ยวแรง',
+        'หมดไฟ', 'หมดอาลัยตายอยาก'
+    ],
+    'เขียว': [
+        'พึงพอใจ', 'พอใจ', 'โดนใจ', 'ถูกใจ', 'รัก', 'สบาย', 'สะดวกสบาย', 'ผ่อนคลาย', 'เป็นสุข', 'สบายใจ',
+        'ไร้กังวล', 'สงบ', 'เงียบสงบ', 'สงบสุข', 'ปลอดภัย', 'มั่นคง', 'อบอุ่น', 'อบอุ่นใจ'
+    ]
+}
+
+TRIGGERS = [
+    'การทำงาน', 'ครอบครัว', 'เพื่อน', 'การเรียน', 'แฟน', 'สุขภาพ', 'การเงิน', 'การนอน', 'รถติด', 'อาหาร',
+    'ออกกำลังกาย', 'โซเชียลมีเดีย', 'ข่าว', 'อากาศ', 'สัตว์เลี้ยง', 'เพื่อนร่วมงาน', 'หัวหน้า', 'การประชุม',
+    'ลูกค้า', 'งานบ้าน', 'เดินทาง', 'วันหยุด', 'ซีรีส์', 'เพลง', 'เกม'
+]
+
+DETAIL_PHRASES = [
+    'วันนี้{trigger}ทำให้รู้สึก{emotion}มาก', 'รู้สึก{emotion}ตั้งแต่เช้า', 'เรื่อง{trigger}อีกแล้ว',
+    'ไม่รู้ทำไมถึง{emotion}', 'คุยกับ{trigger}แล้วรู้สึกดีขึ้น', 'อยากจดไว้ว่า{emotion}เพราะ{trigger}',
+    '{trigger}ยังไม่จบ พรุ่งนี้ต้องทำต่อ', 'Deadline ใกล้แล้ว', 'ได้พักบ้าง', 'ขอบคุณตัวเองที่ผ่านมาได้'
+]
+
+# น้ำหนักพื้นฐานของสี (แต่ละผู้ใช้สุ่มเบี่ยงจากค่านี้)
+COLOR_WEIGHTS = {'แดง': 0.22, 'เหลือง': 0.30, 'น้ำเงิน': 0.20, 'เขียว': 0.28}
+
+# ชั่วโมงที่บันทึกบ่อย (เช้า, พักเที่ยง, ค่ำ)
+HOUR_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 6, 6, 4, 3, 3, 5, 4, 3, 3, 4, 5, 6, 7, 8, 8, 6, 3]
+
+DEFAULT_END_DATE = datetime(2025, 12, 31)
+DEFAULT_DAYS = 730
+PASSWORD = 'benchmark-password'
+
+
+def zipf_weights(count, exponent=1.1):
+    return [1 / (rank ** exponent) for rank in range(1, count + 1)]
+
+
+class UserProfile:
+    """นิสัยการบันทึกของผู้ใช้หนึ่งคน (สัดส่วนสี ลำดับความนิยมของอารมณ์/สิ่งกระตุ้น)"""
+
+    def __init__(self, rng):
+        self.colors = list(COLOR_WEIGHTS)
+        self.color_weights = [weight * rng.uniform(0.5, 1.5) for weight in COLOR_WEIGHTS.values()]
+        self.emotions = {}
+        for color, emotions in EMOTIONS_BY_COLOR.items():
+            emotions = list(emotions)
+            rng.shuffle(emotions)
+            self.emotions[color] = (emotions, zipf_weights(len(emotions)))
+        self.triggers = list(TRIGGERS)
+        rng.shuffle(self.triggers)
+        self.trigger_weights = zipf_weights(len(self.triggers), exponent=1.3)
+        self.detail_rate = rng.uniform(0.4, 0.8)
+
+
+def generate_moods(rng, count, end_date=DEFAULT_END_DATE, days=DEFAULT_DAYS, profile=None):
+    """สร้างแถวบันทึก (ฟิลด์เดียวกับไฟล์นำเข้า) count รายการ เรียงตามเวลา ภายใน days วันก่อน end_date"""
+    profile = profile or UserProfile(rng)
+    start = end_date - timedelta(days=days - 1)
+    offsets = sorted(rng.randrange(days) for _ in range(count))
+    hours = rng.choices(range(24), weights=HOUR_WEIGHTS, k=count)
+
+    for offset, hour in zip(offsets, hours):
+        occurred_at = start + timedelta(days=offset, hours=hour, minutes=rng.randrange(60))
+        color = rng.choices(profile.colors, weights=profile.color_weights)[0]
+        emotions, emotion_weights = profile.emotions[color]
+        emotion = rng.choices(emotions, weights=emotion_weights)[0]
+        trigger = rng.choices(profile.triggers, weights=profile.trigger_weights)[0]
+        detail = ''
+        if rng.random() < profile.detail_rate:
+            detail = rng.choice(DETAIL_PHRASES).format(trigger=trigger, emotion=emotion)
+        yield {
+            'date': occurred_at.strftime('%Y-%m-%d'),
+            'time': occurred_at.strftime('%H:%M'),
+            'color': color,
+            'trigger': trigger,
+            'emotion': emotion,
+            'detail': detail
+        }
+
+
+def benchmark_username(index):
+    return f'bench_user_{index}'
+
+
+def load_dataset(app_module, seed, users, entries, end_date=DEFAULT_END_DATE, days=DEFAULT_DAYS,
+                 batch_size=1000, on_batch=None):
+    """เขียนผู้ใช้ users คน คนละ entries รายการลงฐานข้อมูลของแอป
+
+    เขียนแบบเดียวกับการนำเข้าไฟล์ (validate_row + เลขลำดับ sync + rollup สถิติ + bucket แนวโน้ม)
+    แต่ created_at เป็นเวลาหลังเกิดเหตุการณ์เล็กน้อยแทนเวลาที่นำเข้า
+    on_batch(จำนวนที่เขียนแล้ว) ถูกเรียกหลังเขียนแต่ละ batch
+    คืนค่า list ของ user_id เรียงตามลำดับผู้ใช้
+    """
+    rng = random.Random(seed)
+    # bcrypt ครั้งเดียวแล้วใช้ hash เดียวกันทุกคน (work factor ตาม BCRYPT_ROUNDS ของแอป)
+    password_hash = app_module.password_hasher.hash(PASSWORD)
+    user_ids = []
+    written = 0
+
+    for index in range(users):
+        username = benchmark_username(index)
+        result = app_module.users_collection.insert_one({
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': password_hash,
+            'theme': 'default',
+            'created_at': end_date - timedelta(days=days)
+        })
+        user_id = str(result.inserted_id)
+        user_ids.append(user_id)
+
+        batch = []
+        for row in generate_moods(rng, entries, end_date, days):
+            mood, error = validate_row(row)
+            if error is not None:
+                raise ValueError(f'generated row is invalid: {error}')
+            created_at = mood['occurred_at'] + timedelta(minutes=rng.randrange(1, 180))
+            mood.update({
+                'user_id': user_id,
+                'username': username,
+                'created_at': created_at,
+                'updated_at': created_at
+            })
+            batch.append(mood)
+            if len(batch) >= batch_size:
+                written += _write_batch(app_module, user_id, batch)
+                if on_batch is not None:
+                    on_batch(written)
+        if batch:
+            written += _write_batch(app_module, user_id, batch)
+            if on_batch is not None:
+                on_batch(written)
+
+    return user_ids
+
+
+def _write_batch(app_module, user_id, batch):
+    with app_module.sync_imported_moods(user_id, batch):
+        app_module.moods_collection.insert_many(batch, ordered=False)
+    app_module.add_imported_moods(user_id, batch)
+    count = len(batch)
+    batch.clear()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='เขียนบันทึกจำลองเป็น NDJSON (นำเข้าด้วย flask import-moods)')
+    parser.add_argument('--entries', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS)
+    parser.add_argument('--end-date', default=DEFAULT_END_DATE.strftime('%Y-%m-%d'))
+    args = parser.parse_args(argv)
+
+    end_date = datetime.strptime(args.end_date, '%Y-%m-%d')
+    for row in generate_moods(random.Random(args.seed), args.entries, end_date, args.days):
+        sys.stdout.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+# เทียบหน้าสถิติแบบเดิม (ดึงทุกบันทึกมาคำนวณใน Python) กับ $facet aggregation (mood_statistics.aggregate_counts)
+# วัดเวลาและขนาดข้อมูลที่ MongoDB ส่งกลับ (BSON) ตามจำนวนบันทึกของผู้ใช้หนึ่งคน
+#
+#   python -m benchmarks.facet
+#   python -m benchmarks.facet --sizes 1000,10000,50000 --mongodb-uri mongodb://localhost:27017 --output facet.json
+#
+# หมายเหตุ: ขนาดข้อมูลคือผลรวม BSON ของ document ที่ได้กลับ (ไม่รวม header ของ wire protocol)
+# mongomock คำนวณ aggregation ด้วย Python ล้วนและไม่มี network $facet จึงช้ากว่าแบบเดิมบน mongomock
+# เวลาที่มีความหมายต้องวัดกับ MongoDB จริง (--mongodb-uri) ส่วนขนาดข้อมูลเหมือนกันทั้งสองแบบ
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+
+import bson
+
+from benchmarks.data import generate_moods
+from benchmarks.stats import legacy_stats
+from mood_import import validate_row
+from mood_statistics import aggregate_counts, counts_pipeline, summarize
+
+DEFAULT_SIZES = (1000, 10000)
+
+DATABASE = 'mood_tracker_benchmark_facet'
+USER_ID = 'facet_user'
+
+
+def bson_size(documents):
+    return sum(len(bson.encode(document)) for document in documents)
+
+
+def legacy_page(collection):
+    """โค้ดเดิม: ดึงทุก document (รวม detail) แล้วคำนวณใน Python"""
+    return legacy_stats(list(collection.find({'user_id': USER_ID})))
+
+
+def facet_page(collection):
+    """แบบใหม่: $facet round trip เดียว"""
+    return summarize(aggregate_counts(collection, USER_ID))
+
+
+def same_stats(legacy, facet):
+    """เทียบผลสองแบบ รายการ Top N ที่จำนวนเท่ากันอาจเรียงต่างกันได้ (ลำดับของ $group ไม่แน่นอน)"""
+    def same_top(a, b):
+        return (sorted(a.values()) == sorted(b.values())
+                and all(a[key] == b[key] for key in a.keys() & b.keys()))
+
+    return (legacy['total_moods'] == facet['total_moods']
+            and legacy['color_stats'] == facet['color_stats']
+            and all(same_top(legacy['color_triggers'][color], facet['color_triggers'][color])
+                    for color in legacy['color_triggers'])
+            and same_top(legacy['emotion_stats'], facet['emotion_stats'])
+            and same_top(legacy['trigger_stats'], facet['trigger_stats']))
+
+
+def load_moods(collection, size, seed):
+    collection.delete_many({})
+    moods = []
+    for row in generate_moods(random.Random(seed), size):
+        mood, error = validate_row(row)
+        if error is not None:
+            raise ValueError(f'generated row is invalid: {error}')
+        mood.update({'user_id': USER_ID, 'created_at': mood['occurred_at']})
+        moods.append(mood)
+    if moods:
+        collection.insert_many(moods)
+    collection.create_index([('user_id', 1), ('occurred_at', -1)])
+
+
+def measure(func, collection, repeat):
+    """เวลาต่อครั้ง (ms) คืนค่า (median, min, ผลลัพธ์ของครั้งสุดท้าย)"""
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = func(collection)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return round(statistics.median(timings), 3), round(min(timings), 3), result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='เทียบหน้าสถิติแบบดึงทุกบันทึกกับ $facet ตามจำนวนบันทึก')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--mongodb-uri', help='ใช้ MongoDB จริง (ค่าเริ่มต้น: mongomock)')
+    parser.add_argument('--output', help='ไฟล์ JSON ของผลลัพธ์ (ค่าเริ่มต้น: stdout)')
+    args = parser.parse_args(argv)
+
+    if args.mongodb_uri:
+        from pymongo import MongoClient
+        client = MongoClient(args.mongodb_uri)
+    else:
+        import mongomock
+        client = mongomock.MongoClient()
+    client.drop_database(DATABASE)
+    collection = client[DATABASE]['moods']
+
+    results = {}
+    print(f"{'entries':>10}{'legacy ms':>12}{'facet ms':>12}{'legacy KiB':>12}{'facet KiB':>12}", file=sys.stderr)
+    try:
+        for size in (int(size) for size in args.sizes.split(',') if size.strip()):
+            load_moods(collection, size, args.seed)
+            legacy_median, legacy_min, legacy_result = measure(legacy_page, collection, args.repeat)
+            facet_median, facet_min, facet_result = measure(facet_page, collection, args.repeat)
+            # ขนาดผลลัพธ์วัดแยกจากเวลา (คำสั่งเดียวกับที่แต่ละแบบส่ง)
+            legacy_bytes = bson_size(collection.find({'user_id': USER_ID}))
+            facet_bytes = bson_size(collection.aggregate(counts_pipeline(USER_ID)))
+            if not same_stats(legacy_result, facet_result):
+                raise SystemExit(f'results differ at {size} entries')
+
+            results[str(size)] = {
+                'legacy': {'ms': {'median': legacy_median, 'min': legacy_min}, 'bytes': legacy_bytes},
+                'facet': {'ms': {'median': facet_median, 'min': facet_min}, 'bytes': facet_bytes},
+                'speedup': round(legacy_median / facet_median, 2) if facet_median else None
+            }
+            print(f'{size:>10}{legacy_median:>12}{facet_median:>12}'
+                  f'{legacy_bytes / 1024:>12.1f}{facet_bytes / 1024:>12.1f}', file=sys.stderr)
+    finally:
+        client.drop_database(DATABASE)
+
+    output = json.dumps({
+        'backend': 'mongodb' if args.mongodb_uri else 'mongomock',
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'sizes': results
+    }, indent=2, sort_keys=True) + '\n'
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
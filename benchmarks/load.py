@@ -0,0 +1,327 @@
+# วัด requests/sec ของแต่ละการตั้งค่า gunicorn (worker class, จำนวน worker, thread) ด้วย gunicorn.conf.py จริง
+# ข้อมูลอยู่ใน mongomock ที่โหลดครั้งเดียวใน master แล้ว fork ไปให้ทุก worker (GUNICORN_PRELOAD)
+#
+#   python -m benchmarks.load
+#   python -m benchmarks.load --configs sync:4x1,gthread:2x4 --concurrency 32 --duration 20 --output load.json
+#
+# หมายเหตุ:
+#   - แต่ละ worker มีสำเนาข้อมูลของตัวเอง (ไม่มี MongoDB กลาง) จึงวัดเฉพาะ route ที่อ่านอย่างเดียว
+#   - mongomock ทำงานใน process ของ worker (ใช้ CPU แทน network) ตัวเลขใช้เทียบการตั้งค่ากันเองเท่านั้น
+#     และใช้พร้อมกันหลาย thread ไม่ได้ จึงเรียกทีละคำสั่งต่อ worker (gthread ได้ประโยชน์น้อยกว่า MongoDB จริง)
+#   - client ยิงจาก process นี้ด้วย thread จึงแย่ง CPU กับ gunicorn บนเครื่องเดียวกัน
+import argparse
+import http.client
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlencode
+
+from benchmarks.data import PASSWORD, benchmark_username
+from benchmarks.run import DEFAULT_END_DATE, build_routes, summarize
+
+REPORT_VERSION = 1
+
+# <worker class>:<จำนวน worker>x<thread ต่อ worker>
+DEFAULT_CONFIGS = ('sync:1x1', 'sync:4x1', 'gthread:1x4', 'gthread:2x4', 'gthread:4x4')
+
+DEFAULT_ROUTES = ('dashboard', 'history', 'api_history', 'api_sync', 'api_search', 'statistics')
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Locked:
+    """เรียก method ของ collection/cursor ทีละ thread (mongomock แก้ dict ภายในระหว่าง query)
+
+    cursor ของ mongomock query ตอนอ่าน จึงห่อ cursor ด้วยและอ่านทั้งหมดภายใน lock
+    """
+
+    def __init__(self, target, lock):
+        self._target = target
+        self._lock = lock
+        self._rows = None
+
+    def __getattr__(self, attr):
+        value = getattr(self._target, attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            with self._lock:
+                result = value(*args, **kwargs)
+            return Locked(result, self._lock) if type(result).__name__ in ('Cursor', 'CommandCursor') else result
+        return call
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._rows is None:
+            with self._lock:
+                self._rows = iter(list(self._target))
+        return next(self._rows)
+
+
+def serve_app():
+    """WSGI app สำหรับ gunicorn (`benchmarks.load:serve_app()`): mongomock + ข้อมูลจำลองตาม BENCHMARK_*"""
+    from functools import partial
+
+    import mongomock
+    from mongomock.store import ServerStore
+
+    import mongo
+    # client ที่สร้างใหม่หลัง fork ใช้ store เดียวกับที่โหลดไว้ใน master
+    mongo.MongoClient = partial(mongomock.MongoClient, _store=ServerStore())
+
+    import app as app_module
+    from benchmarks.data import load_dataset
+
+    lock = threading.RLock()
+    collection = app_module.mongo.collection
+    app_module.mongo.collection = lambda name, read_preference=None: Locked(
+        collection(name, read_preference), lock)
+
+    app_module.ensure_indexes()
+    load_dataset(app_module, int(os.environ['BENCHMARK_SEED']), int(os.environ['BENCHMARK_USERS']),
+                 int(os.environ['BENCHMARK_ENTRIES']))
+    return app_module.app
+
+
+def parse_config(text):
+    worker_class, _, size = text.partition(':')
+    workers, _, threads = size.partition('x')
+    if worker_class not in ('sync', 'gthread') or not workers.isdigit() or not threads.isdigit():
+        raise ValueError(text)
+    return worker_class, int(workers), int(threads)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Server:
+    """gunicorn หนึ่งชุดตามการตั้งค่า (ใช้กับ with)"""
+
+    def __init__(self, config, args, work_dir):
+        self.worker_class, self.workers, self.threads = parse_config(config)
+        self.port = free_port()
+        self.log_path = os.path.join(work_dir, f"gunicorn-{config.replace(':', '-')}.log")
+        self.env = {
+            **os.environ,
+            'PORT': str(self.port),
+            'WEB_CONCURRENCY': str(self.workers),
+            'GUNICORN_WORKER_CLASS': self.worker_class,
+            'GUNICORN_THREADS': str(self.threads),
+            'GUNICORN_PRELOAD': 'true',
+            'GUNICORN_MAX_REQUESTS': '0',
+            'GUNICORN_ACCESS_LOG': os.devnull,
+            'GUNICORN_LOG_LEVEL': 'warning',
+            'BENCHMARK_SEED': str(args.seed),
+            'BENCHMARK_USERS': str(args.users),
+            'BENCHMARK_ENTRIES': str(args.entries),
+            'BCRYPT_ROUNDS': str(args.bcrypt_rounds),
+            'FRAGMENT_CACHE_BACKEND': 'memory' if args.warm_cache else 'none',
+            'EXPORT_SPOOL_DIR': os.path.join(work_dir, 'exports'),
+            'PDF_CACHE_DIR': os.path.join(work_dir, 'pdf_cache'),
+            'SLOW_REQUEST_MS': '0'
+        }
+        self.env.pop('MONGODB_URI', None)
+        self.process = None
+
+    def __enter__(self):
+        self.log = open(self.log_path, 'wb')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'benchmarks.load:serve_app()'],
+            cwd=REPO_DIR, env=self.env, stdout=self.log, stderr=subprocess.STDOUT)
+        return self
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(30)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.log.close()
+
+    def wait_until_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                break
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=5)
+                connection.request('GET', '/login')
+                if connection.getresponse().status == 200:
+                    return
+            except OSError:
+                time.sleep(0.2)
+        with open(self.log_path, encoding='utf-8', errors='replace') as f:
+            raise RuntimeError(f'gunicorn did not start:\n{f.read()[-2000:]}')
+
+
+class Client(threading.Thread):
+    """ผู้ใช้หนึ่งคน: login แล้วยิง route วนไปเรื่อยๆ ผ่าน connection เดียว (keep-alive)"""
+
+    def __init__(self, port, username, routes, start_at, stop_at):
+        super().__init__(daemon=True)
+        self.port = port
+        self.username = username
+        self.routes = routes
+        self.start_at = start_at
+        self.stop_at = stop_at
+        self.latencies = []
+        self.statuses = Counter()
+        self.errors = 0
+        self.connection = None
+        self.cookie = None
+
+    def send(self, method, path, body=None, headers=None):
+        headers = dict(headers or {})
+        if self.cookie:
+            headers['Cookie'] = self.cookie
+        if self.connection is None:
+            self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            self.connection = None
+            raise
+        cookie = response.getheader('Set-Cookie')
+        if cookie:
+            self.cookie = cookie.split(';', 1)[0]
+        return response.status
+
+    def run(self):
+        body = urlencode({'username': self.username, 'password': PASSWORD})
+        try:
+            status = self.send('POST', '/login', body, {'Content-Type': 'application/x-www-form-urlencoded'})
+        except (OSError, http.client.HTTPException):
+            status = None
+        if status != 302:
+            self.errors += 1
+            return
+
+        index = 0
+        while time.monotonic() < self.stop_at:
+            route = self.routes[index % len(self.routes)]
+            index += 1
+            started_at = time.monotonic()
+            try:
+                status = self.send(route.method, route.path, headers=route.headers)
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                continue
+            # ไม่นับช่วง warm up
+            if started_at >= self.start_at:
+                self.latencies.append((time.monotonic() - started_at) * 1000)
+                self.statuses[str(status)] += 1
+
+
+def run_config(config, args, routes, work_dir):
+    with Server(config, args, work_dir) as server:
+        server.wait_until_ready(args.startup_timeout)
+        start_at = time.monotonic() + args.warmup
+        stop_at = start_at + args.duration
+        clients = [Client(server.port, benchmark_username(index % args.users), routes, start_at, stop_at)
+                   for index in range(args.concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+
+    latencies = [latency for client in clients for latency in client.latencies]
+    statuses = sum((client.statuses for client in clients), Counter())
+    worker_class, workers, threads = parse_config(config)
+    return {
+        'worker_class': worker_class,
+        'workers': workers,
+        'threads': threads,
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / args.duration, 1),
+        'status': dict(sorted(statuses.items())),
+        'errors': sum(client.errors for client in clients),
+        'latency_ms': summarize(latencies)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test การตั้งค่า gunicorn ด้วยข้อมูลจำลองใน mongomock')
+    parser.add_argument('--configs', default=','.join(DEFAULT_CONFIGS),
+                        help='<sync|gthread>:<workers>x<threads> คั่นด้วย ,')
+    parser.add_argument('--routes', default=','.join(DEFAULT_ROUTES))
+    parser.add_argument('--concurrency', type=int, default=16, help='จำนวน client ที่ยิงพร้อมกัน')
+    parser.add_argument('--duration', type=float, default=10, help='วินาทีที่วัดต่อการตั้งค่า')
+    parser.add_argument('--warmup', type=float, default=2, help='วินาทีแรกที่ไม่นับ')
+    parser.add_argument('--entries', type=int, default=1000, help='จำนวนบันทึกต่อผู้ใช้')
+    parser.add_argument('--users', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--bcrypt-rounds', type=int, default=4, help='login ครั้งเดียวต่อ client จึงลดไว้')
+    parser.add_argument('--warm-cache', action='store_true', help='เปิด fragment cache (memory)')
+    parser.add_argument('--startup-timeout', type=float, default=300, help='วินาทีที่รอ gunicorn โหลดข้อมูล')
+    parser.add_argument('--output', help='ไฟล์ JSON ของผลลัพธ์ (ค่าเริ่มต้น: stdout)')
+    args = parser.parse_args(argv)
+
+    try:
+        configs = [config.strip() for config in args.configs.split(',') if config.strip()]
+        for config in configs:
+            parse_config(config)
+    except ValueError as e:
+        parser.error(f'invalid config: {e}')
+    all_routes = build_routes(DEFAULT_END_DATE, iter(()))
+    route_names = [name.strip() for name in args.routes.split(',') if name.strip()]
+    unknown = [name for name in route_names if name not in DEFAULT_ROUTES]
+    if unknown:
+        parser.error(f"unknown route(s): {', '.join(unknown)} (รองรับ: {', '.join(DEFAULT_ROUTES)})")
+    routes = [all_routes[name] for name in route_names]
+
+    results = {}
+    print(f"{'config':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}", file=sys.stderr)
+    with tempfile.TemporaryDirectory(prefix='mood_load_') as work_dir:
+        for config in configs:
+            result = run_config(config, args, routes, work_dir)
+            results[config] = result
+            latency = result['latency_ms']
+            print(f"{config:<14}{result['requests_per_second']:>10}{latency.get('p50', '-'):>10}"
+                  f"{latency.get('p95', '-'):>10}{latency.get('p99', '-'):>10}{result['errors']:>8}",
+                  file=sys.stderr)
+
+    import gunicorn
+    report = {
+        'version': REPORT_VERSION,
+        'config': {
+            'concurrency': args.concurrency,
+            'duration': args.duration,
+            'warmup': args.warmup,
+            'entries_per_user': args.entries,
+            'users': args.users,
+            'seed': args.seed,
+            'routes': route_names,
+            'warm_cache': args.warm_cache,
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+            'gunicorn': gunicorn.__version__
+        },
+        'configs': results
+    }
+    output = json.dumps(report, indent=2, sort_keys=True) + '\n'
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,393 @@
+# วัดเวลาตอบ, จำนวนคำสั่ง MongoDB และหน่วยความจำสูงสุดของแต่ละ route
+# ยิง request ผ่าน Flask test client (ไม่มี network/gunicorn) กับ MongoDB จริง หรือ mongomock
+# ผลเป็น JSON (เรียง key, ไม่มีเวลาที่รัน) จึง diff ระหว่าง release ได้ตรงๆ
+#
+# หมายเหตุ:
+#   - mongomock ไม่ส่ง event ของ pymongo จึงนับคำสั่งจากการเรียก method ของ collection แทน
+#     (find นับ 1 ครั้ง ไม่นับ getMore) ตัวเลขเวลาใช้เทียบกันเองเท่านั้น ไม่ใช่เวลาของ MongoDB จริง
+#   - Export PDF วัดเฉพาะฝั่ง request (ดึงข้อมูล + render HTML + เขียนไฟล์เข้าคิว)
+#     การแปลง PDF ถูกแทนด้วยไฟล์เปล่า (เวลาของ wkhtmltopdf ดูได้จาก pdf_render_seconds ใน /metrics)
+#   - หน่วยความจำวัดด้วย tracemalloc (เฉพาะ object ของ Python) ในรอบแยกจากการจับเวลา
+#   - เวลาของ login ขึ้นกับ BCRYPT_ROUNDS
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from benchmarks.data import (DEFAULT_DAYS, DEFAULT_END_DATE, PASSWORD, benchmark_username,
+                             generate_moods, load_dataset)
+from pdf_renderers import PdfRenderer
+
+REPORT_VERSION = 1
+
+DEFAULT_ROUTES = ('login', 'dashboard', 'history', 'api_history', 'api_sync', 'api_search', 'statistics',
+                  'export_pdf', 'export_pdf_full', 'export_pdf_filtered', 'export_ndjson', 'export_csv_filtered',
+                  'add_mood')
+
+# form: ฟังก์ชันที่คืนค่าข้อมูลฟอร์มของแต่ละ request, fresh_client: ใช้ client ใหม่ (ยังไม่ login) ทุกครั้ง
+Route = namedtuple('Route', 'name method path form headers fresh_client', defaults=(None, None, False))
+
+JSON_HEADERS = {'Accept': 'application/json'}
+
+# คำสั่ง MongoDB ที่ method ของ collection ส่ง (ใช้นับตอนรันกับ mongomock)
+COLLECTION_COMMANDS = {
+    'find': 'find',
+    'find_one': 'find',
+    'count_documents': 'aggregate',
+    'estimated_document_count': 'count',
+    'aggregate': 'aggregate',
+    'distinct': 'distinct',
+    'insert_one': 'insert',
+    'insert_many': 'insert',
+    'update_one': 'update',
+    'update_many': 'update',
+    'replace_one': 'update',
+    'bulk_write': 'bulkWrite',
+    'delete_one': 'delete',
+    'delete_many': 'delete',
+    'find_one_and_update': 'findAndModify',
+    'create_index': 'createIndexes'
+}
+
+
+class CountingCollection:
+    """ห่อ collection ของ mongomock ให้รายงานคำสั่งแบบเดียวกับ CommandTimingListener"""
+
+    def __init__(self, collection, callback):
+        self._collection = collection
+        self._callback = callback
+
+    def __getattr__(self, attr):
+        value = getattr(self._collection, attr)
+        command = COLLECTION_COMMANDS.get(attr)
+        if command is None:
+            return value
+
+        def call(*args, **kwargs):
+            started_at = time.perf_counter()
+            ok = False
+            try:
+                result = value(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                self._callback(command, self._collection.name, time.perf_counter() - started_at, ok)
+        return call
+
+
+class PlaceholderRenderer(PdfRenderer):
+    """เขียนไฟล์ PDF เปล่าแทนการแปลงจริง (วัดเฉพาะฝั่ง request)"""
+    name = 'placeholder'
+
+    def render(self, html_path, pdf_path):
+        with open(pdf_path, 'wb') as f:
+            f.write(b'%PDF-1.4\n%%EOF\n')
+
+
+def percentile(sorted_values, q):
+    """percentile แบบ nearest-rank"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(values, digits=3):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        'p50': round(percentile(values, 50), digits),
+        'p95': round(percentile(values, 95), digits),
+        'p99': round(percentile(values, 99), digits),
+        'mean': round(sum(values) / len(values), digits),
+        'max': round(values[-1], digits)
+    }
+
+
+def build_routes(end_date, add_rows):
+    month = end_date.strftime('%Y-%m')
+    filtered = urlencode([
+        ('colors', 'แดง'), ('colors', 'น้ำเงิน'),
+        ('start_date', (end_date - timedelta(days=89)).strftime('%Y-%m-%d')),
+        ('end_date', end_date.strftime('%Y-%m-%d')),
+        ('sort_order', 'desc')
+    ])
+    return {route.name: route for route in [
+        Route('login', 'POST', '/login',
+              form=lambda: {'username': benchmark_username(0), 'password': PASSWORD}, fresh_client=True),
+        Route('dashboard', 'GET', '/dashboard'),
+        Route('history', 'GET', '/history'),
+        Route('api_history', 'GET', f'/api/history?month={month}'),
+        Route('api_sync', 'GET', '/api/sync'),
+        # mongomock ไม่มี $text จึงวัดได้แค่แบบ regex (ใช้ --mongodb-uri เพื่อวัด text index จริง)
+        Route('api_search', 'GET', f"/api/search?{urlencode({'q': 'งาน'})}"),
+        Route('statistics', 'GET', '/statistics'),
+        Route('export_pdf', 'GET', '/export-pdf', headers=JSON_HEADERS),
+        Route('export_pdf_full', 'GET', '/export-pdf-full', headers=JSON_HEADERS),
+        Route('export_pdf_filtered', 'GET', f'/export-pdf-filtered?{filtered}', headers=JSON_HEADERS),
+        Route('export_ndjson', 'GET', '/export?format=ndjson'),
+        Route('export_csv_filtered', 'GET', f'/export?format=csv&{filtered}'),
+        Route('add_mood', 'POST', '/add', form=lambda: next(add_rows))
+    ]}
+
+
+class Harness:
+    def __init__(self, app_module):
+        self.app_module = app_module
+        self.traces = []
+        self.client = app_module.app.test_client()
+
+        # เก็บ trace ของทุก request ที่ metrics บันทึกเสร็จ (จำนวนและเวลาของคำสั่ง MongoDB)
+        metrics = app_module.metrics
+        finish_request = metrics.finish_request
+
+        def finish_and_keep():
+            trace = finish_request()
+            if trace is not None:
+                self.traces.append(trace)
+            return trace
+        metrics.finish_request = finish_and_keep
+
+    def login(self):
+        response = self.client.post('/login', data={'username': benchmark_username(0), 'password': PASSWORD})
+        if response.status_code != 302:
+            raise RuntimeError(f'login failed with status {response.status_code}')
+        self.client.get('/dashboard').close()  # อ่าน flash ทิ้ง
+
+    def request(self, route):
+        """ส่ง request หนึ่งครั้ง คืนค่า (วินาที, status, trace, ขนาด response เป็น byte)"""
+        client = self.app_module.app.test_client() if route.fresh_client else self.client
+        kwargs = {'headers': route.headers}
+        if route.form is not None:
+            kwargs['data'] = route.form()
+        del self.traces[:]
+
+        started_at = time.perf_counter()
+        response = client.open(route.path, method=route.method, **kwargs)
+        # อ่านทีละ chunk ไม่เก็บทั้ง response ไว้ (peak memory ของ route แบบ stream จึงไม่รวมขนาด response)
+        size = sum(len(chunk) for chunk in response.iter_encoded())
+        response.close()
+        seconds = time.perf_counter() - started_at
+
+        self.wait_for_exports()
+        trace = self.traces[-1] if self.traces else None
+        return seconds, response.status_code, trace, size
+
+    def wait_for_exports(self):
+        # ให้งาน PDF เสร็จก่อน request ถัดไป (ไม่นับเวลา) เพื่อไม่ให้ thread แปลงไฟล์แย่ง CPU ระหว่างจับเวลา
+        while self.app_module.export_queue.stats()['pending']:
+            time.sleep(0.001)
+
+    def run(self, route, iterations, warmup, memory_iterations):
+        for _ in range(warmup):
+            self.request(route)
+
+        latencies, round_trips, mongo_ms, sizes, statuses = [], [], [], [], Counter()
+        for _ in range(iterations):
+            seconds, status, trace, size = self.request(route)
+            latencies.append(seconds * 1000)
+            sizes.append(size / 1024)
+            statuses[str(status)] += 1
+            if trace is not None:
+                round_trips.append(len(trace.mongo))
+                mongo_ms.append(trace.mongo_seconds() * 1000)
+
+        peak = 0
+        if memory_iterations:
+            tracemalloc.start()
+            try:
+                for _ in range(memory_iterations):
+                    baseline = tracemalloc.get_traced_memory()[0]
+                    tracemalloc.reset_peak()
+                    self.request(route)
+                    peak = max(peak, tracemalloc.get_traced_memory()[1] - baseline)
+            finally:
+                tracemalloc.stop()
+
+        return {
+            'method': route.method,
+            'path': route.path,
+            'iterations': iterations,
+            'status': dict(sorted(statuses.items())),
+            'latency_ms': summarize(latencies),
+            'mongo_round_trips': summarize(round_trips, digits=1),
+            'mongo_ms': summarize(mongo_ms),
+            'response_kib': summarize(sizes, digits=1),
+            # byte ของ response ต่อวินาที (stream อย่าง /export ควรได้ค่าคงที่เมื่อข้อมูลมากขึ้น)
+            'throughput_mib_s': round(sum(sizes) / 1024 / (sum(latencies) / 1000), 2) if sum(latencies) else None,
+            'peak_memory_kib': round(peak / 1024, 1) if memory_iterations else None
+        }
+
+
+def configure_environment(args, work_dir):
+    """ตั้งค่า environment ก่อน import app (ค่าที่อ่านตอน import)"""
+    os.environ['EXPORT_SPOOL_DIR'] = os.path.join(work_dir, 'exports')
+    os.environ['PDF_CACHE_DIR'] = os.path.join(work_dir, 'pdf_cache')
+    os.environ['FRAGMENT_CACHE_BACKEND'] = 'memory' if args.warm_cache else 'none'
+    os.environ['SLOW_REQUEST_MS'] = '0'
+    os.environ.pop('METRICS_TOKEN', None)
+    if args.mongodb_uri:
+        os.environ['MONGODB_URI'] = args.mongodb_uri
+
+
+def import_app(args):
+    import mongo
+    if not args.mongodb_uri:
+        import mongomock
+        mongo.MongoClient = mongomock.MongoClient
+
+    import app as app_module
+    from caching import FileLRUCache
+    from export_jobs import ExportJobQueue
+
+    app_module.mongo.db_name = args.database
+    if not args.mongodb_uri:
+        collection = app_module.mongo.collection
+        app_module.mongo.collection = lambda name, read_preference=None: CountingCollection(
+            collection(name, read_preference), app_module.metrics.record_mongo)
+
+    # แปลง PDF ใน thread ของ process นี้ด้วยไฟล์เปล่า ไม่จำกัดงานต่อผู้ใช้
+    class InlineExportQueue(ExportJobQueue):
+        def _get_executor(self):
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1)
+            return self._executor
+
+    app_module.PDF_ENABLED = True
+    app_module.pdf_renderer = PlaceholderRenderer()
+    app_module.export_queue = InlineExportQueue(os.environ['EXPORT_SPOOL_DIR'], app_module.pdf_renderer,
+                                                max_pending=10 ** 6, max_pending_per_user=10 ** 6)
+    if not args.warm_cache:
+        # ขนาด 0 = ลบไฟล์ทันทีที่เขียน ทุก request จึงสร้าง PDF ใหม่
+        app_module.pdf_cache = FileLRUCache(os.environ['PDF_CACHE_DIR'], max_bytes=0, suffix='.pdf')
+    return app_module
+
+
+def compare(baseline, report):
+    """ตารางเปรียบเทียบ p50/p95/p99 และจำนวนคำสั่ง MongoDB กับผลครั้งก่อน"""
+    lines = [f"{'route':<22}{'metric':<18}{'baseline':>12}{'current':>12}{'change':>10}"]
+    for name, current in report['routes'].items():
+        previous = baseline.get('routes', {}).get(name)
+        if previous is None:
+            lines.append(f'{name:<22}(new)')
+            continue
+        rows = [(f'latency {q}', previous['latency_ms'].get(q), current['latency_ms'].get(q))
+                for q in ('p50', 'p95', 'p99')]
+        rows.append(('mongo p50', previous['mongo_round_trips'].get('p50'), current['mongo_round_trips'].get('p50')))
+        rows.append(('response KiB p50', previous.get('response_kib', {}).get('p50'),
+                     current.get('response_kib', {}).get('p50')))
+        rows.append(('peak KiB', previous.get('peak_memory_kib'), current.get('peak_memory_kib')))
+        for metric, old, new in rows:
+            if old is None or new is None:
+                continue
+            change = f'{(new - old) / old * 100:+.1f}%' if old else '-'
+            lines.append(f'{name:<22}{metric:<18}{old:>12}{new:>12}{change:>10}')
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark route ของแอปด้วยข้อมูลจำลอง')
+    parser.add_argument('--entries', type=int, default=1000, help='จำนวนบันทึกต่อผู้ใช้')
+    parser.add_argument('--users', type=int, default=1, help='จำนวนผู้ใช้ (วัดด้วยผู้ใช้คนแรก)')
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help='ช่วงวันของบันทึก')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--iterations', type=int, default=50)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--memory-iterations', type=int, default=3, help='0 = ไม่วัดหน่วยความจำ')
+    parser.add_argument('--routes', default=','.join(DEFAULT_ROUTES))
+    parser.add_argument('--warm-cache', action='store_true', help='เปิด fragment cache และ PDF cache')
+    parser.add_argument('--mongodb-uri', help='ใช้ MongoDB จริง (ค่าเริ่มต้น: mongomock)')
+    parser.add_argument('--database', default='mood_tracker_benchmark',
+                        help='ฐานข้อมูลที่ใช้ (ถูกลบทั้งหมดก่อนและหลังรัน)')
+    parser.add_argument('--keep-data', action='store_true', help='ไม่ลบฐานข้อมูลหลังรันเสร็จ')
+    parser.add_argument('--output', help='ไฟล์ JSON ของผลลัพธ์ (ค่าเริ่มต้น: stdout)')
+    parser.add_argument('--baseline', help='ไฟล์ JSON ผลครั้งก่อน สำหรับแสดงการเปลี่ยนแปลง')
+    args = parser.parse_args(argv)
+
+    if args.database == 'mood_tracker':
+        parser.error('ห้ามใช้ฐานข้อมูลของแอป (mood_tracker) เพราะจะถูกลบ')
+    route_names = [name.strip() for name in args.routes.split(',') if name.strip()]
+    unknown = [name for name in route_names if name not in DEFAULT_ROUTES]
+    if unknown:
+        parser.error(f"unknown route(s): {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix='mood_benchmark_') as work_dir:
+        configure_environment(args, work_dir)
+        app_module = import_app(args)
+        app_module.app.config['TESTING'] = True
+        client = app_module.mongo.client
+        client.drop_database(args.database)
+
+        try:
+            app_module.ensure_indexes()
+        except Exception as e:
+            # MongoDB รุ่นเก่า/mongomock อาจสร้าง index บางแบบไม่ได้ (route ยังทำงานได้แต่ช้ากว่า)
+            print(f"⚠️ Warning: cannot create all indexes. Error: {e}", file=sys.stderr)
+
+        started_at = time.perf_counter()
+        load_dataset(app_module, args.seed, args.users, args.entries, days=args.days,
+                     on_batch=lambda written: print(f'loaded {written} moods', end='\r', file=sys.stderr))
+        load_seconds = time.perf_counter() - started_at
+        print(f'loaded {args.users * args.entries} moods in {load_seconds:.1f}s', file=sys.stderr)
+
+        # บันทึกที่ add_mood ส่ง (ชุดแยกจากข้อมูลตั้งต้น จำนวนเท่ากับ request ทั้งหมดของ route นี้)
+        add_count = args.warmup + args.iterations + args.memory_iterations
+        add_rows = generate_moods(random.Random(args.seed + 1), add_count, DEFAULT_END_DATE, args.days)
+        routes = build_routes(DEFAULT_END_DATE, add_rows)
+
+        harness = Harness(app_module)
+        harness.login()
+        results = {}
+        try:
+            for name in route_names:
+                print(f'running {name}', file=sys.stderr)
+                results[name] = harness.run(routes[name], args.iterations, args.warmup, args.memory_iterations)
+        finally:
+            if not args.keep_data:
+                client.drop_database(args.database)
+
+    import pymongo
+    report = {
+        'version': REPORT_VERSION,
+        'config': {
+            'seed': args.seed,
+            'users': args.users,
+            'entries_per_user': args.entries,
+            'days': args.days,
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'memory_iterations': args.memory_iterations,
+            'warm_cache': args.warm_cache,
+            'backend': 'mongodb' if args.mongodb_uri else 'mongomock',
+            'bcrypt_rounds': app_module.password_hasher.rounds,
+            'python': platform.python_version(),
+            'pymongo': pymongo.version
+        },
+        'routes': results
+    }
+
+    output = json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True) + '\n'
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            print(compare(json.load(f), report), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+# เทียบการคำนวณสถิติแบบรอบเดียว (mood_statistics.compute_stats) กับโค้ดเดิมที่วนรายการหลายรอบ
+# วัดเฉพาะการคำนวณใน Python (ข้อมูลอยู่ในหน่วยความจำแล้ว) ที่ 1k / 10k / 100k รายการ
+#
+#   python -m benchmarks.stats
+#   python -m benchmarks.stats --sizes 1000,10000 --repeat 10 --output stats.json
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from collections import Counter
+
+from benchmarks.data import generate_moods
+from mood_statistics import STATS_PROJECTION, compute_stats
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+
+def legacy_stats(moods):
+    """โค้ดเดิมของหน้าสถิติ (list comprehension ต่อสี + loop แยกต่อกลุ่ม)"""
+    total_moods = len(moods)
+    color_stats = {
+        'แดง': len([m for m in moods if m.get('color') == 'แดง']),
+        'เหลือง': len([m for m in moods if m.get('color') == 'เหลือง']),
+        'น้ำเงิน': len([m for m in moods if m.get('color') == 'น้ำเงิน']),
+        'เขียว': len([m for m in moods if m.get('color') == 'เขียว'])
+    }
+
+    color_triggers = {'แดง': {}, 'เหลือง': {}, 'น้ำเงิน': {}, 'เขียว': {}}
+    for mood in moods:
+        color = mood.get('color', '')
+        trigger = mood.get('trigger', 'ไม่ระบุ')
+        if color in color_triggers:
+            if trigger in color_triggers[color]:
+                color_triggers[color][trigger] += 1
+            else:
+                color_triggers[color][trigger] = 1
+    for color in color_triggers:
+        sorted_triggers = sorted(color_triggers[color].items(), key=lambda x: x[1], reverse=True)[:5]
+        color_triggers[color] = dict(sorted_triggers)
+
+    emotions = [m.get('emotion', '') for m in moods if m.get('emotion')]
+    triggers = [m.get('trigger', '') for m in moods if m.get('trigger')]
+    return {
+        'total_moods': total_moods,
+        'color_stats': color_stats,
+        'color_triggers': color_triggers,
+        'emotion_stats': dict(Counter(emotions).most_common(10)),
+        'trigger_stats': dict(Counter(triggers).most_common(10))
+    }
+
+
+def measure(func, moods, repeat):
+    """เวลาต่อครั้ง (ms) ของ func(moods) คืนค่า (median, min)"""
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        func(moods)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return round(statistics.median(timings), 3), round(min(timings), 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Microbenchmark การคำนวณสถิติ (รอบเดียว vs หลายรอบ)')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='ไฟล์ JSON ของผลลัพธ์ (ค่าเริ่มต้น: stdout)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'entries':>10}{'legacy ms':>12}{'single ms':>12}{'speedup':>10}", file=sys.stderr)
+    for size in (int(size) for size in args.sizes.split(',') if size.strip()):
+        # โค้ดเดิมได้ document ทั้งก้อน แบบใหม่ได้เฉพาะฟิลด์ใน STATS_PROJECTION
+        full = list(generate_moods(random.Random(args.seed), size))
+        projected = [{field: mood[field] for field in STATS_PROJECTION if field in mood} for mood in full]
+        if legacy_stats(full) != compute_stats(projected):
+            raise SystemExit(f'results differ at {size} entries')
+
+        legacy_median, legacy_min = measure(legacy_stats, full, args.repeat)
+        single_median, single_min = measure(compute_stats, projected, args.repeat)
+        results[str(size)] = {
+            'legacy_ms': {'median': legacy_median, 'min': legacy_min},
+            'single_pass_ms': {'median': single_median, 'min': single_min},
+            'speedup': round(legacy_median / single_median, 2) if single_median else None
+        }
+        print(f'{size:>10}{legacy_median:>12}{single_median:>12}{results[str(size)]["speedup"]:>10}', file=sys.stderr)
+
+    output = json.dumps({'repeat': args.repeat, 'seed': args.seed, 'sizes': results}, indent=2, sort_keys=True) + '\n'
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+
+if __name__ == '__main__':
+    main()
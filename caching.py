@@ -0,0 +1,262 @@
+# Cache ที่ใช้ในแอป (ในหน่วยความจำของ process และไฟล์บนดิสก์)
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+# นามสกุลของไฟล์ชั่วคราวระหว่างเขียนเข้า FileLRUCache
+TMP_SUFFIX = '.tmp'
+
+
+class TTLCache:
+    """LRU cache ขนาดจำกัด ที่แต่ละค่าหมดอายุหลัง ttl วินาที
+
+    ttl = 0 หมายถึงปิดการใช้งาน (get คืน None เสมอ, set ไม่เก็บอะไร)
+    """
+
+    def __init__(self, maxsize=1024, ttl=0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if not self.ttl:
+            return None
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def make_cache_key(*parts):
+    """สร้าง key จากข้อมูลที่ใช้สร้างผลลัพธ์ (ข้อมูลเหมือนกัน = key เหมือนกัน)"""
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class FileLRUCache:
+    """Cache ไฟล์บนดิสก์ จำกัดขนาดรวม ลบไฟล์ที่ไม่ได้ใช้นานที่สุดก่อน (ดูจาก mtime)
+
+    ใช้ไดเรกทอรีร่วมกันได้หลาย process บนเครื่องเดียวกัน
+    """
+
+    def __init__(self, directory, max_bytes, suffix=''):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}{self.suffix}')
+
+    def get(self, key):
+        """คืนค่า path ของไฟล์ใน cache หรือ None ถ้าไม่มี"""
+        path = self._path(key)
+        try:
+            os.utime(path)  # ใช้ล่าสุด = ลบทีหลัง
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def _tmp_path(self, path):
+        # แยกต่อ process และ thread (gthread worker หลาย thread อาจเขียน key เดียวกันพร้อมกัน)
+        return f'{path}.{os.getpid()}.{threading.get_ident()}{TMP_SUFFIX}'
+
+    def _publish(self, tmp_path, path):
+        """ย้ายไฟล์ชั่วคราวเข้า cache คืนค่า path หรือ None ถ้าไฟล์ชั่วคราวหายไป (ไม่ได้เก็บเข้า cache)"""
+        try:
+            os.replace(tmp_path, path)
+        except FileNotFoundError:
+            return None
+        self.evict()
+        return path
+
+    def put(self, key, source_path):
+        """คัดลอกไฟล์เข้า cache แล้วลบไฟล์เก่าถ้าเกินขนาดที่กำหนด"""
+        path = self._path(key)
+        tmp_path = self._tmp_path(path)
+        shutil.copyfile(source_path, tmp_path)
+        return self._publish(tmp_path, path)
+
+    def put_data(self, key, data):
+        """เขียนข้อมูล (bytes) เข้า cache โดยตรง แล้วลบไฟล์เก่าถ้าเกินขนาดที่กำหนด"""
+        path = self._path(key)
+        tmp_path = self._tmp_path(path)
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        return self._publish(tmp_path, path)
+
+    def evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            # ไฟล์ชั่วคราวที่ยังเขียนไม่เสร็จ (ของ thread/process อื่น) ไม่ใช่รายการใน cache
+            if name.endswith(TMP_SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+
+# ============================================================
+# Cache ส่วนของหน้าเว็บที่ render แล้ว (HTML เป็น str)
+# backend ต้องมีแค่ get(key) -> str หรือ None และ set(key, value)
+# ============================================================
+
+class MemoryFragmentBackend:
+    """เก็บใน dict ของ process จำกัดขนาดรวมเป็นไบต์ ลบอันที่ไม่ได้ใช้นานที่สุดก่อน"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.size -= len(old.encode('utf-8'))
+            self._data[key] = value
+            self.size += size
+            while self.size > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.size -= len(evicted.encode('utf-8'))
+
+
+class FileFragmentBackend:
+    """เก็บเป็นไฟล์ในไดเรกทอรี (ใช้ร่วมกันได้ทุก worker บนเครื่องเดียวกัน)"""
+
+    def __init__(self, directory, max_bytes):
+        self.files = FileLRUCache(directory, max_bytes, suffix='.html')
+
+    def get(self, key):
+        path = self.files.get(key)
+        if path is None:
+            return None
+        try:
+            with open(path, encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key, value):
+        self.files.put_data(key, value.encode('utf-8'))
+
+
+class RedisFragmentBackend:
+    """ใช้ client ที่มี API แบบ redis-py (get / set(..., ex=)) เช่น redis.Redis
+
+    ใช้ร่วมกันได้ทุกเครื่อง จำกัดหน่วยความจำด้วย maxmemory-policy allkeys-lru ของ Redis
+    """
+
+    def __init__(self, client, ttl=86400, prefix='fragment:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value.encode('utf-8'), ex=self.ttl)
+
+
+class FragmentCache:
+    """Cache HTML บางส่วนของหน้า key ควรมีเลขเวอร์ชันข้อมูลอยู่ด้วย จึงไม่ต้องลบ cache เอง
+
+    backend=None หมายถึงปิดการใช้งาน (get คืน None เสมอ)
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def get(self, key):
+        if self.backend is None:
+            return None
+        try:
+            value = self.backend.get(key)
+        except Exception as e:
+            # cache ใช้ไม่ได้ไม่ควรทำให้หน้าเว็บพัง แค่ render ใหม่
+            self.errors += 1
+            print(f"Fragment Cache Error: {e}")
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.backend is None:
+            return
+        try:
+            self.backend.set(key, value)
+        except Exception as e:
+            self.errors += 1
+            print(f"Fragment Cache Error: {e}")
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'errors': self.errors}
@@ -0,0 +1,317 @@
+# คิวงาน Export PDF แบบ asynchronous
+# request แค่เขียน HTML ลงไฟล์แล้วส่งเข้าคิว ได้ job id กลับไป ส่วนการแปลง PDF ทำใน process pool แยก
+# process ใน pool อยู่ต่อระหว่างงาน (warm up ตัวแปลงครั้งเดียวตอนเริ่ม) และถูกสร้างใหม่หลังทำครบ max_tasks_per_worker งาน
+# สถานะงานเก็บเป็นไฟล์ JSON ใน spool directory ทำให้ทุก worker บนเครื่องเดียวกันอ่านสถานะได้
+# งานที่ยังไม่เสร็จมีไฟล์ <job_id>.pending อยู่ด้วย ขีดจำกัดจำนวนงานนับจากไฟล์เหล่านี้ (ใช้ร่วมกันทุก worker)
+# โดยล็อกไฟล์ไว้ระหว่างนับและเพิ่มงาน
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+from metrics import PDF_BUCKETS, TimingHistogram
+
+try:
+    import fcntl
+except ImportError:
+    # Windows (ตอนพัฒนา): ไม่ล็อก ขีดจำกัดอาจเกินได้เล็กน้อยถ้าส่งงานพร้อมกันหลาย worker
+    fcntl = None
+
+LOCK_NAME = '.lock'
+PENDING_SUFFIX = '.pending'
+
+
+class ExportQueueFull(Exception):
+    """คิวเต็ม (ทั้งระบบ หรือของผู้ใช้คนนั้น)"""
+
+
+def _warm_up_worker(warm_up):
+    # ถ้า warm up ไม่สำเร็จ ปล่อยให้งานจริงรายงานข้อผิดพลาดเอง (exception ใน initializer ทำให้ทั้ง pool ใช้ไม่ได้)
+    try:
+        warm_up()
+    except Exception as e:
+        print(f"PDF Renderer Warm-up Error: {e}")
+
+
+def _ready():
+    return os.getpid()
+
+
+def _timed_render(render, html_path, path):
+    # วัดเวลาใน process ลูก จึงได้เวลาของ wkhtmltopdf จริง ไม่รวมเวลารอคิว
+    started_at = time.perf_counter()
+    render(html_path, path)
+    return time.perf_counter() - started_at
+
+
+class ExportJobQueue:
+    def __init__(self, spool_dir, render, max_workers=2, max_pending=8,
+                 max_pending_per_user=1, ttl=3600, warm_up=None, max_tasks_per_worker=None,
+                 job_timeout=600):
+        """
+        render: ฟังก์ชัน render(html_path, pdf_path) ที่ pickle ได้ (ใช้ใน process ลูก)
+        warm_up: ฟังก์ชันที่ pickle ได้ เรียกครั้งเดียวตอนเริ่มแต่ละ process ลูก (โหลดตัวแปลงไว้ก่อน)
+        max_tasks_per_worker: สร้าง process ลูกใหม่หลังทำครบกี่งาน (คืนหน่วยความจำ, None = ไม่จำกัด)
+        max_pending: จำนวนงานที่รอ/กำลังทำได้พร้อมกันทั้งเครื่อง (ทุก worker ที่ใช้ spool_dir เดียวกัน)
+        max_pending_per_user: จำนวนงานที่รอ/กำลังทำได้พร้อมกันต่อผู้ใช้
+        ttl: อายุ (วินาที) ของไฟล์ผลลัพธ์ก่อนถูกลบ
+        job_timeout: งานที่ยังไม่เสร็จหลังกี่วินาทีถือว่าล้มเหลว
+        """
+        self.spool_dir = spool_dir
+        self.render = render
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.max_pending_per_user = max_pending_per_user
+        self.ttl = ttl
+        self.warm_up = warm_up
+        self.max_tasks_per_worker = max_tasks_per_worker
+        self.job_timeout = job_timeout
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = {}  # user_id -> จำนวนงานของ process นี้ที่ยังไม่เสร็จ
+        self._last_cleanup = 0
+        self.render_time = TimingHistogram(PDF_BUCKETS)
+        self.failed = 0
+        os.makedirs(spool_dir, exist_ok=True)
+
+    # สร้าง process pool ตอนใช้งานครั้งแรก หรือตอน prewarm() (หลัง gunicorn fork แล้ว)
+    # ใช้ spawn เพื่อไม่ให้ process ลูกได้ thread/connection ของ worker ติดไปด้วย
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm_up_worker if self.warm_up else None,
+                    initargs=(self.warm_up,) if self.warm_up else (),
+                    max_tasks_per_child=self.max_tasks_per_worker)
+        return self._executor
+
+    # process ลูกที่ตายกลางคัน (เช่นถูก OOM kill) ทำให้ pool ใช้ไม่ได้อีกเลย (BrokenProcessPool)
+    # ทิ้ง pool นั้นไป _get_executor จะสร้างใหม่ให้
+    def _discard_executor(self, executor):
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _submit_render(self, job_id):
+        """ส่งงานเข้า pool คืนค่า (pool ที่ใช้, future)"""
+        args = (_timed_render, self.render, self._html_path(job_id), self.pdf_path(job_id))
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(*args)
+        except BrokenProcessPool:
+            self._discard_executor(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(*args)
+
+    def prewarm(self):
+        """เริ่ม process ลูกให้ครบ max_workers ตอนนี้เลย (warm_up ทำงานก่อนมีงาน Export แรก)"""
+        executor = self._get_executor()
+        for _ in range(self.max_workers):
+            executor.submit(_ready)
+
+    def _meta_path(self, job_id):
+        return os.path.join(self.spool_dir, f'{job_id}.json')
+
+    def pdf_path(self, job_id):
+        return os.path.join(self.spool_dir, f'{job_id}.pdf')
+
+    def _html_path(self, job_id):
+        return os.path.join(self.spool_dir, f'{job_id}.html')
+
+    def _pending_path(self, job_id):
+        return os.path.join(self.spool_dir, job_id + PENDING_SUFFIX)
+
+    @contextmanager
+    def _spool_lock(self):
+        """ล็อกร่วมกันทุก process บนเครื่อง (ปลดเมื่อปิดไฟล์)"""
+        with open(os.path.join(self.spool_dir, LOCK_NAME), 'a') as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def _read_meta(self, job_id):
+        try:
+            with open(self._meta_path(job_id), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _is_orphaned(self, meta, now):
+        """งานที่ไม่มีใครทำต่อแล้ว: worker ที่ส่งงานตายไปแล้ว (เช่นถูกรีสตาร์ทตาม max_requests) หรือนานเกิน job_timeout"""
+        if now - meta.get('created_at', now) > self.job_timeout:
+            return True
+        pid = meta.get('pid')
+        if pid is None or pid == os.getpid() or os.name != 'posix':
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass  # มี process อยู่แต่เป็นของผู้ใช้อื่น
+        return False
+
+    def _fail_orphan(self, meta):
+        meta['status'] = 'failed'
+        meta['error'] = 'งาน Export ถูกยกเลิกกลางคัน กรุณาลองใหม่อีกครั้ง'
+        self._write_meta(meta['job_id'], meta)
+        self._remove(self._pending_path(meta['job_id']))
+        self._remove(self._html_path(meta['job_id']))
+
+    def _pending_jobs(self):
+        """metadata ของงานที่ยังไม่เสร็จทั้งเครื่อง (งานที่ค้างอยู่ถูกเปลี่ยนเป็น failed) ต้องถือ _spool_lock อยู่"""
+        now = time.time()
+        jobs = []
+        for name in os.listdir(self.spool_dir):
+            if not name.endswith(PENDING_SUFFIX):
+                continue
+            job_id = name[:-len(PENDING_SUFFIX)]
+            meta = self._read_meta(job_id)
+            if meta is None or meta.get('status') != 'pending':
+                self._remove(self._pending_path(job_id))
+            elif self._is_orphaned(meta, now):
+                self._fail_orphan(meta)
+            else:
+                jobs.append(meta)
+        return jobs
+
+    def _write_html(self, job_id, html):
+        # html เป็นได้ทั้ง str หรือ iterator ของ str (เช่น Jinja stream) ซึ่งจะถูกเขียนทีละส่วน
+        if isinstance(html, str):
+            html = [html]
+        with open(self._html_path(job_id), 'w', encoding='utf-8') as f:
+            for chunk in html:
+                f.write(chunk)
+
+    def _write_meta(self, job_id, meta):
+        tmp_path = f'{self._meta_path(job_id)}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self._meta_path(job_id))
+
+    def submit(self, user_id, html, filename, on_success=None):
+        """ส่งงานเข้าคิว คืนค่า job id (raise ExportQueueFull ถ้าคิวเต็ม)
+
+        html เป็น str หรือ iterator ของ str ก็ได้
+        on_success(pdf_path) จะถูกเรียกเมื่อสร้าง PDF สำเร็จ
+        """
+        self.cleanup()
+
+        job_id = uuid.uuid4().hex
+        meta = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'filename': filename,
+            'status': 'pending',
+            'error': None,
+            'created_at': time.time(),
+            'pid': os.getpid()
+        }
+
+        with self._spool_lock():
+            jobs = self._pending_jobs()
+            if len(jobs) >= self.max_pending:
+                raise ExportQueueFull('ระบบกำลังสร้าง PDF จำนวนมาก กรุณาลองใหม่อีกครั้ง')
+            if sum(1 for job in jobs if job['user_id'] == user_id) >= self.max_pending_per_user:
+                raise ExportQueueFull('คุณมีงาน Export ที่ยังไม่เสร็จ กรุณารอสักครู่')
+            self._write_meta(job_id, meta)
+            open(self._pending_path(job_id), 'w').close()
+        with self._lock:
+            self._pending[user_id] = self._pending.get(user_id, 0) + 1
+
+        try:
+            self._write_html(job_id, html)
+            executor, future = self._submit_render(job_id)
+        except Exception as e:
+            meta['status'] = 'failed'
+            meta['error'] = str(e)
+            self._write_meta(job_id, meta)
+            self._remove(self._pending_path(job_id))
+            self._release(user_id)
+            self._remove(self._html_path(job_id))
+            raise
+
+        def on_done(done_future):
+            try:
+                error = done_future.exception()
+                if isinstance(error, BrokenProcessPool):
+                    self._discard_executor(executor)
+                if error:
+                    self.failed += 1
+                else:
+                    meta['render_seconds'] = round(done_future.result(), 3)
+                    self.render_time.observe(done_future.result())
+                if not error and on_success is not None:
+                    try:
+                        on_success(self.pdf_path(job_id))
+                    except Exception as e:
+                        print(f"PDF Export Callback Error: {e}")
+                meta['status'] = 'failed' if error else 'done'
+                meta['error'] = str(error) if error else None
+                self._write_meta(job_id, meta)
+            finally:
+                self._remove(self._pending_path(job_id))
+                self._remove(self._html_path(job_id))
+                self._release(user_id)
+
+        future.add_done_callback(on_done)
+        return job_id
+
+    def stats(self):
+        with self._lock:
+            pending = sum(self._pending.values())
+        return {'pending': pending, 'failed': self.failed, 'render_seconds': self.render_time.snapshot()}
+
+    def _release(self, user_id):
+        with self._lock:
+            self._pending[user_id] -= 1
+            if self._pending[user_id] <= 0:
+                del self._pending[user_id]
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def status(self, job_id, user_id):
+        """อ่านสถานะงาน คืนค่า None ถ้าไม่พบหรือไม่ใช่งานของผู้ใช้คนนี้"""
+        if not job_id.isalnum():
+            return None
+        meta = self._read_meta(job_id)
+        if meta is None or meta.get('user_id') != user_id:
+            return None
+        if meta['status'] == 'pending' and self._is_orphaned(meta, time.time()):
+            with self._spool_lock():
+                meta = self._read_meta(job_id)
+                if meta is not None and meta['status'] == 'pending':
+                    self._fail_orphan(meta)
+        return meta
+
+    def cleanup(self, force=False):
+        """ลบไฟล์งานที่เก่ากว่า ttl (ทำไม่เกินนาทีละครั้ง)"""
+        now = time.time()
+        if not force and now - self._last_cleanup < 60:
+            return
+        self._last_cleanup = now
+
+        for name in os.listdir(self.spool_dir):
+            if name == LOCK_NAME:
+                continue
+            path = os.path.join(self.spool_dir, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
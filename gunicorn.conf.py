@@ -0,0 +1,54 @@
+# ตั้งค่า Gunicorn (render.yaml รันด้วย `gunicorn -c gunicorn.conf.py app:app`)
+# ทุกค่าเปลี่ยนได้ด้วย environment variable
+import multiprocessing
+import os
+
+# ที่อยู่ที่รับ request (Render กำหนด PORT ให้)
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# จำนวน worker: ค่าเริ่มต้น 2 x CPU + 1 แต่ไม่เกิน GUNICORN_MAX_WORKERS
+# (แต่ละ worker ใช้หน่วยความจำเพิ่ม และ Export PDF ก็เปิด process ของตัวเองอีก)
+_cpu_count = multiprocessing.cpu_count()
+workers = int(os.getenv('WEB_CONCURRENCY',
+                        min(_cpu_count * 2 + 1, int(os.getenv('GUNICORN_MAX_WORKERS', '4')))))
+
+# process แปลง PDF ต่อ worker (EXPORT_WORKERS ใน app.py): แบ่ง CPU ของเครื่องให้ทุก worker
+# process ลูกของ gunicorn ได้ environment นี้ไปด้วย
+os.environ.setdefault('EXPORT_WORKERS', str(max(1, _cpu_count // workers)))
+
+# gthread: แต่ละ worker มีหลาย thread เหมาะกับ route ที่ส่วนใหญ่รอ MongoDB
+# sync: 1 request ต่อ worker (ใช้ได้ถ้าต้องการพฤติกรรมแบบเดิม)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '4')) if worker_class == 'gthread' else 1
+
+# Export PDF แบบรายการทั้งหมดเขียน HTML ทั้งหมดใน request จึงเผื่อเวลาไว้
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+
+# รีสตาร์ท worker หลังรับ request ครบจำนวน เพื่อคืนหน่วยความจำที่บวมขึ้นเรื่อยๆ
+# jitter ทำให้ worker ไม่รีสตาร์ทพร้อมกันทั้งหมด
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '100'))
+
+# preload_app โหลด app ครั้งเดียวใน master แล้วค่อย fork (ประหยัดหน่วยความจำ)
+# ปลอดภัยเพราะ MongoClient ถูกสร้างตอนใช้งานครั้งแรกหลัง fork และ post_fork ล้าง client ทิ้งอีกชั้น
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
+
+
+def post_fork(server, worker):
+    # ถ้า master เคยสร้าง client ไว้ (เช่น ตอน preload) ให้ worker สร้างของตัวเองใหม่
+    if preload_app:
+        from app import mongo
+        mongo.reset()
+    server.log.info('Worker %s: %s x %s thread(s)', worker.pid, worker_class, threads)
+
+
+def post_worker_init(worker):
+    # เริ่ม process แปลง PDF ของ worker นี้ไว้ก่อน งาน Export แรกจะได้ไม่ต้องรอโหลดตัวแปลง
+    from app import prewarm_pdf_renderers
+    prewarm_pdf_renderers()
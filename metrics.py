@@ -0,0 +1,270 @@
+# เก็บตัวเลขการทำงานของระบบ (เวลาตอบ request, คำสั่ง MongoDB, เวลา render template)
+# และแปลงเป็นรูปแบบข้อความของ Prometheus สำหรับ /metrics
+# ค่าทั้งหมดเก็บในหน่วยความจำของแต่ละ process (gunicorn แต่ละ worker มีชุดของตัวเอง)
+import bisect
+import threading
+import time
+
+
+class TimingHistogram:
+    """นับจำนวนครั้งตามช่วงเวลา (วินาที) แบบสะสม เหมือน histogram ของ Prometheus"""
+
+    def __init__(self, buckets):
+        self.buckets = list(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        with self._lock:
+            self.count += 1
+            self.sum += seconds
+            index = bisect.bisect_left(self.buckets, seconds)
+            if index < len(self.counts):
+                self.counts[index] += 1
+
+    def snapshot(self):
+        with self._lock:
+            cumulative = []
+            total = 0
+            for bound, count in zip(self.buckets, self.counts):
+                total += count
+                cumulative.append((bound, total))
+            return {'buckets': cumulative, 'count': self.count, 'sum': self.sum}
+
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+MONGO_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+PDF_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+class HistogramFamily:
+    """กลุ่ม histogram แยกตามค่าของ label (สร้างเมื่อพบค่า label ใหม่)"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        histogram = self._series.get(values)
+        if histogram is None:
+            with self._lock:
+                histogram = self._series.setdefault(values, TimingHistogram(self.buckets))
+        return histogram
+
+    def items(self):
+        with self._lock:
+            series = list(self._series.items())
+        return [(values, histogram.snapshot()) for values, histogram in series]
+
+
+class CounterFamily:
+    """กลุ่มตัวนับแยกตามค่าของ label"""
+
+    def __init__(self):
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def inc(self, values, amount=1):
+        with self._lock:
+            self._series[values] = self._series.get(values, 0) + amount
+
+    def items(self):
+        with self._lock:
+            return list(self._series.items())
+
+
+# ============================================================
+# รูปแบบข้อความของ Prometheus
+# ============================================================
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in list(zip(names, values)) + list(extra)]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    """สร้างข้อความ /metrics ทีละ metric"""
+
+    def __init__(self, prefix='mood_'):
+        self.prefix = prefix
+        self.lines = []
+
+    def _header(self, name, kind, help_text):
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+
+    def histogram(self, name, help_text, label_names, series):
+        """series: [(ค่า label, snapshot ของ TimingHistogram)]"""
+        name = self.prefix + name
+        self._header(name, 'histogram', help_text)
+        for values, snapshot in series:
+            for bound, count in snapshot['buckets']:
+                labels = _format_labels(label_names, values, [('le', _format_number(float(bound)))])
+                self.lines.append(f'{name}_bucket{labels} {count}')
+            labels = _format_labels(label_names, values, [('le', '+Inf')])
+            self.lines.append(f'{name}_bucket{labels} {snapshot["count"]}')
+            labels = _format_labels(label_names, values)
+            self.lines.append(f'{name}_sum{labels} {_format_number(float(snapshot["sum"]))}')
+            self.lines.append(f'{name}_count{labels} {snapshot["count"]}')
+
+    def _samples(self, kind, name, help_text, label_names, series):
+        name = self.prefix + name
+        self._header(name, kind, help_text)
+        for values, value in series:
+            self.lines.append(f'{name}{_format_labels(label_names, values)} {_format_number(value)}')
+
+    def counter(self, name, help_text, label_names, series):
+        self._samples('counter', name, help_text, label_names, series)
+
+    def gauge(self, name, help_text, label_names, series):
+        self._samples('gauge', name, help_text, label_names, series)
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+# ============================================================
+# ข้อมูลของ request ที่กำลังทำงาน (แยกตาม thread)
+# ============================================================
+
+class RequestTrace:
+    def __init__(self, endpoint, method, path):
+        self.endpoint = endpoint
+        self.method = method
+        self.path = path
+        self.status = None
+        self.started_at = time.perf_counter()
+        self.mongo = []  # [(คำสั่ง, collection, วินาที, สำเร็จหรือไม่)]
+        self.templates = []  # [(ชื่อ template, วินาที)]
+
+    def mongo_seconds(self):
+        return sum(seconds for _, _, seconds, _ in self.mongo)
+
+
+class Metrics:
+    def __init__(self, slow_request_ms=0):
+        """slow_request_ms: request ที่ใช้เวลาตั้งแต่ค่านี้ขึ้นไปจะถูก log พร้อมรายการคำสั่ง MongoDB (0 = ปิด)"""
+        self.slow_request_ms = slow_request_ms
+        self._local = threading.local()
+        self._collectors = []
+
+        self.requests = CounterFamily()
+        self.request_seconds = HistogramFamily(REQUEST_BUCKETS)
+        self.request_mongo_seconds = HistogramFamily(REQUEST_BUCKETS)
+        self.mongo_commands = CounterFamily()
+        self.mongo_command_seconds = HistogramFamily(MONGO_BUCKETS)
+        self.mongo_failures = CounterFamily()
+        self.template_seconds = HistogramFamily(REQUEST_BUCKETS)
+
+    # ---------- request ----------
+
+    def start_request(self, endpoint, method, path):
+        self._local.trace = RequestTrace(endpoint, method, path)
+        self._local.templates = {}
+
+    def current(self):
+        return getattr(self._local, 'trace', None)
+
+    def finish_request(self):
+        """บันทึกผลของ request ปัจจุบัน คืนค่า trace (หรือ None ถ้าไม่มี)"""
+        trace = self.current()
+        if trace is None:
+            return None
+        self._local.trace = None
+
+        seconds = time.perf_counter() - trace.started_at
+        status = str(trace.status or 500)
+        self.requests.inc((trace.endpoint, trace.method, status))
+        self.request_seconds.labels(trace.endpoint, trace.method).observe(seconds)
+        self.request_mongo_seconds.labels(trace.endpoint).observe(trace.mongo_seconds())
+
+        if self.slow_request_ms and seconds * 1000 >= self.slow_request_ms:
+            print(self.format_slow_request(trace, seconds))
+        return trace
+
+    @staticmethod
+    def format_slow_request(trace, seconds):
+        lines = [f"🐢 Slow request: {trace.method} {trace.path} ({trace.endpoint}) "
+                 f"{trace.status} {seconds * 1000:.1f}ms, "
+                 f"mongo {len(trace.mongo)} command(s) {trace.mongo_seconds() * 1000:.1f}ms"]
+        for command, collection, command_seconds, ok in trace.mongo:
+            failed = '' if ok else ' FAILED'
+            lines.append(f"    mongo {command} {collection or '-'} {command_seconds * 1000:.1f}ms{failed}")
+        for name, template_seconds in trace.templates:
+            lines.append(f"    template {name} {template_seconds * 1000:.1f}ms")
+        return '\n'.join(lines)
+
+    # ---------- MongoDB ----------
+
+    def record_mongo(self, command, collection, seconds, ok=True):
+        """เรียกจาก CommandListener ของ pymongo (ใน thread เดียวกับที่สั่งคำสั่ง)"""
+        trace = self.current()
+        endpoint = trace.endpoint if trace else '-'
+        self.mongo_commands.inc((endpoint, command))
+        self.mongo_command_seconds.labels(command).observe(seconds)
+        if not ok:
+            self.mongo_failures.inc((endpoint, command))
+        if trace is not None:
+            trace.mongo.append((command, collection, seconds, ok))
+
+    # ---------- template ----------
+
+    def template_started(self, name):
+        templates = getattr(self._local, 'templates', None)
+        if templates is not None:
+            templates[name] = time.perf_counter()
+
+    def template_finished(self, name):
+        templates = getattr(self._local, 'templates', None)
+        started_at = templates.pop(name, None) if templates is not None else None
+        if started_at is None:
+            return
+        seconds = time.perf_counter() - started_at
+        self.template_seconds.labels(name).observe(seconds)
+        trace = self.current()
+        if trace is not None:
+            trace.templates.append((name, seconds))
+
+    # ---------- output ----------
+
+    def add_collector(self, collector):
+        """collector(exposition) เพิ่ม metric ของส่วนอื่น (เช่น pool, cache) ตอนสร้าง /metrics"""
+        self._collectors.append(collector)
+
+    def render(self):
+        out = Exposition()
+        out.counter('http_requests_total', 'Requests handled, by endpoint, method and status.',
+                    ('endpoint', 'method', 'status'), self.requests.items())
+        out.histogram('http_request_duration_seconds', 'Request latency by endpoint.',
+                      ('endpoint', 'method'), self.request_seconds.items())
+        out.histogram('http_request_mongo_seconds', 'Time spent in MongoDB commands per request.',
+                      ('endpoint',), self.request_mongo_seconds.items())
+        out.counter('mongo_commands_total', 'MongoDB commands sent, by endpoint and command.',
+                    ('endpoint', 'command'), self.mongo_commands.items())
+        out.counter('mongo_command_failures_total', 'MongoDB commands that failed.',
+                    ('endpoint', 'command'), self.mongo_failures.items())
+        out.histogram('mongo_command_duration_seconds', 'MongoDB command round-trip time.',
+                      ('command',), self.mongo_command_seconds.items())
+        out.histogram('template_render_seconds', 'Jinja template render time.',
+                      ('template',), self.template_seconds.items())
+        for collector in self._collectors:
+            try:
+                collector(out)
+            except Exception as e:
+                print(f"Metrics Collector Error: {e}")
+        return out.render()
@@ -0,0 +1,189 @@
+# จัดการการเชื่อมต่อ MongoDB
+# สร้าง MongoClient ตอนใช้งานครั้งแรกในแต่ละ process (หลัง gunicorn fork แล้ว)
+# เพราะ MongoClient ที่สร้างก่อน fork ใช้งานใน process ลูกไม่ได้อย่างปลอดภัย
+import os
+import threading
+import time
+
+from pymongo import MongoClient, ReadPreference
+from pymongo import monitoring
+
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST
+}
+
+
+class PoolStatsListener(monitoring.ConnectionPoolListener):
+    """นับเหตุการณ์ของ connection pool เพื่อแสดงใน /healthz"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stats = {
+            'created': 0,
+            'closed': 0,
+            'checked_out': 0,
+            'checkout_failed': 0,
+            'in_use': 0
+        }
+
+    def _inc(self, key, value=1):
+        with self._lock:
+            self.stats[key] += value
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._inc('created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._inc('closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._inc('checkout_failed')
+
+    def connection_checked_out(self, event):
+        self._inc('checked_out')
+        self._inc('in_use')
+
+    def connection_checked_in(self, event):
+        self._inc('in_use', -1)
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        stats['open'] = stats['created'] - stats['closed']
+        return stats
+
+
+class CommandTimingListener(monitoring.CommandListener):
+    """ส่งชื่อคำสั่ง, collection และเวลาที่ใช้ของทุกคำสั่งให้ callback
+
+    pymongo เรียก listener ใน thread ที่สั่งคำสั่ง callback จึงผูกกับ request ปัจจุบันได้
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+        self._collections = threading.local()
+
+    def _pending(self):
+        pending = getattr(self._collections, 'pending', None)
+        if pending is None:
+            pending = self._collections.pending = {}
+        return pending
+
+    def started(self, event):
+        # ชื่อ collection อยู่ในค่าของคำสั่ง เช่น {'find': 'moods', ...} (มีเฉพาะตอนเริ่ม)
+        collection = event.command.get(event.command_name)
+        self._pending()[event.request_id] = collection if isinstance(collection, str) else None
+
+    def _finish(self, event, ok):
+        collection = self._pending().pop(event.request_id, None)
+        self.callback(event.command_name, collection, event.duration_micros / 1_000_000, ok)
+
+    def succeeded(self, event):
+        self._finish(event, True)
+
+    def failed(self, event):
+        self._finish(event, False)
+
+
+class MongoManager:
+    def __init__(self, uri, db_name, listeners=(), **client_options):
+        """listeners: event listener เพิ่มเติมของ pymongo (เช่น CommandTimingListener)"""
+        self.uri = uri
+        self.db_name = db_name
+        self.listeners = list(listeners)
+        self.client_options = client_options
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.pool_listener = None
+
+    @classmethod
+    def from_env(cls, uri, db_name, listeners=()):
+        """อ่านค่าการตั้งค่า pool / timeout จาก environment"""
+        return cls(
+            uri, db_name, listeners,
+            maxPoolSize=int(os.getenv('MONGO_MAX_POOL_SIZE', '20')),
+            minPoolSize=int(os.getenv('MONGO_MIN_POOL_SIZE', '0')),
+            waitQueueTimeoutMS=int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000')),
+            serverSelectionTimeoutMS=int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000')),
+            connectTimeoutMS=int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', '5000')),
+            socketTimeoutMS=int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', '30000'))
+        )
+
+    @property
+    def client(self):
+        # pid เปลี่ยน = อยู่ใน process ลูกหลัง fork ต้องสร้าง client ใหม่
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self.pool_listener = PoolStatsListener()
+                    self._client = MongoClient(self.uri, event_listeners=[self.pool_listener, *self.listeners],
+                                               **self.client_options)
+                    self._pid = os.getpid()
+        return self._client
+
+    def reset(self):
+        """ทิ้ง client เดิม (เรียกจาก gunicorn post_fork) ครั้งถัดไปจะสร้างใหม่"""
+        with self._lock:
+            self._client = None
+            self._pid = None
+
+    def collection(self, name, read_preference=None):
+        collection = self.client[self.db_name][name]
+        if read_preference is not None:
+            collection = collection.with_options(read_preference=read_preference)
+        return collection
+
+    def health(self):
+        """ping MongoDB แล้วคืนค่าสถานะและสถิติของ pool"""
+        started_at = time.perf_counter()
+        try:
+            self.client.admin.command('ping')
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+        return {
+            'ok': ok,
+            'error': error,
+            'ping_ms': round((time.perf_counter() - started_at) * 1000, 2),
+            'pid': os.getpid(),
+            'pool': {
+                'max_pool_size': self.client_options.get('maxPoolSize'),
+                'min_pool_size': self.client_options.get('minPoolSize'),
+                **(self.pool_listener.snapshot() if self.pool_listener else {})
+            }
+        }
+
+
+class LazyCollection:
+    """ใช้แทน Collection ได้ทุกที่ แต่จะดึง collection จริงจาก client ของ process ปัจจุบันทุกครั้ง"""
+
+    def __init__(self, manager, name, read_preference=None):
+        self._manager = manager
+        self._name = name
+        self._read_preference = read_preference
+
+    def __getattr__(self, attr):
+        return getattr(self._manager.collection(self._name, self._read_preference), attr)
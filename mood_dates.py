@@ -0,0 +1,84 @@
+# วันที่/เวลาของบันทึก
+# ฟอร์มส่ง date และ time มาเป็นข้อความ (เก็บไว้แสดงผลเหมือนเดิม) และเก็บ occurred_at เป็น datetime
+# เพื่อให้กรองช่วงวันที่และเรียงลำดับด้วย index (user_id, occurred_at) ได้ถูกต้อง
+# occurred_at เป็นเวลาตามที่ผู้ใช้กรอก (ไม่มี timezone) แบบเดียวกับ created_at
+from datetime import datetime, timedelta
+
+from pymongo import UpdateOne
+
+DATE_FORMAT = '%Y-%m-%d'
+TIME_FORMATS = ('%H:%M', '%H:%M:%S')
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def parse_date(value):
+    """แปลง 'YYYY-MM-DD' เป็น datetime เวลา 00:00 (raise ValueError ถ้ารูปแบบผิด)"""
+    return datetime.strptime(value.strip(), DATE_FORMAT)
+
+
+def parse_occurred_at(date_value, time_value):
+    """รวม date และ time ของบันทึกเป็น datetime คืนค่า None ถ้าอ่านไม่ได้"""
+    try:
+        day = parse_date(str(date_value))
+    except (TypeError, ValueError):
+        return None
+
+    time_value = str(time_value or '').strip()
+    for time_format in TIME_FORMATS:
+        try:
+            parsed = datetime.strptime(time_value, time_format)
+        except ValueError:
+            continue
+        return day.replace(hour=parsed.hour, minute=parsed.minute, second=parsed.second)
+    return None
+
+
+def date_range_query(start_date=None, end_date=None):
+    """เงื่อนไขของ occurred_at จากช่วงวันที่ (รวมทั้งวันสุดท้าย) คืนค่า None ถ้าไม่ได้กรอง"""
+    query = {}
+    if start_date:
+        query['$gte'] = parse_date(start_date)
+    if end_date:
+        query['$lt'] = parse_date(end_date) + timedelta(days=1)
+    return query or None
+
+
+def month_window(month_start):
+    """คืนค่า (วันแรกของเดือน, วันแรกของเดือนถัดไป)"""
+    if month_start.month == 12:
+        return month_start, month_start.replace(year=month_start.year + 1, month=1)
+    return month_start, month_start.replace(month=month_start.month + 1)
+
+
+def backfill_occurred_at(moods_collection, batch_size=BACKFILL_BATCH_SIZE, on_batch=None):
+    """เติม occurred_at ให้บันทึกเก่าที่ยังไม่มี เขียนทีละ batch ด้วย bulk_write
+
+    บันทึกที่อ่าน date/time ไม่ได้จะได้ occurred_at เป็น None (จะไม่ถูกเลือกซ้ำในรอบถัดไป)
+    on_batch(report) จะถูกเรียกหลังเขียนแต่ละ batch
+    คืนค่ารายงาน {'updated': จำนวน, 'invalid': จำนวนที่อ่านไม่ได้}
+    """
+    report = {'updated': 0, 'invalid': 0}
+    operations = []
+
+    def flush():
+        if not operations:
+            return
+        moods_collection.bulk_write(operations, ordered=False)
+        report['updated'] += len(operations)
+        operations.clear()
+        if on_batch is not None:
+            on_batch(report)
+
+    cursor = (moods_collection.find({'occurred_at': {'$exists': False}}, {'date': 1, 'time': 1})
+              .batch_size(batch_size))
+    for mood in cursor:
+        occurred_at = parse_occurred_at(mood.get('date'), mood.get('time'))
+        if occurred_at is None:
+            report['invalid'] += 1
+        operations.append(UpdateOne({'_id': mood['_id']}, {'$set': {'occurred_at': occurred_at}}))
+        if len(operations) >= batch_size:
+            flush()
+
+    flush()
+    return report
@@ -0,0 +1,149 @@
+# นำเข้าบันทึกจำนวนมากจากไฟล์ CSV หรือ NDJSON
+# อ่านไฟล์ทีละบรรทัด และเขียนลง MongoDB ด้วย insert_many ทีละ batch (ไม่โหลดทั้งไฟล์เข้าหน่วยความจำ)
+import csv
+import io
+import json
+from contextlib import nullcontext
+from datetime import datetime
+
+from pymongo.errors import BulkWriteError
+
+from mood_dates import parse_occurred_at
+from mood_search import search_fields
+from mood_statistics import MOOD_COLORS
+
+# ฟิลด์เดียวกับที่ add_mood รับจากฟอร์ม
+MOOD_FIELDS = ['date', 'time', 'color', 'trigger', 'emotion', 'detail']
+
+IMPORT_BATCH_SIZE = 1000
+
+# เก็บรายละเอียดข้อผิดพลาดไว้ในรายงานไม่เกินจำนวนนี้ (ไฟล์ใหญ่ที่ผิดทั้งไฟล์จะได้ไม่กินหน่วยความจำ)
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(Exception):
+    """รูปแบบไฟล์ไม่รองรับ"""
+
+
+def detect_format(filename, fmt=None):
+    if fmt:
+        fmt = fmt.lower()
+    elif filename and '.' in filename:
+        fmt = filename.rsplit('.', 1)[1].lower()
+    if fmt in ('ndjson', 'jsonl', 'json'):
+        return 'ndjson'
+    if fmt == 'csv':
+        return 'csv'
+    raise ImportFormatError('รองรับเฉพาะไฟล์ CSV หรือ NDJSON')
+
+
+def parse_rows(binary_stream, fmt):
+    """อ่านไฟล์ทีละแถว คืนค่า (เลขแถว, dict หรือ None, ข้อความผิดพลาด หรือ None)"""
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row, None
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, None, 'JSON ไม่ถูกต้อง'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, 'แต่ละบรรทัดต้องเป็น JSON object'
+            continue
+        yield line_no, row, None
+
+
+def validate_row(row):
+    """ตรวจสอบแถว คืนค่า (ข้อมูลบันทึก, None) หรือ (None, ข้อความผิดพลาด)"""
+    missing = [field for field in MOOD_FIELDS if row.get(field) is None]
+    if missing:
+        return None, f"ไม่มีฟิลด์: {', '.join(missing)}"
+
+    mood = {field: str(row[field]).strip() for field in MOOD_FIELDS}
+
+    try:
+        datetime.strptime(mood['date'], '%Y-%m-%d')
+    except ValueError:
+        return None, 'date ต้องอยู่ในรูปแบบ YYYY-MM-DD'
+    try:
+        datetime.strptime(mood['time'], '%H:%M')
+    except ValueError:
+        return None, 'time ต้องอยู่ในรูปแบบ HH:MM'
+    if mood['color'] not in MOOD_COLORS:
+        return None, f"color ต้องเป็นหนึ่งใน {', '.join(MOOD_COLORS)}"
+    if not mood['emotion']:
+        return None, 'ไม่ได้ระบุ emotion'
+
+    mood['occurred_at'] = parse_occurred_at(mood['date'], mood['time'])
+    mood['search'] = search_fields(mood)
+    return mood, None
+
+
+def import_moods(rows, moods_collection, user_id, username,
+                 batch_size=IMPORT_BATCH_SIZE, write_context=None, on_batch=None,
+                 max_errors=MAX_REPORTED_ERRORS):
+    """เขียนแถวที่ถูกต้องลง MongoDB ทีละ batch
+
+    write_context(moods) คืนค่า context manager ที่ครอบการเขียนแต่ละ batch (ใช้จองเลขลำดับ sync)
+    on_batch(inserted_moods) จะถูกเรียกหลังเขียนแต่ละ batch (ใช้อัพเดท rollup)
+    คืนค่ารายงาน {'inserted': จำนวน, 'errors': [{'row': เลขแถว, 'error': ข้อความ}],
+                 'error_count': จำนวนแถวที่ผิดทั้งหมด, 'truncated': ตัด errors ไว้ที่ max_errors หรือไม่}
+    """
+    report = {'inserted': 0, 'errors': [], 'error_count': 0, 'truncated': False}
+    batch, batch_rows = [], []
+
+    def add_error(row_no, error):
+        report['error_count'] += 1
+        if len(report['errors']) < max_errors:
+            report['errors'].append({'row': row_no, 'error': error})
+        else:
+            report['truncated'] = True
+
+    def flush():
+        if not batch:
+            return
+        failed = set()
+        with write_context(batch) if write_context is not None else nullcontext():
+            try:
+                moods_collection.insert_many(batch, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get('writeErrors', []):
+                    failed.add(error['index'])
+                    add_error(batch_rows[error['index']], error.get('errmsg', ''))
+        inserted = [mood for index, mood in enumerate(batch) if index not in failed]
+        report['inserted'] += len(inserted)
+        if on_batch is not None and inserted:
+            on_batch(inserted)
+        batch.clear()
+        batch_rows.clear()
+
+    for row_no, row, error in rows:
+        if error is None:
+            mood, error = validate_row(row)
+        if error is not None:
+            add_error(row_no, error)
+            continue
+
+        now = datetime.now()
+        mood.update({
+            'user_id': user_id,
+            'username': username,
+            'created_at': now,
+            'updated_at': now
+        })
+        batch.append(mood)
+        batch_rows.append(row_no)
+        if len(batch) >= batch_size:
+            flush()
+
+    flush()
+    return report
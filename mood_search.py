@@ -0,0 +1,129 @@
+# ค้นหาบันทึกด้วย text index ของ MongoDB
+# text index ตัดคำด้วยช่องว่างเท่านั้น ซึ่งใช้กับภาษาไทยไม่ได้ (ไม่มีช่องว่างระหว่างคำ)
+# จึงแปลงข้อความเป็น token ไว้ล่วงหน้าในฟิลด์ search แล้วทำ text index บนฟิลด์นั้น:
+#   - ภาษาไทย: ตัวอักษรทีละ 2 ตัวต่อเนื่องกัน (bigram) ค้นคำไหนก็เจอโดยไม่ต้องมีพจนานุกรม
+#   - ภาษาอื่น: ทั้งคำ ตัวพิมพ์เล็ก
+# ข้อความค้นหาถูกแปลงแบบเดียวกัน ผลลัพธ์เรียงตามคะแนนที่ text index ให้ (ตรงหลายครั้ง/ฟิลด์สำคัญ = คะแนนสูง)
+#
+# mongomock (tests / benchmarks) ไม่มี $text จึงใช้ regex บนฟิลด์ search แทน (ได้ผลเดียวกันแต่ไม่มีคะแนน)
+import re
+import unicodedata
+
+from pymongo import UpdateOne
+
+SEARCH_FIELDS = ('emotion', 'trigger', 'detail')
+
+# น้ำหนักของแต่ละฟิลด์ตอนจัดอันดับ
+SEARCH_WEIGHTS = {'search.emotion': 3, 'search.trigger': 2, 'search.detail': 1}
+
+SEARCH_INDEX_NAME = 'user_id_search_text'
+
+THAI_RUN = re.compile(r'[\u0e00-\u0e7f]+')
+WORD = re.compile(r'[^\W_]+')
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+def _segments(text):
+    """แบ่งข้อความเป็นช่วง (คำภาษาอื่น 1 คำ หรือข้อความภาษาไทยที่ติดกัน) คืนค่า token ของแต่ละช่วง"""
+    text = unicodedata.normalize('NFKC', str(text or '')).lower()
+    segments = []
+    position = 0
+    for match in THAI_RUN.finditer(text):
+        segments.extend([word] for word in WORD.findall(text[position:match.start()]))
+        run = match.group()
+        segments.append([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+        position = match.end()
+    segments.extend([word] for word in WORD.findall(text[position:]))
+    return segments
+
+
+def tokenize(text):
+    """แปลงข้อความเป็น list ของ token (ลำดับตามข้อความ อาจซ้ำกัน)"""
+    return [token for segment in _segments(text) for token in segment]
+
+
+def search_fields(mood):
+    """ค่าของฟิลด์ search ที่เก็บคู่กับบันทึก (token คั่นด้วยช่องว่าง)"""
+    return {field: ' '.join(tokenize(mood.get(field, ''))) for field in SEARCH_FIELDS}
+
+
+def _phrases(text):
+    return list(dict.fromkeys(' '.join(segment) for segment in _segments(text)))
+
+
+def search_query(text):
+    """ข้อความสำหรับ $search คืนค่า '' ถ้าไม่มี token
+
+    แต่ละคำ/ข้อความไทยเป็น phrase ("งา าน") ซึ่ง MongoDB ต้องเจอทุก phrase (AND)
+    และ token ของ phrase ต้องเรียงติดกัน จึงได้ผลเหมือนค้นหาข้อความย่อย
+    """
+    return ' '.join(f'"{phrase}"' for phrase in _phrases(text))
+
+
+def phrase_filter(text):
+    """เงื่อนไขที่ได้ผลเหมือน $text ของ search_query(text): ทุก phrase ต้องอยู่ในฟิลด์ใดฟิลด์หนึ่ง
+    (ต้อง scan บันทึกทั้งหมดของผู้ใช้ ใช้เมื่อไม่มี $text เท่านั้น)
+    """
+    return {'$and': [
+        {'$or': [{field: {'$regex': f'(^| ){re.escape(phrase)}( |$)'}} for field in SEARCH_WEIGHTS]}
+        for phrase in _phrases(text)
+    ]}
+
+
+def create_search_index(moods_collection):
+    # ใส่ user_id เป็น prefix ให้ค้นเฉพาะ index ของผู้ใช้คนนั้น (query ต้องระบุ user_id เสมอ)
+    moods_collection.create_index(
+        [('user_id', 1)] + [(field, 'text') for field in SEARCH_WEIGHTS],
+        weights=SEARCH_WEIGHTS,
+        default_language='none',
+        language_override='search_language',
+        name=SEARCH_INDEX_NAME
+    )
+
+
+def search_moods(moods_collection, user_id, text, projection, skip=0, limit=20):
+    """ค้นหาบันทึกของผู้ใช้ เรียงตามคะแนนแล้วตามเวลาที่เกิดขึ้นล่าสุด"""
+    query = search_query(text)
+    if not query:
+        return []
+    try:
+        return list(
+            moods_collection.find({'user_id': user_id, '$text': {'$search': query}},
+                                  {**projection, 'score': {'$meta': 'textScore'}})
+            .sort([('score', {'$meta': 'textScore'}), ('occurred_at', -1)])
+            .skip(skip)
+            .limit(limit)
+        )
+    except NotImplementedError:
+        # mongomock: MongoDB จริงไม่ raise NotImplementedError (ไม่มี text index จะได้ OperationFailure)
+        return list(
+            moods_collection.find({'user_id': user_id, **phrase_filter(text)}, projection)
+            .sort('occurred_at', -1)
+            .skip(skip)
+            .limit(limit)
+        )
+
+
+def backfill_search_fields(moods_collection, batch_size=BACKFILL_BATCH_SIZE, on_batch=None):
+    """เติมฟิลด์ search ให้บันทึกเก่าที่ยังไม่มี เขียนทีละ batch ด้วย bulk_write"""
+    report = {'updated': 0}
+    operations = []
+
+    def flush():
+        if not operations:
+            return
+        moods_collection.bulk_write(operations, ordered=False)
+        report['updated'] += len(operations)
+        operations.clear()
+        if on_batch is not None:
+            on_batch(report)
+
+    projection = {field: 1 for field in SEARCH_FIELDS}
+    for mood in moods_collection.find({'search': {'$exists': False}}, projection).batch_size(batch_size):
+        operations.append(UpdateOne({'_id': mood['_id']}, {'$set': {'search': search_fields(mood)}}))
+        if len(operations) >= batch_size:
+            flush()
+
+    flush()
+    return report
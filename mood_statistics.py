@@ -0,0 +1,252 @@
+# ฟังก์ชันคำนวณสถิติความรู้สึก ใช้ร่วมกันระหว่างหน้าสถิติและการ Export PDF
+from collections import Counter
+
+# สีที่ใช้ในระบบ (เรียงตามลำดับที่แสดงผล)
+MOOD_COLORS = ['แดง', 'เหลือง', 'น้ำเงิน', 'เขียว']
+
+# ฟิลด์ที่จำเป็นสำหรับการคำนวณสถิติ (ไม่ดึง detail ที่เป็นข้อความยาว)
+STATS_PROJECTION = {'_id': 0, 'color': 1, 'trigger': 1, 'emotion': 1}
+
+TOP_TRIGGERS_PER_COLOR = 5
+TOP_EMOTIONS = 10
+TOP_TRIGGERS = 10
+
+UNKNOWN_TRIGGER = 'ไม่ระบุ'
+
+
+def empty_counts():
+    return {
+        'total': 0,
+        'colors': Counter(),
+        'emotions': Counter(),
+        'triggers': Counter(),
+        'color_triggers': {color: Counter() for color in MOOD_COLORS}
+    }
+
+
+def _mood_keys(mood):
+    """คืนค่า (กลุ่ม, key) ทุกตัวนับที่รายการนี้มีผล"""
+    color = mood.get('color', '')
+    trigger = mood.get('trigger')
+    emotion = mood.get('emotion', '')
+
+    keys = []
+    if color in MOOD_COLORS:
+        keys.append(('colors', color))
+        keys.append((('color_triggers', color), trigger if trigger is not None else UNKNOWN_TRIGGER))
+    if emotion:
+        keys.append(('emotions', emotion))
+    if trigger:
+        keys.append(('triggers', trigger))
+    return keys
+
+
+def count_moods(moods):
+    """นับทุกตัวนับด้วยการวนรายการเพียงรอบเดียว
+
+    รับได้ทั้ง list และ cursor ของ MongoDB (อ่านทีละรายการ ไม่ต้องโหลดทั้งหมดก่อน)
+    """
+    # เงื่อนไขเดียวกับ _mood_keys แต่เขียนไว้ใน loop ตรงๆ และนับด้วย dict ธรรมดา
+    # (เรียก _mood_keys / Counter ต่อรายการช้ากว่าโค้ดเดิมที่วนหลายรอบ ดู benchmarks/stats.py)
+    colors, emotions, triggers = {}, {}, {}
+    color_triggers = {color: {} for color in MOOD_COLORS}
+    total = 0
+    for mood in moods:
+        total += 1
+        color = mood.get('color', '')
+        trigger = mood.get('trigger')
+        emotion = mood.get('emotion', '')
+        by_color = color_triggers.get(color)
+        if by_color is not None:
+            colors[color] = colors.get(color, 0) + 1
+            key = trigger if trigger is not None else UNKNOWN_TRIGGER
+            by_color[key] = by_color.get(key, 0) + 1
+        if emotion:
+            emotions[emotion] = emotions.get(emotion, 0) + 1
+        if trigger:
+            triggers[trigger] = triggers.get(trigger, 0) + 1
+
+    return {
+        'total': total,
+        'colors': Counter(colors),
+        'emotions': Counter(emotions),
+        'triggers': Counter(triggers),
+        'color_triggers': {color: Counter(by_color) for color, by_color in color_triggers.items()}
+    }
+
+
+def summarize(counts):
+    """แปลงตัวนับเป็นข้อมูลที่ template ใช้ (Top 5 ต่อสี, Top 10 อารมณ์/สิ่งกระตุ้น)"""
+    return {
+        'total_moods': counts['total'],
+        'color_stats': {color: counts['colors'].get(color, 0) for color in MOOD_COLORS},
+        'color_triggers': {
+            color: dict(counts['color_triggers'][color].most_common(TOP_TRIGGERS_PER_COLOR))
+            for color in MOOD_COLORS
+        },
+        'emotion_stats': dict(counts['emotions'].most_common(TOP_EMOTIONS)),
+        'trigger_stats': dict(counts['triggers'].most_common(TOP_TRIGGERS))
+    }
+
+
+def compute_stats(moods):
+    """คำนวณสถิติจากรายการ (list หรือ cursor) ในรอบเดียว"""
+    return summarize(count_moods(moods))
+
+
+# Aggregation pipeline ที่นับแบบเดียวกับ count_moods แต่คำนวณฝั่ง MongoDB
+# ใช้ $facet เพื่อคำนวณทุกอย่างใน round trip เดียว
+def counts_pipeline(user_id):
+    def count_by(field):
+        return [
+            {'$match': {field: {'$nin': [None, '']}}},
+            {'$group': {'_id': f'${field}', 'count': {'$sum': 1}}}
+        ]
+
+    return [
+        {'$match': {'user_id': user_id}},
+        {'$project': STATS_PROJECTION},
+        {'$facet': {
+            'total': [{'$count': 'count'}],
+            'colors': [
+                {'$match': {'color': {'$in': MOOD_COLORS}}},
+                {'$group': {'_id': '$color', 'count': {'$sum': 1}}}
+            ],
+            'color_triggers': [
+                {'$match': {'color': {'$in': MOOD_COLORS}}},
+                {'$group': {
+                    '_id': {'color': '$color', 'trigger': {'$ifNull': ['$trigger', UNKNOWN_TRIGGER]}},
+                    'count': {'$sum': 1}
+                }}
+            ],
+            'emotions': count_by('emotion'),
+            'triggers': count_by('trigger')
+        }}
+    ]
+
+
+def aggregate_counts(moods_collection, user_id):
+    """นับทุกตัวนับของผู้ใช้ฝั่ง MongoDB (คืนค่าโครงสร้างเดียวกับ count_moods)"""
+    result = next(moods_collection.aggregate(counts_pipeline(user_id)), {})
+
+    counts = empty_counts()
+    counts['total'] = result['total'][0]['count'] if result.get('total') else 0
+    for row in result.get('colors', []):
+        counts['colors'][row['_id']] = row['count']
+    for row in result.get('color_triggers', []):
+        counts['color_triggers'][row['_id']['color']][row['_id']['trigger']] = row['count']
+    for row in result.get('emotions', []):
+        counts['emotions'][row['_id']] = row['count']
+    for row in result.get('triggers', []):
+        counts['triggers'][row['_id']] = row['count']
+    return counts
+
+
+# ============================================================
+# Rollup สถิติต่อผู้ใช้ (collection mood_stats, 1 document ต่อผู้ใช้)
+# อัพเดทด้วย $inc ทุกครั้งที่เพิ่ม/แก้ไข/ลบบันทึก
+# ============================================================
+
+# ข้อความจากผู้ใช้อาจมี . หรือ $ ซึ่งใช้เป็นชื่อฟิลด์ใน MongoDB ไม่ได้
+def encode_key(key):
+    if key == '':
+        return '%'
+    return key.replace('%', '%25').replace('.', '%2E').replace('$', '%24')
+
+
+def decode_key(key):
+    if key == '%':
+        return ''
+    return key.replace('%24', '$').replace('%2E', '.').replace('%25', '%')
+
+
+def _mood_deltas(mood, sign, deltas):
+    deltas['total'] = deltas.get('total', 0) + sign
+    for group, key in _mood_keys(mood):
+        if isinstance(group, tuple):
+            path = f'color_triggers.{group[1]}.{encode_key(key)}'
+        else:
+            path = f'{group}.{encode_key(key)}'
+        deltas[path] = deltas.get(path, 0) + sign
+
+
+def update_rollup(stats_collection, user_id, old_mood=None, new_mood=None):
+    """ปรับ rollup ตามรายการที่เปลี่ยน (ลบค่าของ old_mood แล้วบวกค่าของ new_mood)
+
+    ถ้ายังไม่มี rollup ของผู้ใช้จะไม่สร้างใหม่ เพราะจะถูกสร้างจากข้อมูลจริงตอนอ่านครั้งแรก
+    """
+    deltas = {}
+    if old_mood is not None:
+        _mood_deltas(old_mood, -1, deltas)
+    if new_mood is not None:
+        _mood_deltas(new_mood, 1, deltas)
+
+    _apply_deltas(stats_collection, user_id, deltas)
+
+
+def add_to_rollup(stats_collection, user_id, moods):
+    """บวกค่าของหลายรายการเข้า rollup ด้วยการอัพเดทครั้งเดียว (ใช้ตอนนำเข้าข้อมูล)"""
+    deltas = {}
+    for mood in moods:
+        _mood_deltas(mood, 1, deltas)
+    _apply_deltas(stats_collection, user_id, deltas)
+
+
+def _apply_deltas(stats_collection, user_id, deltas):
+    deltas = {path: value for path, value in deltas.items() if value != 0}
+    if deltas:
+        stats_collection.update_one({'_id': user_id}, {'$inc': deltas})
+
+
+def counts_to_rollup(user_id, counts):
+    return {
+        '_id': user_id,
+        'total': counts['total'],
+        'colors': {encode_key(k): v for k, v in counts['colors'].items()},
+        'emotions': {encode_key(k): v for k, v in counts['emotions'].items()},
+        'triggers': {encode_key(k): v for k, v in counts['triggers'].items()},
+        'color_triggers': {
+            color: {encode_key(k): v for k, v in counts['color_triggers'][color].items()}
+            for color in MOOD_COLORS
+        }
+    }
+
+
+def rollup_to_counts(doc):
+    # ตัวนับที่ถูกลดจนเหลือ 0 จะยังอยู่ใน document จึงต้องกรองออก
+    def decode(group):
+        return Counter({decode_key(k): v for k, v in (group or {}).items() if v > 0})
+
+    counts = empty_counts()
+    counts['total'] = doc.get('total', 0)
+    counts['colors'] = decode(doc.get('colors'))
+    counts['emotions'] = decode(doc.get('emotions'))
+    counts['triggers'] = decode(doc.get('triggers'))
+    for color in MOOD_COLORS:
+        counts['color_triggers'][color] = decode(doc.get('color_triggers', {}).get(color))
+    return counts
+
+
+def rebuild_rollup(moods_collection, stats_collection, user_id):
+    """คำนวณ rollup ใหม่จากข้อมูลบันทึกจริง แล้วเขียนทับของเดิม"""
+    counts = aggregate_counts(moods_collection, user_id)
+    stats_collection.replace_one({'_id': user_id}, counts_to_rollup(user_id, counts), upsert=True)
+    return counts
+
+
+def verify_rollup(moods_collection, stats_collection, user_id):
+    """เทียบ rollup กับข้อมูลจริง คืนค่า True ถ้าตรงกัน"""
+    doc = stats_collection.find_one({'_id': user_id})
+    if doc is None:
+        return False
+    return rollup_to_counts(doc) == aggregate_counts(moods_collection, user_id)
+
+
+def get_user_stats(moods_collection, stats_collection, user_id):
+    """อ่านสถิติของผู้ใช้จาก rollup (สร้างจากข้อมูลจริงถ้ายังไม่มี)"""
+    doc = stats_collection.find_one({'_id': user_id})
+    if doc is None:
+        counts = rebuild_rollup(moods_collection, stats_collection, user_id)
+    else:
+        counts = rollup_to_counts(doc)
+    return summarize(counts)
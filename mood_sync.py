@@ -0,0 +1,212 @@
+# ส่งเฉพาะบันทึกที่เปลี่ยนตั้งแต่ sync ครั้งก่อน (/api/sync) ให้ client ที่เก็บสำเนาไว้ในเครื่อง
+#
+# ทุกครั้งที่เพิ่ม/แก้ไข/ลบบันทึก จะได้เลขลำดับใหม่จาก users.sync_seq ของผู้ใช้ (เพิ่มขึ้นเสมอและไม่ซ้ำ)
+#   - บันทึกเก็บเลขล่าสุดไว้ใน modified_at (index (user_id, modified_at))
+#   - บันทึกที่ลบแล้วเหลือ tombstone {user_id, mood_id, modified_at, deleted_at} ใน mood_tombstones
+#     ซึ่งหมดอายุด้วย TTL index บน deleted_at
+#
+# token = "<เลขลำดับล่าสุดที่ client มีแล้ว>.<เวลา (unix) ที่ client ได้ข้อมูลครบล่าสุด>"
+# tombstone ที่ client ยังไม่ได้รับถูกสร้างหลังเวลานั้นเสมอ token ที่เก่ากว่าอายุของ tombstone
+# จึงอาจพลาดการลบไปแล้ว client ต้องโหลดใหม่ทั้งหมด (SyncTokenExpired)
+#
+# เลขลำดับถูกจองก่อนเขียนบันทึก ถ้าเขียนพร้อมกันสองที่ เลขที่น้อยกว่าอาจเขียนเสร็จทีหลัง
+# จึงบันทึกการจองไว้ใน users.sync_pending จนเขียนเสร็จ (sync_write) และ sync ส่งได้ไม่เกินเลขก่อนการเขียน
+# ที่ยังไม่เสร็จ (sync_horizon) token จึงไม่ข้ามการเปลี่ยนแปลงที่ยังเขียนไม่เสร็จ
+# การจองที่ค้างนานกว่า PENDING_GRACE_SECONDS (process ตายระหว่างเขียน) ไม่ถูกรอแล้ว
+import time
+from contextlib import contextmanager
+
+from bson.objectid import ObjectId
+from pymongo import UpdateOne
+
+TOMBSTONE_INDEX_NAME = 'deleted_at_ttl'
+
+PENDING_GRACE_SECONDS = 30
+
+BACKFILL_BATCH_SIZE = 1000
+
+
+class SyncTokenError(ValueError):
+    pass
+
+
+class SyncTokenExpired(Exception):
+    pass
+
+
+def allocate_sync_seq(users_collection, user_id, count=1):
+    """จองเลขลำดับ count เลขให้ผู้ใช้ คืนค่าเลขแรก (ใช้เลขแรก ... เลขแรก + count - 1)
+
+    เพิ่ม sync_seq และบันทึกการจองใน sync_pending ใน update เดียวกัน (ถ้ามีคนจองตัดหน้าก็อ่านใหม่แล้วลองอีกครั้ง)
+    ต้องเรียก release_sync_seq เมื่อเขียนเสร็จ (ใช้ผ่าน sync_write)
+    """
+    if not ObjectId.is_valid(user_id):
+        raise LookupError(f'user {user_id} not found')
+    while True:
+        user = users_collection.find_one({'_id': ObjectId(user_id)}, {'sync_seq': 1, 'sync_pending': 1})
+        if user is None:
+            raise LookupError(f'user {user_id} not found')
+        # ลบการจองที่ค้างนานเกินไป (process ที่ตายระหว่างเขียน) sync_horizon ไม่รอการจองเหล่านี้แล้ว
+        cutoff = time.time() - PENDING_GRACE_SECONDS
+        if any(entry['at'] < cutoff for entry in user.get('sync_pending', [])):
+            users_collection.update_one({'_id': ObjectId(user_id)},
+                                        {'$pull': {'sync_pending': {'at': {'$lt': cutoff}}}})
+        current = user.get('sync_seq')
+        first = (current or 0) + 1
+        result = users_collection.update_one(
+            {'_id': ObjectId(user_id), 'sync_seq': current},
+            {'$set': {'sync_seq': first + count - 1},
+             '$push': {'sync_pending': {'seq': first, 'at': time.time()}}}
+        )
+        if result.modified_count:
+            return first
+
+
+def release_sync_seq(users_collection, user_id, first):
+    users_collection.update_one({'_id': ObjectId(user_id)}, {'$pull': {'sync_pending': {'seq': first}}})
+
+
+@contextmanager
+def sync_write(users_collection, user_id, count=1):
+    """จองเลขลำดับไว้ตลอดการเขียน: with sync_write(...) as seq: <เขียนบันทึกด้วย seq>"""
+    first = allocate_sync_seq(users_collection, user_id, count)
+    try:
+        yield first
+    finally:
+        release_sync_seq(users_collection, user_id, first)
+
+
+@contextmanager
+def assign_sync_seq(users_collection, user_id, moods):
+    """ใส่ modified_at ให้บันทึกใหม่ (เรียงตามลำดับใน list) แล้วจองไว้จนเขียนลง MongoDB เสร็จ"""
+    if not moods:
+        yield
+        return
+    with sync_write(users_collection, user_id, len(moods)) as first:
+        for offset, mood in enumerate(moods):
+            mood['modified_at'] = first + offset
+        yield
+
+
+def sync_horizon(users_collection, user_id, grace=PENDING_GRACE_SECONDS, now=None):
+    """เลขลำดับสูงสุดที่ส่งให้ client ได้ และมีการเขียนที่ยังไม่เสร็จอยู่หรือไม่
+
+    ส่งได้ถึงเลขก่อนการจองที่ยังไม่เสร็จตัวแรก ถ้าไม่มีก็ถึง sync_seq
+    """
+    now = time.time() if now is None else now
+    if not ObjectId.is_valid(user_id):
+        return 0, False
+    user = users_collection.find_one({'_id': ObjectId(user_id)}, {'sync_seq': 1, 'sync_pending': 1}) or {}
+    pending = [entry['seq'] for entry in user.get('sync_pending', []) if now - entry['at'] < grace]
+    if pending:
+        return min(pending) - 1, True
+    return user.get('sync_seq', 0), False
+
+
+def create_sync_indexes(moods_collection, tombstones_collection, ttl_seconds):
+    moods_collection.create_index([('user_id', 1), ('modified_at', 1)])
+    tombstones_collection.create_index([('user_id', 1), ('modified_at', 1)])
+    # เปลี่ยนอายุของ index ที่มีอยู่แล้วไม่ได้ด้วย create_index (ต้องใช้ collMod หรือลบ index เดิมก่อน)
+    tombstones_collection.create_index('deleted_at', expireAfterSeconds=ttl_seconds, name=TOMBSTONE_INDEX_NAME)
+
+
+def record_tombstone(tombstones_collection, user_id, mood_id, seq, deleted_at):
+    tombstones_collection.insert_one({
+        'user_id': user_id,
+        'mood_id': str(mood_id),
+        'modified_at': seq,
+        'deleted_at': deleted_at
+    })
+
+
+def make_token(seq, synced_at):
+    return f'{seq}.{int(synced_at)}'
+
+
+def parse_token(token, ttl_seconds, now=None):
+    """คืนค่า (เลขลำดับ, เวลาที่ได้ข้อมูลครบ) ของ token ('' = เริ่มใหม่ทั้งหมด)
+
+    raise SyncTokenError ถ้า token ผิดรูปแบบ, SyncTokenExpired ถ้าเก่ากว่าอายุของ tombstone
+    """
+    now = time.time() if now is None else now
+    if not token:
+        return 0, now
+    try:
+        seq, synced_at = (int(part) for part in token.split('.'))
+    except ValueError:
+        raise SyncTokenError(token)
+    if seq < 0 or synced_at > now + 60:
+        raise SyncTokenError(token)
+    if now - synced_at >= ttl_seconds:
+        raise SyncTokenExpired(token)
+    return seq, synced_at
+
+
+def fetch_changes(moods_collection, tombstones_collection, user_id, since, until, projection, limit):
+    """บันทึกที่เปลี่ยนและ id ที่ถูกลบหลังเลขลำดับ since จนถึง until (จาก sync_horizon)
+    เรียงตามเลขลำดับ รวมไม่เกิน limit รายการ
+
+    คืนค่า (บันทึก, id ที่ลบ, เลขลำดับสุดท้ายที่ส่ง, ยังมีต่อหรือไม่)
+    """
+    query = {'user_id': user_id, 'modified_at': {'$gt': since, '$lte': until}}
+    moods = list(moods_collection.find(query, {**projection, 'modified_at': 1})
+                 .sort('modified_at', 1).limit(limit + 1))
+    tombstones = list(tombstones_collection.find(query, {'mood_id': 1, 'modified_at': 1})
+                      .sort('modified_at', 1).limit(limit + 1))
+
+    # เลขลำดับไม่ซ้ำกันระหว่างสอง collection จึงรวมแล้วตัดที่ limit ได้ตรงๆ
+    changes = sorted([(mood['modified_at'], mood, None) for mood in moods] +
+                     [(tombstone['modified_at'], None, tombstone['mood_id']) for tombstone in tombstones],
+                     key=lambda change: change[0])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    last_seq = changes[-1][0] if changes else since
+    updated = [mood for _, mood, _ in changes if mood is not None]
+    deleted = [mood_id for _, _, mood_id in changes if mood_id is not None]
+    return updated, deleted, last_seq, has_more
+
+
+def backfill_modified_at(moods_collection, users_collection, batch_size=BACKFILL_BATCH_SIZE, on_batch=None):
+    """เติม modified_at ให้บันทึกเก่าที่ยังไม่มี (ทีละผู้ใช้ เรียงตามเวลาที่สร้าง) เขียนทีละ batch ด้วย bulk_write
+
+    บันทึกของผู้ใช้ที่ไม่มีอยู่แล้วได้ modified_at เป็น 0 (ไม่ถูกเลือกซ้ำ และไม่ถูกส่งใน sync)
+    on_batch(report) จะถูกเรียกหลังเขียนแต่ละ batch
+    คืนค่ารายงาน {'updated': จำนวน, 'orphaned': จำนวนที่ไม่มีผู้ใช้}
+    """
+    report = {'updated': 0, 'orphaned': 0}
+    missing = {'modified_at': {'$exists': False}}
+
+    for user_id in moods_collection.distinct('user_id', missing):
+        cursor = (moods_collection.find({'user_id': user_id, **missing}, {'_id': 1})
+                  .sort([('created_at', 1), ('_id', 1)])
+                  .batch_size(batch_size))
+        batch = []
+
+        def flush():
+            if not batch:
+                return
+            def write(seqs):
+                moods_collection.bulk_write([
+                    UpdateOne({'_id': mood_id}, {'$set': {'modified_at': seq}})
+                    for mood_id, seq in zip(batch, seqs)
+                ], ordered=False)
+
+            try:
+                with sync_write(users_collection, user_id, len(batch)) as first:
+                    write(range(first, first + len(batch)))
+            except LookupError:
+                report['orphaned'] += len(batch)
+                write([0] * len(batch))
+            report['updated'] += len(batch)
+            batch.clear()
+            if on_batch is not None:
+                on_batch(report)
+
+        for mood in cursor:
+            batch.append(mood['_id'])
+            if len(batch) >= batch_size:
+                flush()
+        flush()
+
+    return report
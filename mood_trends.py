@@ -0,0 +1,187 @@
+# แนวโน้มความรู้สึกตามช่วงเวลา (รายวัน/รายสัปดาห์/รายเดือน)
+# เก็บตัวนับรายวันของแต่ละผู้ใช้ไว้ใน collection mood_trends (1 document ต่อผู้ใช้ต่อวัน)
+# อัพเดทด้วย $inc ทุกครั้งที่เพิ่ม/แก้ไข/ลบบันทึก รายสัปดาห์/รายเดือนรวมจาก bucket รายวันตอนอ่าน
+# จึงอ่านแนวโน้ม 1 ปีได้จากไม่เกิน 366 document ไม่ว่าผู้ใช้จะมีบันทึกกี่รายการ
+#
+# document _id = user_id (ไม่มีฟิลด์ day) เป็นเครื่องหมายว่าสร้าง bucket ของผู้ใช้คนนี้ครบแล้ว
+# (เขียนหลัง bucket ทั้งหมดเสมอ)
+from datetime import datetime, timedelta
+
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from mood_statistics import MOOD_COLORS, encode_key, decode_key
+
+GRANULARITIES = ('day', 'week', 'month')
+
+# ฟิลด์ที่ต้องใช้จากบันทึก (ลบบันทึกต้อง projection ฟิลด์เหล่านี้ด้วย)
+TRENDS_PROJECTION = {'_id': 0, 'occurred_at': 1, 'color': 1, 'emotion': 1}
+
+
+def bucket_id(user_id, day):
+    return f"{user_id}:{day.strftime('%Y-%m-%d')}"
+
+
+def _day(mood):
+    occurred_at = mood.get('occurred_at')
+    if occurred_at is None:
+        return None
+    return datetime(occurred_at.year, occurred_at.month, occurred_at.day)
+
+
+def _trend_deltas(mood, sign, deltas):
+    day = _day(mood)
+    if day is None:
+        return
+    day_deltas = deltas.setdefault(day, {})
+    day_deltas['total'] = day_deltas.get('total', 0) + sign
+    color = mood.get('color', '')
+    if color in MOOD_COLORS:
+        path = f'colors.{color}'
+        day_deltas[path] = day_deltas.get(path, 0) + sign
+    emotion = mood.get('emotion', '')
+    if emotion:
+        path = f'emotions.{encode_key(emotion)}'
+        day_deltas[path] = day_deltas.get(path, 0) + sign
+
+
+def _apply_trend_deltas(trends_collection, user_id, deltas):
+    operations = []
+    for day, day_deltas in deltas.items():
+        day_deltas = {path: value for path, value in day_deltas.items() if value != 0}
+        if day_deltas:
+            operations.append(UpdateOne(
+                {'_id': bucket_id(user_id, day)},
+                {'$inc': day_deltas, '$setOnInsert': {'user_id': user_id, 'day': day}},
+                upsert=True))
+    if operations:
+        trends_collection.bulk_write(operations, ordered=False)
+
+
+def update_trends(trends_collection, user_id, old_mood=None, new_mood=None):
+    """ปรับ bucket รายวันตามรายการที่เปลี่ยน (เหมือน update_rollup แต่แยกตามวัน)
+
+    สร้าง bucket ใหม่ได้เสมอ (upsert) ถ้ายังไม่เคยสร้างครบ get_trends จะสร้างใหม่ทั้งหมดทับให้
+    """
+    deltas = {}
+    if old_mood is not None:
+        _trend_deltas(old_mood, -1, deltas)
+    if new_mood is not None:
+        _trend_deltas(new_mood, 1, deltas)
+    _apply_trend_deltas(trends_collection, user_id, deltas)
+
+
+def add_to_trends(trends_collection, user_id, moods):
+    """บวกค่าของหลายรายการเข้า bucket (ใช้ตอนนำเข้าข้อมูล)"""
+    deltas = {}
+    for mood in moods:
+        _trend_deltas(mood, 1, deltas)
+    _apply_trend_deltas(trends_collection, user_id, deltas)
+
+
+def trends_pipeline(user_id):
+    # นับต่อ (วัน, สี, อารมณ์) ฝั่ง MongoDB ด้วย index (user_id, occurred_at)
+    return [
+        {'$match': {'user_id': user_id, 'occurred_at': {'$type': 'date'}}},
+        {'$group': {
+            '_id': {
+                'day': {'$dateToString': {'format': '%Y-%m-%d', 'date': '$occurred_at'}},
+                'color': '$color',
+                'emotion': '$emotion'
+            },
+            'count': {'$sum': 1}
+        }}
+    ]
+
+
+def rebuild_trends(moods_collection, trends_collection, user_id):
+    """คำนวณ bucket รายวันของผู้ใช้ใหม่จากข้อมูลบันทึกจริง แล้วเขียนทับของเดิม"""
+    buckets = {}
+    for row in moods_collection.aggregate(trends_pipeline(user_id)):
+        day = datetime.strptime(row['_id']['day'], '%Y-%m-%d')
+        bucket = buckets.setdefault(day, {
+            '_id': bucket_id(user_id, day), 'user_id': user_id, 'day': day,
+            'total': 0, 'colors': {}, 'emotions': {}
+        })
+        count = row['count']
+        bucket['total'] += count
+        color = row['_id'].get('color')
+        if color in MOOD_COLORS:
+            bucket['colors'][color] = bucket['colors'].get(color, 0) + count
+        emotion = row['_id'].get('emotion')
+        if emotion:
+            key = encode_key(emotion)
+            bucket['emotions'][key] = bucket['emotions'].get(key, 0) + count
+
+    # เขียนทับทีละ bucket (upsert) แทนการลบทั้งหมดแล้ว insert ใหม่ ระหว่างนี้ update_trends หรือ
+    # rebuild อีกตัวอาจ upsert bucket เดียวกันพร้อมกันได้ จึงไม่มีช่วงที่ bucket หายหรือ _id ซ้ำ
+    operations = [ReplaceOne({'_id': bucket['_id']}, bucket, upsert=True) for bucket in buckets.values()]
+    if operations:
+        _write_buckets(trends_collection, operations)
+    # ลบเฉพาะวันที่ไม่มีบันทึกแล้ว
+    trends_collection.delete_many({'user_id': user_id, 'day': {'$exists': True},
+                                   '_id': {'$nin': [bucket['_id'] for bucket in buckets.values()]}})
+    trends_collection.replace_one({'_id': user_id}, {'_id': user_id, 'built_at': datetime.now()}, upsert=True)
+
+
+def _write_buckets(trends_collection, operations):
+    # upsert สองตัวที่ _id เดียวกันพร้อมกัน ตัวหนึ่งอาจได้ duplicate key (11000)
+    # ลองใหม่เฉพาะตัวนั้นครั้งเดียว ซึ่งตอนนี้ document มีอยู่แล้วจึงเป็นการเขียนทับธรรมดา
+    try:
+        trends_collection.bulk_write(operations, ordered=False)
+    except BulkWriteError as e:
+        errors = e.details.get('writeErrors', [])
+        if not errors or any(error.get('code') != 11000 for error in errors):
+            raise
+        trends_collection.bulk_write([operations[error['index']] for error in errors], ordered=False)
+
+
+def _period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())  # วันจันทร์ (ISO week)
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def get_trends(moods_collection, trends_collection, user_id, granularity, start, end):
+    """นับสีและอารมณ์ต่อช่วงเวลา ตั้งแต่ start ถึงก่อน end (datetime)
+
+    คืนค่า list เรียงตามเวลา เฉพาะช่วงที่มีบันทึก:
+    [{'period': 'YYYY-MM-DD', 'total': n, 'colors': {...}, 'emotions': {...}}]
+    """
+    if trends_collection.find_one({'_id': user_id}, {'_id': 1}) is None:
+        rebuild_trends(moods_collection, trends_collection, user_id)
+
+    periods = {}
+    buckets = trends_collection.find(
+        {'user_id': user_id, 'day': {'$gte': start, '$lt': end}},
+        {'_id': 0, 'day': 1, 'total': 1, 'colors': 1, 'emotions': 1}
+    ).sort('day', 1)
+    for bucket in buckets:
+        period = _period_start(bucket['day'], granularity)
+        result = periods.get(period)
+        if result is None:
+            result = periods[period] = {
+                'period': period.strftime('%Y-%m-%d'),
+                'total': 0,
+                'colors': {color: 0 for color in MOOD_COLORS},
+                'emotions': {}
+            }
+        result['total'] += bucket.get('total', 0)
+        for color, count in (bucket.get('colors') or {}).items():
+            if color in result['colors']:
+                result['colors'][color] += count
+        for key, count in (bucket.get('emotions') or {}).items():
+            emotion = decode_key(key)
+            result['emotions'][emotion] = result['emotions'].get(emotion, 0) + count
+
+    # ตัวนับที่ถูกลดจนเหลือ 0 จะยังอยู่ใน bucket จึงต้องกรองออก
+    results = []
+    for period in sorted(periods):
+        result = periods[period]
+        if result['total'] <= 0:
+            continue
+        result['emotions'] = {emotion: count for emotion, count in result['emotions'].items() if count > 0}
+        results.append(result)
+    return results
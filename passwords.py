@@ -0,0 +1,104 @@
+# บริการเข้ารหัส/ตรวจสอบรหัสผ่านด้วย bcrypt
+# bcrypt ใช้ CPU มากโดยตั้งใจ จึงทำงานใน thread pool ขนาดจำกัด และปฏิเสธทันทีเมื่อคิวเต็ม
+# (bcrypt ปล่อย GIL ระหว่างคำนวณ thread อื่นจึงยังทำงานต่อได้)
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+
+import bcrypt
+
+from metrics import TimingHistogram
+
+
+class PasswordHasherBusy(Exception):
+    """มีงานเข้ารหัสรอคิวมากเกินไป"""
+
+
+HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+
+class PasswordHasher:
+    def __init__(self, rounds=12, max_workers=2, max_queue=16, timeout=30):
+        """
+        rounds: work factor ของ bcrypt (เปลี่ยนแล้วรหัสเดิมจะถูก rehash ตอน login)
+        max_workers: จำนวน thread ที่คำนวณ bcrypt พร้อมกัน
+        max_queue: จำนวนงานที่รอคิวได้ เกินนี้จะ raise PasswordHasherBusy ทันที
+        timeout: วินาทีที่รอผล เกินนี้จะ raise PasswordHasherBusy (งานที่เริ่มแล้วยังทำต่อจนเสร็จ)
+        """
+        self.rounds = rounds
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._pid = None
+        self._executor = None
+        self._slots = None
+        self.rejected = 0
+        self.wait_time = TimingHistogram(HASH_BUCKETS)  # เวลารอคิว
+        self.hash_time = TimingHistogram(HASH_BUCKETS)  # เวลาคำนวณ hashpw
+        self.check_time = TimingHistogram(HASH_BUCKETS)  # เวลาคำนวณ checkpw
+
+    # thread pool ที่สร้างก่อน fork (gunicorn preload) ไม่มี thread อยู่ใน process ลูก จึงสร้างใหม่ต่อ process
+    def _pool(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='bcrypt')
+                    self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+                    self._pid = os.getpid()
+        return self._executor, self._slots
+
+    def _run(self, histogram, func, *args):
+        executor, slots = self._pool()
+        if not slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHasherBusy('ระบบกำลังใช้งานหนาแน่น กรุณาลองใหม่อีกครั้ง')
+
+        queued_at = time.perf_counter()
+
+        def task():
+            started_at = time.perf_counter()
+            self.wait_time.observe(started_at - queued_at)
+            try:
+                return func(*args)
+            finally:
+                histogram.observe(time.perf_counter() - started_at)
+
+        try:
+            future = executor.submit(task)
+        except BaseException:
+            slots.release()
+            raise
+        # คืน slot เมื่องานจบจริง (หรือถูกยกเลิก) ไม่ใช่ตอนเลิกรอ งานที่หมดเวลาแล้วยังใช้ thread อยู่
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FuturesTimeoutError:
+            future.cancel()
+            self.rejected += 1
+            raise PasswordHasherBusy('ระบบกำลังใช้งานหนาแน่น กรุณาลองใหม่อีกครั้ง')
+
+    def hash(self, password):
+        return self._run(self.hash_time, bcrypt.hashpw,
+                         password.encode('utf-8'), bcrypt.gensalt(self.rounds))
+
+    def verify(self, password, hashed):
+        return self._run(self.check_time, bcrypt.checkpw, password.encode('utf-8'), hashed)
+
+    def needs_rehash(self, hashed):
+        # รูปแบบ hash: $2b$<rounds>$<salt+hash>
+        try:
+            return int(hashed.split(b'$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    def stats(self):
+        return {
+            'rounds': self.rounds,
+            'rejected': self.rejected,
+            'wait_seconds': self.wait_time.snapshot(),
+            'hash_seconds': self.hash_time.snapshot(),
+            'check_seconds': self.check_time.snapshot()
+        }
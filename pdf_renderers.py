@@ -0,0 +1,120 @@
+# ตัวแปลง HTML เป็น PDF ของงาน Export (เลือกด้วย PDF_RENDERER)
+#   wkhtmltopdf - เรียกโปรแกรม wkhtmltopdf ผ่าน pdfkit (ต้องติดตั้งโปรแกรมในเครื่อง)
+#   weasyprint  - แปลงใน process เองด้วย WeasyPrint ไม่ต้องเปิด subprocess ต่องาน (`pip install weasyprint`)
+#
+# ตอน import ทำแค่ตรวจว่ามี module/โปรแกรม/library อยู่หรือไม่ (ไม่ import pdfkit/weasyprint และไม่เปิด subprocess)
+# ตัวแปลงถูก pickle ไปทำงานใน process pool ของ ExportJobQueue สิ่งที่โหลดแล้ว
+# (config ของ pdfkit, module ของ WeasyPrint) จึง cache ไว้ระดับ process และ warm_up() โหลดไว้ก่อนงานแรก
+#
+# ขนาดหน้าและขอบกระดาษ: wkhtmltopdf ใช้ PDF_OPTIONS ส่วน WeasyPrint ใช้ @page ใน pdf_template.html
+# (ต้องแก้ให้ตรงกันทั้งสองที่)
+import abc
+import ctypes.util
+import importlib.util
+import os
+import platform
+import shutil
+import tempfile
+
+RENDERERS = ('wkhtmltopdf', 'weasyprint')
+
+WINDOWS_WKHTMLTOPDF = r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe'
+
+WARM_UP_HTML = '<!DOCTYPE html><html lang="th"><head><meta charset="UTF-8"></head><body>สวัสดี</body></html>'
+
+# สิ่งที่โหลดแล้วใน process นี้
+_loaded = {}
+
+
+def find_wkhtmltopdf(path=None):
+    """path ของโปรแกรม wkhtmltopdf หรือ None ถ้าไม่พบ"""
+    if path:
+        return path if os.path.isfile(path) else None
+    if platform.system() == 'Windows' and os.path.isfile(WINDOWS_WKHTMLTOPDF):
+        return WINDOWS_WKHTMLTOPDF
+    return shutil.which('wkhtmltopdf')
+
+
+def weasyprint_available():
+    """ติดตั้ง WeasyPrint และ Pango ไว้หรือไม่ (ไม่มี Pango จะ import weasyprint ไม่ได้ แม้ pip install แล้วก็ตาม)"""
+    if importlib.util.find_spec('weasyprint') is None:
+        return False
+    if platform.system() == 'Windows':
+        return True  # Pango มากับ GTK installer ซึ่ง find_library หาไม่เจอ
+    return any(ctypes.util.find_library(name) for name in ('pango-1.0', 'pango-1.0-0'))
+
+
+def _write_pdf(render_to, pdf_path):
+    # เขียนไฟล์ชั่วคราวก่อน แล้วค่อยเปลี่ยนชื่อ (ไม่มีใครเห็นไฟล์ PDF ที่เขียนไม่เสร็จ)
+    tmp_path = f'{pdf_path}.tmp'
+    render_to(tmp_path)
+    os.replace(tmp_path, pdf_path)
+
+
+class PdfRenderer(abc.ABC):
+    name = None
+
+    @abc.abstractmethod
+    def render(self, html_path, pdf_path):
+        """แปลงไฟล์ HTML เป็น PDF ที่ pdf_path"""
+
+    def __call__(self, html_path, pdf_path):
+        self.render(html_path, pdf_path)
+
+    def warm_up(self):
+        """โหลดตัวแปลงและแปลงเอกสารสั้นๆ 1 ครั้ง (เรียกตอนเริ่ม process ใน pool)"""
+        with tempfile.TemporaryDirectory(prefix='pdf_warm_up_') as directory:
+            html_path = os.path.join(directory, 'warm_up.html')
+            with open(html_path, 'w', encoding='utf-8') as f:
+                f.write(WARM_UP_HTML)
+            self.render(html_path, os.path.join(directory, 'warm_up.pdf'))
+
+
+class WkhtmltopdfRenderer(PdfRenderer):
+    name = 'wkhtmltopdf'
+
+    def __init__(self, wkhtmltopdf, options=None):
+        self.wkhtmltopdf = wkhtmltopdf
+        self.options = options
+
+    def _configuration(self):
+        key = ('wkhtmltopdf', self.wkhtmltopdf)
+        if key not in _loaded:
+            import pdfkit
+            _loaded[key] = pdfkit.configuration(wkhtmltopdf=self.wkhtmltopdf)
+        return _loaded[key]
+
+    def render(self, html_path, pdf_path):
+        import pdfkit
+        config = self._configuration()
+        _write_pdf(lambda path: pdfkit.from_file(html_path, path, configuration=config, options=self.options),
+                   pdf_path)
+
+
+class WeasyPrintRenderer(PdfRenderer):
+    name = 'weasyprint'
+
+    def render(self, html_path, pdf_path):
+        if 'weasyprint' not in _loaded:
+            import weasyprint
+            _loaded['weasyprint'] = weasyprint
+        html = _loaded['weasyprint'].HTML(filename=html_path)
+        _write_pdf(html.write_pdf, pdf_path)
+
+
+def create_renderer(name='auto', wkhtmltopdf=None, options=None):
+    """สร้างตัวแปลงตามชื่อ คืนค่า None ถ้าใช้ไม่ได้
+
+    auto: ใช้ wkhtmltopdf ถ้ามีโปรแกรม ไม่เช่นนั้นใช้ WeasyPrint ถ้าติดตั้งไว้
+    options: ตัวเลือกของ wkhtmltopdf
+    """
+    if name not in ('auto', *RENDERERS):
+        raise ValueError(f"PDF renderer must be one of auto, {', '.join(RENDERERS)}")
+
+    if name in ('auto', 'wkhtmltopdf'):
+        path = find_wkhtmltopdf(wkhtmltopdf)
+        if path and importlib.util.find_spec('pdfkit'):
+            return WkhtmltopdfRenderer(path, options)
+    if name in ('auto', 'weasyprint') and weasyprint_available():
+        return WeasyPrintRenderer()
+    return None
@@ -0,0 +1,5 @@
+# ชุดทดสอบของแอป (pytest + mongomock ไม่ต้องมี MongoDB จริง)
+#
+# รันจาก root ของ repo:
+#   pip install -r tests/requirements.txt
+#   python -m pytest -q
@@ -0,0 +1,95 @@
+# แอปสำหรับทดสอบ: ใช้ mongomock แทน MongoDB (ค่าที่อ่านตอน import app ตั้งไว้ก่อน import)
+# ตั้ง TEST_MONGODB_URI เพื่อทดสอบกับ MongoDB จริง (ฐานข้อมูล mood_tracker_test ถูกลบทุก test)
+# คำสั่งที่ส่งถึงฐานข้อมูลนับแบบเดียวกับ benchmarks/run.py (mongomock ไม่ส่ง event ของ pymongo)
+import os
+import tempfile
+from collections import Counter
+
+import pytest
+
+TEST_DATABASE = 'mood_tracker_test'
+MONGODB_URI = os.getenv('TEST_MONGODB_URI')
+PASSWORD = 'test-password'
+
+
+class CommandLog:
+    def __init__(self):
+        self.commands = []
+
+    def record(self, command, collection, seconds, ok):
+        self.commands.append((collection, command))
+
+    def clear(self):
+        del self.commands[:]
+
+    def count(self, collection=None):
+        return sum(1 for name, _ in self.commands if collection is None or name == collection)
+
+    def by_collection(self):
+        return Counter(name for name, _ in self.commands)
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    work_dir = tempfile.mkdtemp(prefix='mood_tests_')
+    os.environ.update({
+        'BCRYPT_ROUNDS': '4',
+        'EXPORT_SPOOL_DIR': os.path.join(work_dir, 'exports'),
+        'PDF_CACHE_DIR': os.path.join(work_dir, 'pdf_cache'),
+        'FRAGMENT_CACHE_BACKEND': 'none',
+        'EXPORT_PREWARM': 'false',
+        'SLOW_REQUEST_MS': '0'
+    })
+    if MONGODB_URI:
+        os.environ['MONGODB_URI'] = MONGODB_URI
+    else:
+        os.environ.pop('MONGODB_URI', None)
+        import mongomock
+
+        import mongo
+        mongo.MongoClient = mongomock.MongoClient
+
+    import app as app_module
+    from benchmarks.run import CountingCollection
+
+    app_module.app.config['TESTING'] = True
+    app_module.mongo.db_name = TEST_DATABASE
+    app_module.command_log = CommandLog()
+    collection = app_module.mongo.collection
+    app_module.mongo.collection = lambda name, read_preference=None: CountingCollection(
+        collection(name, read_preference), app_module.command_log.record)
+    return app_module
+
+
+@pytest.fixture
+def app_module_clean(app_module):
+    """ฐานข้อมูล (มี index ครบ) และ cache ว่างทุก test"""
+    app_module.mongo.client.drop_database(TEST_DATABASE)
+    app_module.ensure_indexes()
+    app_module.user_cache.clear()
+    app_module.command_log.clear()
+    yield app_module
+    app_module.mongo.client.drop_database(TEST_DATABASE)
+
+
+def create_user(app_module, username='alice'):
+    result = app_module.users_collection.insert_one({
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': app_module.password_hasher.hash(PASSWORD),
+        'theme': 'default'
+    })
+    return str(result.inserted_id)
+
+
+@pytest.fixture
+def client(app_module_clean):
+    """client ที่ login แล้ว (ผู้ใช้ alice)"""
+    app_module = app_module_clean
+    create_user(app_module)
+    client = app_module.app.test_client()
+    response = client.post('/login', data={'username': 'alice', 'password': PASSWORD})
+    assert response.status_code == 302
+    client.get('/dashboard').close()  # อ่าน flash ทิ้ง
+    app_module.command_log.clear()
+    return client
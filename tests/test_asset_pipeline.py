@@ -0,0 +1,60 @@
+# build-assets เก็บไฟล์ของ build ก่อนหน้าไว้หนึ่งรุ่น และ ETag ของหน้าเปลี่ยนเมื่อ bundle เปลี่ยน
+import os
+import shutil
+
+import pytest
+
+from asset_pipeline import BUNDLES, MANIFEST_NAME, build_assets, load_manifest
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'assets')
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    source = tmp_path / 'assets'
+    for sources in BUNDLES.values():
+        for relative in sources:
+            (source / relative).parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy(os.path.join(ASSETS_DIR, relative), source / relative)
+    return source
+
+
+def dist_files(dist_dir):
+    return {os.path.relpath(os.path.join(root, name), dist_dir)
+            for root, _, files in os.walk(dist_dir) for name in files}
+
+
+def test_rebuild_keeps_the_previous_build_only(source_dir, tmp_path):
+    dist_dir = tmp_path / 'dist'
+    builds = []
+    for index in range(3):
+        with open(source_dir / 'css' / 'base.css', 'a', encoding='utf-8') as f:
+            f.write(f'\n/* build {index} */\n' + 'body { margin: 0; }\n' * 20)
+        builds.append(build_assets(str(source_dir), str(dist_dir))['base.css'])
+
+    assert len(set(builds)) == 3
+    files = dist_files(dist_dir)
+    assert builds[2] in files and builds[1] in files
+    assert builds[1] + '.gz' in files
+    assert not any(name.startswith(builds[0]) for name in files)
+    assert load_manifest(str(dist_dir))['base.css'] == builds[2]
+    assert MANIFEST_NAME + '.tmp' not in files
+
+
+def test_rebuild_without_changes_writes_the_same_manifest(source_dir, tmp_path):
+    dist_dir = tmp_path / 'dist'
+    first = build_assets(str(source_dir), str(dist_dir))
+    files = dist_files(dist_dir)
+
+    assert build_assets(str(source_dir), str(dist_dir)) == first
+    assert dist_files(dist_dir) == files
+
+
+def test_page_etag_changes_with_the_asset_manifest(client, app_module_clean, monkeypatch):
+    etag = client.get('/statistics').get_etag()[0]
+    assert client.get('/statistics').get_etag()[0] == etag
+
+    monkeypatch.setattr(app_module_clean, 'asset_version', 'next-build')
+    response = client.get('/dashboard', headers={'If-None-Match': f'"{etag}"'})
+    assert response.status_code == 200
+    assert response.get_etag()[0] != etag
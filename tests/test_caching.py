@@ -0,0 +1,30 @@
+# FileLRUCache ใช้ไดเรกทอรีร่วมกันหลาย thread/process: ไฟล์ชั่วคราวที่ยังเขียนไม่เสร็จต้องไม่ถูกลบหรือแย่งกันใช้
+import os
+
+import caching
+from caching import FileLRUCache
+
+
+def test_evict_skips_files_still_being_written(tmp_path):
+    cache = FileLRUCache(str(tmp_path), max_bytes=10)
+    writing = tmp_path / 'other.123.456.tmp'
+    writing.write_bytes(b'x' * 100)
+
+    cache.put_data('key', b'y' * 5)
+
+    assert writing.exists()
+    assert cache.get('key') is not None
+
+
+def test_put_skips_the_cache_when_the_temp_file_disappears(tmp_path, monkeypatch):
+    source = tmp_path / 'report.pdf'
+    source.write_bytes(b'%PDF')
+    cache = FileLRUCache(str(tmp_path / 'cache'), max_bytes=1024)
+
+    def copy_then_lose(src, dst):
+        open(dst, 'wb').close()
+        os.remove(dst)
+    monkeypatch.setattr(caching.shutil, 'copyfile', copy_then_lose)
+
+    assert cache.put('key', str(source)) is None
+    assert cache.get('key') is None
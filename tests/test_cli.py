@@ -0,0 +1,56 @@
+# คำสั่ง CLI ที่รันตอน deploy
+from datetime import datetime
+
+from tests.conftest import create_user
+
+
+def test_migrate_backfills_old_moods(app_module_clean):
+    app_module = app_module_clean
+    user_id = create_user(app_module)
+    app_module.moods_collection.insert_one({
+        'user_id': user_id, 'color': 'แดง', 'emotion': 'เครียด', 'trigger': 'งาน', 'detail': 'ประชุม',
+        'date': '2026-01-02', 'time': '09:30', 'created_at': datetime(2026, 1, 2, 9, 30)
+    })
+
+    result = app_module.app.test_cli_runner().invoke(args=['migrate', '--batch-size', '10'])
+    assert result.exit_code == 0, result.output
+
+    mood = app_module.moods_collection.find_one()
+    assert mood['occurred_at'] is not None
+    assert mood['search']
+    assert mood['modified_at'] == 1
+
+    again = app_module.app.test_cli_runner().invoke(args=['migrate'])
+    assert again.exit_code == 0, again.output
+    assert app_module.moods_collection.find_one() == mood
+
+
+def test_import_moods_bumps_the_data_version(app_module_clean, tmp_path):
+    app_module = app_module_clean
+    user_id = create_user(app_module)
+    path = tmp_path / 'moods.csv'
+    path.write_text('date,time,color,trigger,emotion,detail\n2026-01-02,09:30,แดง,งาน,เครียด,ประชุม\n',
+                    encoding='utf-8')
+
+    result = app_module.app.test_cli_runner().invoke(args=['import-moods', 'alice', str(path)])
+    assert result.exit_code == 0, result.output
+
+    user = app_module.users_collection.find_one({'username': 'alice'})
+    assert user['data_version'] == 1
+    assert user['data_modified_at'] is not None
+    assert app_module.moods_collection.count_documents({'user_id': user_id}) == 1
+
+
+def test_import_moods_reports_only_the_first_errors(app_module_clean, tmp_path):
+    app_module = app_module_clean
+    create_user(app_module)
+    path = tmp_path / 'moods.csv'
+    path.write_text('date,time,color,trigger,emotion,detail\n' + '2026-13-02,09:30,แดง,งาน,เครียด,\n' * 150,
+                    encoding='utf-8')
+
+    with open(path, 'rb') as f:
+        report = app_module.import_moods(app_module.parse_rows(f, 'csv'), app_module.moods_collection,
+                                         'user', 'alice', max_errors=100)
+    assert report['error_count'] == 150
+    assert len(report['errors']) == 100
+    assert report['truncated'] is True
@@ -0,0 +1,52 @@
+# Export NDJSON/CSV: ชื่อไฟล์ใน Content-Disposition ต้องถูก quote (ชื่อผู้ใช้เป็นภาษาไทยหรือมี ; " ได้)
+# Export PDF จาก cache: client ที่ขอ JSON ได้ JSON แบบเดียวกับตอนที่ต้องเข้าคิว
+from types import SimpleNamespace
+from urllib.parse import unquote
+
+from werkzeug.http import parse_options_header
+
+from tests.conftest import PASSWORD, create_user
+
+
+def login(app_module, username):
+    create_user(app_module, username)
+    client = app_module.app.test_client()
+    client.post('/login', data={'username': username, 'password': PASSWORD})
+    return client
+
+
+def test_ascii_username_gets_a_plain_filename(client):
+    response = client.get('/export?format=csv')
+
+    value, options = parse_options_header(response.headers['Content-Disposition'])
+    assert value == 'attachment'
+    assert options == {'filename': 'moods_alice.csv'}
+
+
+def test_non_ascii_username_is_quoted(app_module_clean):
+    username = 'สมชาย; x="y"'
+    response = login(app_module_clean, username).get('/export?format=ndjson')
+    header = response.headers['Content-Disposition']
+
+    assert header.isascii()
+    assert "filename*=UTF-8''" in header
+    raw = header.split("filename*=UTF-8''", 1)[1].split(';', 1)[0]
+    assert unquote(raw) == f'moods_{username}.ndjson'
+    assert parse_options_header(header)[1]['filename'] == f'moods_{username}.ndjson'
+
+
+def test_cached_pdf_answers_json_clients_with_json(client, app_module_clean, monkeypatch, tmp_path):
+    pdf = tmp_path / 'cached.pdf'
+    pdf.write_bytes(b'%PDF-1.4')
+    monkeypatch.setattr(app_module_clean, 'PDF_ENABLED', True)
+    monkeypatch.setattr(app_module_clean, 'pdf_renderer', SimpleNamespace(name='test'))
+    monkeypatch.setattr(app_module_clean.pdf_cache, 'get', lambda key: str(pdf))
+
+    response = client.get('/export-pdf', headers={'Accept': 'application/json'})
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'done'
+
+    download = client.get(response.get_json()['download_url'])
+    assert download.mimetype == 'application/pdf'
+    assert download.get_data() == b'%PDF-1.4'
+    download.close()
@@ -0,0 +1,124 @@
+# ขีดจำกัดงาน Export ใช้ร่วมกันทุก worker (นับจาก spool), งานที่ค้างถูกเปลี่ยนเป็น failed
+# และ pool ที่ process ลูกตาย (BrokenProcessPool) ถูกสร้างใหม่
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from export_jobs import ExportJobQueue, ExportQueueFull
+
+
+def render_or_crash(html_path, pdf_path):
+    with open(html_path, encoding='utf-8') as f:
+        if f.read() == 'crash':
+            os._exit(1)
+    with open(pdf_path, 'wb') as f:
+        f.write(b'%PDF-1.4')
+
+
+class ThreadExportQueue(ExportJobQueue):
+    """แทน worker หนึ่งตัว: แปลงใน thread และรอจนกว่า release จะถูก set"""
+
+    def __init__(self, spool_dir, release, **kwargs):
+        super().__init__(spool_dir, self.render_when_released, **kwargs)
+        self.release = release
+
+    def render_when_released(self, html_path, pdf_path):
+        self.release.wait(5)
+        render_or_crash(html_path, pdf_path)
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4)
+        return self._executor
+
+
+def wait_for(queue, job_id, user_id):
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        job = queue.status(job_id, user_id)
+        if job['status'] != 'pending':
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f'job {job_id} still pending')
+
+
+@pytest.fixture
+def workers(tmp_path):
+    release = threading.Event()
+    queues = [ThreadExportQueue(str(tmp_path), release, max_pending=2, max_pending_per_user=1) for _ in range(2)]
+    yield queues
+    release.set()
+    for queue in queues:
+        if queue._executor is not None:
+            queue._executor.shutdown(wait=True)
+
+
+def test_per_user_limit_is_shared_between_workers(workers):
+    first, second = workers
+    first.submit('alice', '<p></p>', 'a.pdf')
+
+    with pytest.raises(ExportQueueFull):
+        second.submit('alice', '<p></p>', 'a.pdf')
+    second.submit('bob', '<p></p>', 'b.pdf')
+
+
+def test_global_limit_is_shared_between_workers(workers):
+    first, second = workers
+    first.submit('alice', '<p></p>', 'a.pdf')
+    second.submit('bob', '<p></p>', 'b.pdf')
+
+    with pytest.raises(ExportQueueFull):
+        first.submit('carol', '<p></p>', 'c.pdf')
+
+
+def test_finished_jobs_free_their_slot(workers):
+    first, second = workers
+    job_id = first.submit('alice', '<p></p>', 'a.pdf')
+    first.release.set()
+
+    assert wait_for(first, job_id, 'alice')['status'] == 'done'
+    second.submit('alice', '<p></p>', 'a.pdf')
+
+
+def test_job_of_a_dead_worker_is_marked_failed(workers):
+    first, second = workers
+    dead = subprocess.Popen([sys.executable, '-c', 'pass'])
+    dead.wait()
+    job_id = 'a' * 32
+    first._write_meta(job_id, {'job_id': job_id, 'user_id': 'alice', 'filename': 'a.pdf', 'status': 'pending',
+                               'error': None, 'created_at': time.time(), 'pid': dead.pid})
+    open(first._pending_path(job_id), 'w').close()
+
+    second.submit('alice', '<p></p>', 'a.pdf')
+    job = first.status(job_id, 'alice')
+    assert job['status'] == 'failed' and job['error']
+    assert not os.path.exists(first._pending_path(job_id))
+
+
+def test_job_past_the_timeout_is_marked_failed(tmp_path):
+    queue = ThreadExportQueue(str(tmp_path), threading.Event(), job_timeout=0)
+    job_id = queue.submit('alice', '<p></p>', 'a.pdf')
+    time.sleep(0.01)
+
+    assert queue.status(job_id, 'alice')['status'] == 'failed'
+    queue.release.set()
+    queue._executor.shutdown(wait=True)
+
+
+def test_broken_process_pool_is_replaced(tmp_path):
+    queue = ExportJobQueue(str(tmp_path), render_or_crash, max_workers=1, max_pending=4)
+    try:
+        crashed = queue.submit('alice', 'crash', 'a.pdf')
+        assert wait_for(queue, crashed, 'alice')['status'] == 'failed'
+
+        job_id = queue.submit('alice', '<p></p>', 'a.pdf')
+        assert wait_for(queue, job_id, 'alice')['status'] == 'done'
+        assert os.path.getsize(queue.pdf_path(job_id)) > 0
+    finally:
+        if queue._executor is not None:
+            queue._executor.shutdown(wait=True)
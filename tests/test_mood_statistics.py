@@ -0,0 +1,143 @@
+# ตัวนับแบบรอบเดียว (count_moods), $facet (aggregate_counts) และ rollup ($inc) ต้องได้ผลตรงกันเสมอ
+import mongomock
+import pytest
+
+from mood_statistics import (MOOD_COLORS, UNKNOWN_TRIGGER, add_to_rollup, aggregate_counts, compute_stats,
+                             count_moods, counts_to_rollup, decode_key, empty_counts, encode_key,
+                             get_user_stats, rebuild_rollup, rollup_to_counts, update_rollup, verify_rollup)
+
+USER_ID = 'user-1'
+
+# ข้อความที่ใช้เป็นชื่อฟิลด์ใน MongoDB ตรงๆ ไม่ได้ (. และ $) รวมถึง % ที่ใช้ escape และข้อความว่าง
+AWKWARD_KEYS = ['a.b', '$inc', '%', '%2E', '%25', '', 'งาน.บ้าน', 'x$y.z']
+
+
+def make_moods():
+    moods = []
+    for index, key in enumerate(AWKWARD_KEYS):
+        color = MOOD_COLORS[index % len(MOOD_COLORS)]
+        moods.append({'user_id': USER_ID, 'color': color, 'trigger': key, 'emotion': key})
+    moods += [
+        {'user_id': USER_ID, 'color': 'แดง', 'trigger': 'การทำงาน', 'emotion': 'เครียด'},
+        {'user_id': USER_ID, 'color': 'แดง', 'trigger': 'การทำงาน', 'emotion': 'เครียด'},
+        {'user_id': USER_ID, 'color': 'แดง', 'emotion': 'โกรธ'},                      # ไม่มี trigger
+        {'user_id': USER_ID, 'color': 'เขียว', 'trigger': None, 'emotion': ''},       # trigger เป็น null
+        {'user_id': USER_ID, 'color': 'ม่วง', 'trigger': 'เพื่อน', 'emotion': 'งง'},  # สีที่ไม่รู้จัก
+        {'user_id': USER_ID, 'trigger': 'เพื่อน'},                                    # ไม่มีสี
+        {'user_id': 'someone-else', 'color': 'แดง', 'trigger': 'การทำงาน', 'emotion': 'เครียด'},
+    ]
+    return moods
+
+
+def user_moods(moods):
+    return [mood for mood in moods if mood['user_id'] == USER_ID]
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().mood_tracker
+
+
+@pytest.fixture
+def moods_collection(db):
+    collection = db.moods
+    collection.insert_many(make_moods())
+    return collection
+
+
+@pytest.mark.parametrize('key', AWKWARD_KEYS + ['%%', '.$.', 'ปกติ'])
+def test_encode_key_round_trips_and_is_a_valid_field_name(key):
+    encoded = encode_key(key)
+    assert decode_key(encoded) == key
+    assert encoded and '.' not in encoded and '$' not in encoded
+
+
+def test_count_moods_counts_each_group():
+    counts = count_moods(user_moods(make_moods()))
+
+    assert counts['total'] == len(AWKWARD_KEYS) + 6
+    assert counts['colors']['แดง'] == 5
+    assert 'ม่วง' not in counts['colors']
+    # ข้อความว่างไม่นับเป็นอารมณ์/สิ่งกระตุ้น แต่นับในสิ่งกระตุ้นของสี (ไม่มี trigger = ไม่ระบุ)
+    assert '' not in counts['emotions'] and '' not in counts['triggers']
+    assert counts['color_triggers']['เหลือง'][''] == 1
+    assert counts['color_triggers']['แดง'][UNKNOWN_TRIGGER] == 1
+    assert counts['color_triggers']['เขียว'][UNKNOWN_TRIGGER] == 1
+    assert counts['triggers']['เพื่อน'] == 2
+
+
+def test_count_moods_accepts_a_cursor(moods_collection):
+    cursor = moods_collection.find({'user_id': USER_ID}, {'_id': 0, 'color': 1, 'trigger': 1, 'emotion': 1})
+    assert count_moods(cursor) == count_moods(user_moods(make_moods()))
+
+
+def test_compute_stats_keeps_top_entries():
+    moods = [{'color': 'แดง', 'trigger': f't{i}', 'emotion': f'e{i}'} for i in range(20) for _ in range(i + 1)]
+    stats = compute_stats(moods)
+
+    assert stats['total_moods'] == sum(range(1, 21))
+    assert stats['color_stats'] == {'แดง': stats['total_moods'], 'เหลือง': 0, 'น้ำเงิน': 0, 'เขียว': 0}
+    assert list(stats['color_triggers']['แดง']) == ['t19', 't18', 't17', 't16', 't15']
+    assert list(stats['emotion_stats']) == [f'e{i}' for i in range(19, 9, -1)]
+    assert list(stats['trigger_stats']) == [f't{i}' for i in range(19, 9, -1)]
+
+
+def test_compute_stats_of_nothing():
+    stats = compute_stats([])
+    assert stats['total_moods'] == 0
+    assert stats['color_stats'] == {color: 0 for color in MOOD_COLORS}
+    assert stats['emotion_stats'] == {} and stats['trigger_stats'] == {}
+
+
+def test_facet_counts_match_single_pass(moods_collection):
+    assert aggregate_counts(moods_collection, USER_ID) == count_moods(user_moods(make_moods()))
+
+
+def test_facet_counts_for_user_without_moods(moods_collection):
+    assert aggregate_counts(moods_collection, 'nobody') == empty_counts()
+
+
+def test_rollup_document_round_trips(moods_collection):
+    counts = aggregate_counts(moods_collection, USER_ID)
+    assert rollup_to_counts(counts_to_rollup(USER_ID, counts)) == counts
+
+
+def test_incremental_rollup_matches_facet_counts(db, moods_collection):
+    stats = db.mood_stats
+    stats.insert_one(counts_to_rollup(USER_ID, empty_counts()))
+    moods = user_moods(make_moods())
+
+    # เพิ่มทีละรายการ / ทีละ batch แบบการนำเข้า
+    for mood in moods[:5]:
+        update_rollup(stats, USER_ID, new_mood=mood)
+    add_to_rollup(stats, USER_ID, moods[5:])
+    assert rollup_to_counts(stats.find_one({'_id': USER_ID})) == aggregate_counts(moods_collection, USER_ID)
+    assert verify_rollup(moods_collection, stats, USER_ID)
+
+    # แก้ไขแล้วลบ: ตัวนับที่ลดเหลือ 0 ต้องหายไปจากผลลัพธ์
+    old, new = moods[0], {**moods[0], 'color': 'เขียว', 'trigger': '$set.x', 'emotion': '%2E'}
+    update_rollup(stats, USER_ID, old_mood=old, new_mood=new)
+    update_rollup(stats, USER_ID, old_mood=moods[1])
+    expected = count_moods([new] + moods[2:])
+    assert rollup_to_counts(stats.find_one({'_id': USER_ID})) == expected
+    assert AWKWARD_KEYS[1] not in expected['triggers']
+
+
+def test_rebuild_and_verify_rollup(db, moods_collection):
+    stats = db.mood_stats
+    assert not verify_rollup(moods_collection, stats, USER_ID)
+
+    rebuild_rollup(moods_collection, stats, USER_ID)
+    assert verify_rollup(moods_collection, stats, USER_ID)
+
+    stats.update_one({'_id': USER_ID}, {'$inc': {'total': 1}})
+    assert not verify_rollup(moods_collection, stats, USER_ID)
+
+
+def test_get_user_stats_builds_missing_rollup(db, moods_collection):
+    stats = db.mood_stats
+    expected = compute_stats(user_moods(make_moods()))
+
+    assert get_user_stats(moods_collection, stats, USER_ID) == expected
+    assert stats.count_documents({'_id': USER_ID}) == 1
+    assert get_user_stats(moods_collection, stats, USER_ID) == expected
@@ -0,0 +1,62 @@
+# rebuild_trends เขียนทับ bucket เดิม (upsert) จึงรันซ้อนกับ update_trends / rebuild อีกตัวได้
+from datetime import datetime
+
+import mongomock
+import pytest
+from pymongo.errors import BulkWriteError
+
+from mood_trends import bucket_id, get_trends, rebuild_trends, update_trends
+
+USER_ID = 'user-1'
+
+
+@pytest.fixture
+def db():
+    return mongomock.MongoClient().mood_tracker
+
+
+def mood(day, color='แดง', emotion='เครียด'):
+    return {'user_id': USER_ID, 'occurred_at': datetime(2026, 1, day, 9), 'color': color, 'emotion': emotion}
+
+
+def test_rebuild_overwrites_buckets_that_already_exist(db):
+    db.moods.insert_many([mood(1), mood(1, 'เขียว', 'สงบ'), mood(2)])
+    # bucket ที่ update_trends สร้างก่อน rebuild (เช่นบันทึกที่เพิ่มระหว่างที่ยังไม่มีเครื่องหมาย)
+    update_trends(db.mood_trends, USER_ID, new_mood=mood(2))
+    update_trends(db.mood_trends, USER_ID, new_mood=mood(5))  # วันที่ไม่มีบันทึกจริง
+
+    rebuild_trends(db.moods, db.mood_trends, USER_ID)
+
+    assert db.mood_trends.find_one({'_id': bucket_id(USER_ID, datetime(2026, 1, 2))})['total'] == 1
+    assert db.mood_trends.find_one({'_id': bucket_id(USER_ID, datetime(2026, 1, 5))}) is None
+    assert db.mood_trends.find_one({'_id': USER_ID}) is not None
+    trends = get_trends(db.moods, db.mood_trends, USER_ID, 'day', datetime(2026, 1, 1), datetime(2026, 2, 1))
+    assert [(row['period'], row['total']) for row in trends] == [('2026-01-01', 2), ('2026-01-02', 1)]
+
+
+class RacingCollection:
+    """upsert ตัวแรกเจอ duplicate key เหมือนมี upsert อื่นสร้าง document เดียวกันตัดหน้า"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.raced = False
+
+    def bulk_write(self, operations, ordered=True):
+        if not self.raced:
+            self.raced = True
+            self.collection.bulk_write(operations[1:], ordered=ordered)
+            raise BulkWriteError({'writeErrors': [{'index': 0, 'code': 11000, 'errmsg': 'duplicate key'}]})
+        return self.collection.bulk_write(operations, ordered=ordered)
+
+    def __getattr__(self, attr):
+        return getattr(self.collection, attr)
+
+
+def test_rebuild_retries_duplicate_key_upserts(db):
+    db.moods.insert_many([mood(1), mood(2)])
+    trends = RacingCollection(db.mood_trends)
+
+    rebuild_trends(db.moods, trends, USER_ID)
+
+    assert db.mood_trends.count_documents({'user_id': USER_ID, 'day': {'$exists': True}}) == 2
+    assert db.mood_trends.find_one({'_id': USER_ID}) is not None
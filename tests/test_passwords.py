@@ -0,0 +1,65 @@
+# PasswordHasher: คิวเต็มหรือรอนานเกินไปได้ PasswordHasherBusy (ไม่ใช่ 500)
+# และ slot ของคิวคืนเมื่อ bcrypt ทำเสร็จจริงเท่านั้น
+import os
+import threading
+
+import pytest
+
+from passwords import PasswordHasher, PasswordHasherBusy
+
+
+@pytest.fixture
+def hasher():
+    return PasswordHasher(rounds=4, max_workers=1, max_queue=0, timeout=0.05)
+
+
+def block(hasher):
+    """ให้ thread เดียวของ hasher ติดงานไว้จนกว่าจะ set event ที่คืนกลับไป"""
+    release, started = threading.Event(), threading.Event()
+
+    def blocker(_):
+        started.set()
+        release.wait(5)
+        return True
+
+    thread = threading.Thread(target=lambda: pytest.raises(PasswordHasherBusy, hasher._run,
+                                                           hasher.check_time, blocker, None))
+    thread.start()
+    assert started.wait(5)
+    return release, thread
+
+
+def test_hash_and_verify(hasher):
+    hashed = hasher.hash('รหัสผ่าน')
+    assert hasher.verify('รหัสผ่าน', hashed)
+    assert not hasher.verify('ผิด', hashed)
+    assert not hasher.needs_rehash(hashed)
+
+
+def test_timeout_raises_busy_and_keeps_the_slot_until_done(hasher):
+    release, thread = block(hasher)
+    thread.join(5)  # หมดเวลารอแล้ว แต่ bcrypt (blocker) ยังทำงานอยู่
+
+    with pytest.raises(PasswordHasherBusy):
+        hasher.hash('x')
+    assert hasher.rejected == 2
+
+    release.set()
+    hasher._executor.submit(lambda: None).result(5)  # blocker จบและคืน slot แล้ว
+    hasher.timeout = 5
+    assert hasher.verify('x', hasher.hash('x'))
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason='ต้องใช้ os.fork')
+def test_pool_is_recreated_after_fork(hasher):
+    hasher.timeout = 5
+    hashed = hasher.hash('x')  # มี thread แล้วก่อน fork
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os._exit(0 if hasher.verify('x', hashed) else 1)
+        except BaseException:
+            os._exit(2)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,55 @@
+# ตัวแปลง PDF ทั้งสองแบบต้องได้หน้ากระดาษแบบเดียวกันจาก pdf_template.html
+# (test ที่แปลงจริงข้ามไปถ้าเครื่องนี้ไม่มี wkhtmltopdf หรือ WeasyPrint + Pango)
+from datetime import datetime
+
+import pytest
+
+from pdf_renderers import PdfRenderer, WeasyPrintRenderer, WkhtmltopdfRenderer, create_renderer
+
+MOOD_COUNT = 60
+
+
+def test_pdf_renderer_requires_render():
+    with pytest.raises(TypeError):
+        PdfRenderer()
+
+
+def test_create_renderer_rejects_unknown_names():
+    with pytest.raises(ValueError):
+        create_renderer('chrome')
+
+
+def render_report(app_module):
+    moods = [{'date': '2026-01-%02d' % (index % 28 + 1), 'time': '09:00', 'color': 'แดง',
+              'emotion': f'อารมณ์ {index}', 'trigger': 'งาน', 'detail': f'entry-{index:03d}'}
+             for index in range(MOOD_COUNT)]
+    with app_module.app.test_request_context():
+        return app_module.render_template(
+            'pdf_template.html', username='สมชาย', total_moods=MOOD_COUNT,
+            color_stats={'แดง': MOOD_COUNT}, emotion_stats={'อารมณ์ 1': 1}, trigger_stats={'งาน': MOOD_COUNT},
+            export_date=datetime(2026, 1, 31).strftime('%d/%m/%Y %H:%M'), include_all_entries=True, moods=moods)
+
+
+def test_renderers_lay_out_the_same_pages(app_module, tmp_path):
+    pypdf = pytest.importorskip('pypdf')
+    renderers = [create_renderer('wkhtmltopdf', options=app_module.PDF_OPTIONS), create_renderer('weasyprint')]
+    if not isinstance(renderers[0], WkhtmltopdfRenderer) or not isinstance(renderers[1], WeasyPrintRenderer):
+        pytest.skip('ต้องมีทั้ง wkhtmltopdf และ WeasyPrint')
+
+    html_path = tmp_path / 'report.html'
+    html_path.write_text(render_report(app_module), encoding='utf-8')
+    documents = []
+    for renderer in renderers:
+        pdf_path = tmp_path / f'{renderer.name}.pdf'
+        renderer(str(html_path), str(pdf_path))
+        documents.append(pypdf.PdfReader(str(pdf_path)))
+
+    wkhtmltopdf, weasyprint = documents
+    sizes = [{(round(float(page.mediabox.width)), round(float(page.mediabox.height))) for page in document.pages}
+             for document in documents]
+    assert sizes[0] == sizes[1] == {(595, 842)}  # A4 ทุกหน้า
+    # ฟอนต์และการตัดบรรทัดต่างกันเล็กน้อย จำนวนหน้าจึงต่างกันได้ไม่เกิน 1 หน้า
+    assert abs(len(wkhtmltopdf.pages) - len(weasyprint.pages)) <= 1
+    for document in documents:
+        text = ''.join(page.extract_text() for page in document.pages)
+        assert all(f'entry-{index:03d}' in text for index in range(MOOD_COUNT))
@@ -0,0 +1,60 @@
+# /api/search ใช้ $text บน MongoDB จริง และ regex บนฟิลด์ search เมื่อใช้ mongomock (ต้องได้บันทึกชุดเดียวกัน)
+import pytest
+
+from mood_search import phrase_filter, search_fields, search_query
+
+MOODS = [
+    ('2026-01-01', 'แดง', 'เครียด', 'การประชุม', 'ประชุมงานทั้งวัน Deadline พรุ่งนี้'),
+    ('2026-01-02', 'เขียว', 'สบายใจ', 'งานบ้าน', 'ทำความสะอาดบ้าน'),
+    ('2026-01-03', 'น้ำเงิน', 'เหนื่อย', 'การเดินทาง', 'รถติด'),
+    ('2026-01-04', 'เหลือง', 'ดีใจ', 'เพื่อน', 'เจอเพื่อนเก่า'),
+]
+
+
+@pytest.fixture
+def moods(client):
+    for date, color, emotion, trigger, detail in MOODS:
+        response = client.post('/add', data={'date': date, 'time': '09:00', 'color': color,
+                                             'emotion': emotion, 'trigger': trigger, 'detail': detail})
+        assert response.status_code == 302
+    return client
+
+
+def search(client, q, **params):
+    response = client.get('/api/search', query_string={'q': q, **params})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return response.get_json()
+
+
+@pytest.mark.parametrize('q, emotions', [
+    ('งาน', {'เครียด', 'สบายใจ'}),
+    ('ประชุม deadline', {'เครียด'}),
+    ('DEADLINE', {'เครียด'}),
+    ('เพื่อน', {'ดีใจ'}),
+    ('บ้าน', {'สบายใจ'}),
+    ('ไม่มีคำนี้', set()),
+])
+def test_search_finds_substrings(moods, q, emotions):
+    result = search(moods, q)
+    assert {mood['emotion'] for mood in result['results']} == emotions
+    assert result['has_more'] is False
+
+
+def test_search_only_returns_own_moods(moods, app_module_clean):
+    app_module_clean.moods_collection.insert_one({
+        'user_id': 'someone-else', 'emotion': 'เครียด', 'detail': 'ประชุม',
+        'search': search_fields({'emotion': 'เครียด', 'detail': 'ประชุม'})})
+
+    assert len(search(moods, 'ประชุม')['results']) == 1
+
+
+def test_search_validates_parameters(client):
+    assert client.get('/api/search').status_code == 400
+    assert client.get('/api/search?q=a&page=0').status_code == 400
+
+
+def test_phrase_filter_matches_the_text_query():
+    assert search_query('ประชุม งาน') == '"ปร ระ ะช ชุ ุม" "งา าน"'
+    conditions = phrase_filter('ประชุม งาน')['$and']
+    assert len(conditions) == 2
+    assert conditions[1]['$or'][0] == {'search.emotion': {'$regex': '(^| )งา\\ าน( |$)'}}
@@ -0,0 +1,74 @@
+# get_user_data ค้นหาผู้ใช้ใน MongoDB ไม่เกินครั้งเดียวต่อ request และ user_cache (USER_CACHE_TTL)
+# ทำให้ request ถัดไปไม่ต้องค้นหาเลย จนกว่า invalidate_user_data จะล้าง cache
+# ยกเว้นเวอร์ชันข้อมูล (ETag / fragment cache) ที่อ่านจาก MongoDB เสมอ
+import pytest
+
+# route ที่ login แล้ว -> จำนวนคำสั่งต่อ collection users ที่ไม่ได้มาจาก get_user_data
+ROUTES = {
+    '/dashboard': 0,
+    '/history': 0,
+    '/statistics': 0,
+    '/settings': 0,
+    '/api/history?month=2025-01': 0,
+    '/api/moods': 0,
+    '/api/trends': 0,
+    '/api/sync': 1,  # sync_horizon อ่าน sync_seq / sync_pending ล่าสุดเสมอ
+    '/export?format=csv': 0,
+}
+
+# route ที่ใช้เวอร์ชันข้อมูล -> อ่าน data_version เพิ่ม 1 ครั้งเมื่อข้อมูลผู้ใช้มาจาก user_cache
+DATA_STATE_ROUTES = {'/dashboard', '/statistics'}
+
+
+@pytest.fixture
+def user_cache(app_module_clean):
+    cache = app_module_clean.user_cache
+    ttl = cache.ttl
+    cache.ttl = 60
+    yield cache
+    cache.ttl = ttl
+    cache.clear()
+
+
+def get(client, url):
+    response = client.get(url)
+    response.get_data()
+    response.close()
+    assert response.status_code == 200, url
+    return response
+
+
+@pytest.mark.parametrize('url, extra', ROUTES.items())
+def test_route_looks_up_the_user_once(client, app_module_clean, url, extra):
+    get(client, url)
+    assert app_module_clean.command_log.count('users') == 1 + extra
+
+
+@pytest.mark.parametrize('url, extra', ROUTES.items())
+def test_user_cache_skips_the_lookup(client, app_module_clean, user_cache, url, extra):
+    get(client, url)
+    app_module_clean.command_log.clear()
+
+    get(client, url)
+    assert app_module_clean.command_log.count('users') == extra + (url in DATA_STATE_ROUTES)
+
+
+def test_profile_update_invalidates_the_user_cache(client, app_module_clean, user_cache):
+    get(client, '/settings')
+    response = client.post('/settings', data={'action': 'update_profile',
+                                              'username': 'alice2', 'email': 'alice2@example.com'})
+    assert response.status_code == 302
+    app_module_clean.command_log.clear()
+
+    assert 'alice2@example.com' in get(client, '/settings').get_data(as_text=True)
+    assert app_module_clean.command_log.count('users') == 1
+
+
+def test_data_version_bypasses_the_user_cache(client, app_module_clean, user_cache):
+    etag = get(client, '/statistics').headers['ETag']
+
+    # worker อื่นเพิ่มบันทึก: user_cache ของ worker นี้ยังมีเวอร์ชันเก่าอยู่
+    user = app_module_clean.users_collection.find_one({'username': 'alice'})
+    app_module_clean.users_collection.update_one({'_id': user['_id']}, {'$inc': {'data_version': 1}})
+
+    assert get(client, '/statistics').headers['ETag'] != etag